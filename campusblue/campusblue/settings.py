@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'studentcorner.instrumentation.RequestTimingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,6 +80,46 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests (and their PRAGMAs applied);
+        # under ASGI Django closes them after each request regardless
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock when a transaction begins, so concurrent
+            # writers wait for busy_timeout instead of failing on upgrade
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Applied to every new SQLite connection (see studentcorner/database.py)
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,  # milliseconds
+    'cache_size': -20000,  # KiB, about 20 MB per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Write-ahead logging (with synchronous=NORMAL) lets readers carry on while a
+# certificate is issued. The journal mode is stored in the database file and
+# adds -wal and -shm files next to it, so only the production server turns it
+# on, with CAMPUSBLUE_SQLITE_WAL=1; management commands and tests leave the
+# file as it is
+SQLITE_WAL = os.environ.get('CAMPUSBLUE_SQLITE_WAL') == '1'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Keys are version-stamped by studentcorner/caching.py. The cache has to be
+# shared by every worker process: a version bumped in one process must
+# invalidate the entries the others read, so a process-local backend such as
+# LocMemCache would serve stale lookups until they expire.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
     }
 }
 
@@ -122,3 +164,41 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Rendered bonafide certificates (see studentcorner/pdf_cache.py)
+
+BONAFIDE_PDF_CACHE_DIR = BASE_DIR / 'pdf_cache'
+
+BONAFIDE_PDF_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Lifetime in seconds of the signed preview link shown after issuing a certificate
+BONAFIDE_PREVIEW_MAX_AGE = 10 * 60
+
+# Certificate rendering worker processes per server process (see
+# studentcorner/render_service.py), started on the first render; 0 renders in
+# the request thread
+BONAFIDE_RENDER_WORKERS = 2
+
+# Renders that may be pending at once, and how long a request waits for a slot
+BONAFIDE_RENDER_QUEUE = 4 * BONAFIDE_RENDER_WORKERS
+
+BONAFIDE_RENDER_QUEUE_TIMEOUT = 30
+
+# Seconds a request waits for a worker's render before rendering it itself
+BONAFIDE_RENDER_TIMEOUT = 30
+
+# Background render jobs (see studentcorner/jobs.py): seconds a running job may
+# take before another worker picks it up again, and the longest a status
+# request may be held open waiting for a job to finish
+BONAFIDE_JOB_LEASE = 5 * 60
+
+BONAFIDE_JOB_MAX_WAIT = 10
+
+# Per-view timing (see studentcorner/instrumentation.py): requests kept per view
+# for the percentiles, and how often each process saves them to PERF_METRICS_DIR
+PERF_BUFFER_SIZE = 1000
+
+PERF_PERSIST_INTERVAL = 60
+
+PERF_METRICS_DIR = BASE_DIR / 'perf_metrics'
@@ -1,34 +1,116 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404, JsonResponse
+from django.urls import path, reverse
+from django.utils.functional import cached_property
 
-
+from . import caching, database, numbering
+from .forms import StudentSemesterForm, SubjectChoiceField
 from .models import (
-    AcademicSession, Semester, Subject,
-    Student, StudentSemester, Certificate
+    COURSE_SLOTS, AcademicSession, Semester, Subject,
+    Student, StudentSemester, StudentSubjectEnrollment, SubjectProgression, Certificate
 )
 
+# Unfiltered changelists of tables larger than this show the row count from
+# the planner statistics rather than running COUNT(*)
+ESTIMATE_COUNT_ABOVE = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.has_filters():
+            estimate = database.estimated_count(queryset.model)
+            if estimate is not None and estimate > ESTIMATE_COUNT_ABOVE:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for the tables that grow with the student body: no
+    second COUNT(*) for "x of y selected", an estimated count when unfiltered
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class SubjectAutocomplete(AutocompleteSelect):
+    """
+    Subject picker for one course slot. Options come from
+    StudentSemesterAdmin.subject_autocomplete, and only the selected subject
+    is rendered, taken from the cached catalogue.
+    """
+    def __init__(self, course_type, admin_site, attrs=None):
+        super().__init__(StudentSubjectEnrollment._meta.get_field('subject'), admin_site, attrs)
+        self.course_type = course_type
+
+    def get_url(self):
+        return reverse(f'{self.admin_site.name}:studentcorner_studentsemester_subjects', args=[self.course_type])
+
+    def optgroups(self, name, value, attr=None):
+        selected = {str(v) for v in value if v not in (None, '')}
+        options = [] if self.is_required else [self.create_option(name, '', '', False, 0)]
+        for subject in caching.subjects_for_course_type(self.course_type):
+            if str(subject.pk) in selected:
+                options.append(self.create_option(name, subject.pk, str(subject), True, len(options)))
+        return [(None, options, 0)]
+
+
 @admin.register(StudentSemester)
-class StudentSemesterAdmin(admin.ModelAdmin):
+class StudentSemesterAdmin(LargeTableAdmin):
     list_display = ['student', 'session', 'semester', 'is_enrolled']
     list_filter = ['session', 'semester', 'is_enrolled']
-    
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "major_course":
-            kwargs["queryset"] = Subject.objects.filter(course_type='MAJOR')
-        elif db_field.name == "minor_course":
-            kwargs["queryset"] = Subject.objects.filter(course_type='MINOR')
-        elif db_field.name == "md1":
-            kwargs["queryset"] = Subject.objects.filter(course_type='MD1')
-        elif db_field.name == "md2":
-            kwargs["queryset"] = Subject.objects.filter(course_type='MD2')
-        elif db_field.name == "skill":
-            kwargs["queryset"] = Subject.objects.filter(course_type='SKILL')
-        elif db_field.name == "vac1":
-            kwargs["queryset"] = Subject.objects.filter(course_type='VAC1')
-        elif db_field.name == "vac2":
-            kwargs["queryset"] = Subject.objects.filter(course_type='VAC2')
-        elif db_field.name == "aec":
-            kwargs["queryset"] = Subject.objects.filter(course_type='AEC')
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+    search_fields = ['student__student_name', 'student__u_registration_no', 'student__class_roll_no']
+    # __str__ of the record and of its student and session
+    list_select_related = ['student', 'session', 'semester']
+    autocomplete_fields = ['student']
+
+    form = StudentSemesterForm
+    fields = ['student', 'session', 'semester', *COURSE_SLOTS, 'is_enrolled', 'enrollment_date']
+    subjects_per_page = 20
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        for slot, course_type in COURSE_SLOTS.items():
+            form.base_fields[slot] = SubjectChoiceField(
+                course_type, label=form.base_fields[slot].label,
+                widget=SubjectAutocomplete(course_type, self.admin_site),
+            )
+        return form
+
+    def get_urls(self):
+        return [
+            path('subjects/<str:course_type>/', self.admin_site.admin_view(self.subject_autocomplete),
+                 name='studentcorner_studentsemester_subjects'),
+            *super().get_urls(),
+        ]
+
+    def subject_autocomplete(self, request, course_type):
+        """Select2 results for a course slot's picker, from the cached subject catalogue"""
+        if course_type not in COURSE_SLOTS.values():
+            raise Http404
+        if not (self.has_add_permission(request) or self.has_change_permission(request)):
+            raise PermissionDenied
+        term = request.GET.get('term', '').strip().lower()
+        found = [
+            subject for subject in caching.subjects_for_course_type(course_type)
+            if term in subject.subject_code.lower() or term in subject.subject_name.lower()
+        ]
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        start = (page - 1) * self.subjects_per_page
+        return JsonResponse({
+            'results': [{'id': str(subject.pk), 'text': str(subject)}
+                        for subject in found[start:start + self.subjects_per_page]],
+            'pagination': {'more': start + self.subjects_per_page < len(found)},
+        })
 
 
 @admin.register(AcademicSession)
@@ -48,24 +130,27 @@ class SubjectAdmin(admin.ModelAdmin):
     list_filter = ('course_type',)
     search_fields = ('subject_code', 'subject_name')
 
+@admin.register(SubjectProgression)
+class SubjectProgressionAdmin(admin.ModelAdmin):
+    list_display = ('semester', 'from_subject', 'to_subject')
+    list_filter = ('semester',)
+    list_select_related = ('semester', 'from_subject', 'to_subject')
+    search_fields = ('from_subject__subject_code', 'to_subject__subject_code')
+
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(LargeTableAdmin):
     list_display = ('student_name', 'u_registration_no', 'class_roll_no', 'batch', 'course_name', 'is_active')
     list_filter = ('batch', 'course_name', 'is_active', 'gender')
     search_fields = ('student_name', 'u_registration_no', 'class_roll_no')
 
-# @admin.register(StudentSemester)
-# class StudentSemesterAdmin(admin.ModelAdmin):
-#     list_display = ('student', 'session', 'semester', 'is_enrolled')
-#     list_filter = ('session', 'semester', 'is_enrolled')
-#     search_fields = ('student__student_name', 'student__u_registration_no')
-
 @admin.register(Certificate)
-class CertificateAdmin(admin.ModelAdmin):
+class CertificateAdmin(LargeTableAdmin):
     list_display = ['certificate_number', 'get_student_name', 'get_registration_no', 'certificate_type', 'issue_date']
     list_filter = ['certificate_type', 'issue_date']
     search_fields = ['certificate_number', 'student__student_name', 'student__u_registration_no']
     fields = ['student', 'certificate_type', 'certificate_number', 'issue_date', 'purpose', 'remarks', 'issued_by']
+    list_select_related = ['student']
+    autocomplete_fields = ['student']
     
     def get_student_name(self, obj):
         return obj.student.student_name
@@ -77,3 +162,17 @@ class CertificateAdmin(admin.ModelAdmin):
     get_registration_no.short_description = 'Registration No'
     get_registration_no.admin_order_field = 'student__u_registration_no'
 
+    def get_search_results(self, request, queryset, search_term):
+        # A full certificate number is an exact lookup on its unique index
+        # rather than a scan with LIKE
+        number = numbering.canonical_number(search_term)
+        if number:
+            return queryset.filter(certificate_number=number), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if not obj.certificate_number:
+                numbering.assign([obj])
+            super().save_model(request, obj, form, change)
+
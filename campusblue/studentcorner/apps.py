@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StudentcornerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'studentcorner'
+
+    def ready(self):
+        from . import database, instrumentation, signals  # noqa: F401
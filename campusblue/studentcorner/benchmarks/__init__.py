@@ -0,0 +1,9 @@
+"""
+Reproducible benchmarks for studentcorner
+
+data generates a synthetic college of any size, scenarios times search,
+issuance, PDF rendering, bulk import and the statistics page on it, and
+runner runs the scenarios at several sizes and checks the JSON results
+against limits and earlier runs. Use `manage.py benchmark`, which builds the
+dataset in a scratch database.
+"""
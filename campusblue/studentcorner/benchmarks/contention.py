@@ -0,0 +1,251 @@
+"""
+Concurrent certificate issuance against SQLite, with and without tuning
+
+Writer threads each issue bonafides as fast as they can, the way the
+bonafide page does: check the student's recent certificates and insert a new
+one in the same transaction. Reader threads look students up meanwhile. With
+SQLite's defaults (rollback journal, deferred transactions) two writers that
+both read first deadlock on the upgrade to a write lock and one fails
+straight away with "database is locked", and readers wait behind writers.
+The tuned profile is the production one: SQLITE_PRAGMAS (busy_timeout, ...)
+with WAL as SQLITE_WAL turns it on, and transaction_mode IMMEDIATE.
+
+stress() checks correctness rather than speed: threads race to issue
+bonafides to a few students, every form submitted twice, and afterwards no
+student may hold two bonafides inside the cooldown.
+"""
+
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from ..database import WAL_PRAGMAS
+from ..eligibility import BONAFIDE_COOLDOWN_DAYS
+from ..issuance import Issuance, issue_bonafide
+from ..models import Certificate, Student
+from .scenarios import percentile
+
+# SQLite's and Django's defaults; journal_mode is stored in the database
+# file, so it has to be switched back explicitly
+DEFAULT_PROFILE = ({'journal_mode': 'DELETE', 'synchronous': 'FULL'}, {})
+
+
+def profiles():
+    """{name: (pragmas, DATABASES OPTIONS)}"""
+    return {
+        'default': DEFAULT_PROFILE,
+        'tuned': ({**WAL_PRAGMAS, **settings.SQLITE_PRAGMAS}, settings.DATABASES['default'].get('OPTIONS', {})),
+    }
+
+
+@contextmanager
+def database_profile(pragmas, options):
+    """New connections, including those of new threads, use ``pragmas`` and ``options``"""
+    settings_dict = connections.settings['default']
+    saved = settings_dict.get('OPTIONS', {})
+    connection.close()
+    settings_dict['OPTIONS'] = dict(options)
+    try:
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            connection.ensure_connection()  # Switch the journal mode while nothing else is connected
+            yield
+    finally:
+        connection.close()
+        settings_dict['OPTIONS'] = saved
+
+
+class Worker(threading.Thread):
+    def __init__(self, action, student_ids, deadline, seed):
+        super().__init__(daemon=True)
+        self.action = action
+        self.student_ids = student_ids
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.locked = 0
+
+    def run(self):
+        try:
+            while time.monotonic() < self.deadline:
+                student_id = self.rng.choice(self.student_ids)
+                started = time.perf_counter()
+                try:
+                    self.action(student_id)
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    self.locked += 1
+                    continue
+                self.latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+
+
+def issue(student_id):
+    today = timezone.now().date()
+    with transaction.atomic():
+        Certificate.objects.filter(
+            student_id=student_id, certificate_type='bonafide',
+            issue_date__gt=today - timedelta(days=BONAFIDE_COOLDOWN_DAYS),
+        ).exists()
+        Certificate.objects.create(
+            student_id=student_id, certificate_type='bonafide', issue_date=today,
+            purpose='Contention benchmark', issued_by='Benchmark',
+        )
+
+
+def look_up(student_id):
+    Student.objects.filter(id=student_id).first()
+    list(Certificate.objects.filter(student_id=student_id).values_list('issue_date', flat=True)[:5])
+
+
+def measure(writers=8, readers=2, seconds=5.0, seed=0):
+    """Issue and look up concurrently for ``seconds`` with the current profile"""
+    student_ids = list(Student.objects.values_list('id', flat=True))
+    deadline = time.monotonic() + seconds
+    threads = (
+        [Worker(issue, student_ids, deadline, f'{seed}:writer:{n}') for n in range(writers)]
+        + [Worker(look_up, student_ids, deadline, f'{seed}:reader:{n}') for n in range(readers)]
+    )
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for kind, group in (('write', threads[:writers]), ('read', threads[writers:])):
+        latencies = [latency for thread in group for latency in thread.latencies]
+        results[f'{kind}s'] = len(latencies)
+        results[f'{kind}s_per_sec'] = round(len(latencies) / elapsed, 1)
+        results[f'{kind}_locked_errors'] = sum(thread.locked for thread in group)
+        results[f'{kind}_p95_ms'] = round(percentile(latencies, 0.95) * 1000, 2) if latencies else None
+    return results
+
+
+def compare(writers=8, readers=2, seconds=5.0, seed=0):
+    """measure() under each profile; {profile: results}"""
+    comparison = {}
+    for name, (pragmas, options) in profiles().items():
+        with database_profile(pragmas, options):
+            comparison[name] = measure(writers, readers, seconds, seed)
+    return comparison
+
+
+def submit(student_id, key):
+    """What the bonafide page does with a submitted issue form"""
+    return issue_bonafide(Student(id=student_id), purpose='Stress test', issued_by='Stress', idempotency_key=key)
+
+
+def submit_naively(student_id, key):
+    """The check-then-insert the page used to do, as separate statements"""
+    today = timezone.now().date()
+    if Certificate.objects.filter(
+        student_id=student_id, certificate_type='bonafide',
+        issue_date__gt=today - timedelta(days=BONAFIDE_COOLDOWN_DAYS),
+    ).exists():
+        return Issuance('cooldown')
+    return Issuance('issued', Certificate.objects.create(
+        student_id=student_id, certificate_type='bonafide', issue_date=today,
+        purpose='Stress test', issued_by='Stress',
+    ), today)
+
+
+def eligible_students(count):
+    """Ids of ``count`` students who may be issued a bonafide today"""
+    recent = Certificate.objects.filter(
+        certificate_type='bonafide',
+        issue_date__gt=timezone.now().date() - timedelta(days=BONAFIDE_COOLDOWN_DAYS),
+    ).values('student_id')
+    return list(Student.objects.exclude(id__in=recent).order_by('id').values_list('id', flat=True)[:count])
+
+
+def cooldown_violations(student_ids):
+    """(student id, earlier date, later date) of bonafides issued inside the cooldown"""
+    dates = defaultdict(list)
+    for student_id, issue_date in (Certificate.objects.filter(student_id__in=student_ids, certificate_type='bonafide')
+                                   .order_by('student_id', 'issue_date').values_list('student_id', 'issue_date')):
+        dates[student_id].append(issue_date)
+    return [
+        (student_id, earlier, later)
+        for student_id, issued in dates.items()
+        for earlier, later in zip(issued, issued[1:])
+        if (later - earlier).days < BONAFIDE_COOLDOWN_DAYS
+    ]
+
+
+def stress(students=10, threads=8, forms=100, naive=False, seed=0):
+    """
+    Submit ``forms`` issue forms, each twice, for ``students`` eligible
+    students from ``threads`` threads at once. Returns outcome counts plus
+    the cooldown violations and the keys whose two submissions ended up with
+    different certificates; both must be empty.
+    """
+    student_ids = eligible_students(students)
+    rng = random.Random(f'{seed}:stress')
+    submissions = [(rng.choice(student_ids), f'stress-{seed}-{n}') for n in range(forms)] * 2
+    rng.shuffle(submissions)
+    pending = queue.SimpleQueue()
+    for submission in submissions:
+        pending.put(submission)
+
+    action = submit_naively if naive else submit
+    outcomes = Counter()
+    certificates = defaultdict(set)
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def work():
+        try:
+            start.wait()
+            while True:
+                try:
+                    student_id, key = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    result = action(student_id, key)
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    result = Issuance('locked')
+                with lock:
+                    outcomes[result.status] += 1
+                    if result.certificate is not None:
+                        certificates[key].add(result.certificate.id)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=work, daemon=True) for _ in range(threads)]
+    # Switch threads as often as possible, so the interleavings that break a
+    # check-then-insert actually happen even on a single core
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    started = time.perf_counter()
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    return {
+        'submissions': len(submissions),
+        'students': len(student_ids),
+        'seconds': round(time.perf_counter() - started, 3),
+        **{status: outcomes[status] for status in ('issued', 'replayed', 'cooldown', 'locked')},
+        'violations': cooldown_violations(student_ids),
+        'split_keys': sorted(key for key, ids in certificates.items() if len(ids) > 1),
+    }
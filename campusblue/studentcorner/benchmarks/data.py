@@ -0,0 +1,225 @@
+"""
+Synthetic college data for benchmarks
+
+Every record is a pure function of the seed and its position: student ``i``
+gets the same name, batch, subjects and certificate history in every run and
+whatever else has been generated. generate() only adds the students missing
+up to the requested size, so one database can grow from 1k to 10k to 100k
+students and each size holds exactly the same rows as a fresh build would.
+"""
+
+import random
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .. import eligibility, lookup, rollup
+from ..models import (
+    AcademicSession, Certificate, Semester, Student, StudentSemester, StudentSubjectEnrollment, Subject,
+)
+
+# The academic year of the current session; fixed so that datasets do not
+# change with the date they are generated on
+REFERENCE_YEAR = 2025
+
+SEMESTERS = [(1, '1st'), (2, '2nd'), (3, '3rd'), (4, '4th'), (5, '5th'), (6, '6th'), (7, '7th'), (8, '8th')]
+
+# (code, name, weight) per course type. Weights skew towards the subjects most
+# students pick, as in the real enrollment sheets.
+SUBJECTS = {
+    'MAJOR': [
+        ('MJ-ENG', 'English', 14), ('MJ-URD', 'Urdu', 12), ('MJ-HIS', 'History', 10),
+        ('MJ-POL', 'Political Science', 10), ('MJ-ECO', 'Economics', 8), ('MJ-EDU', 'Education', 8),
+        ('MJ-GEO', 'Geography', 6), ('MJ-MAT', 'Mathematics', 5), ('MJ-PHY', 'Physics', 4),
+        ('MJ-CHE', 'Chemistry', 4), ('MJ-BOT', 'Botany', 3), ('MJ-ZOO', 'Zoology', 3),
+        ('MJ-CSC', 'Computer Science', 2), ('MJ-KAS', 'Kashmiri', 1),
+    ],
+    'MINOR': [
+        ('MN-ENV', 'Environmental Science', 10), ('MN-HIS', 'History', 8), ('MN-EDU', 'Education', 8),
+        ('MN-SOC', 'Sociology', 6), ('MN-GEO', 'Geography', 5), ('MN-PSY', 'Psychology', 4),
+        ('MN-MAT', 'Mathematics', 3), ('MN-CSC', 'Computer Applications', 2),
+    ],
+    'MD1': [('MD1-HLT', 'Health and Wellness', 5), ('MD1-CUL', 'Culture of Kashmir', 4), ('MD1-ECO', 'Everyday Economics', 3)],
+    'MD2': [('MD2-MED', 'Media Studies', 4), ('MD2-ENT', 'Entrepreneurship', 4), ('MD2-ENV', 'Climate Change', 3)],
+    'SKILL': [
+        ('SK-CMP', 'Computer Fundamentals', 8), ('SK-TAL', 'Tally', 4), ('SK-PHO', 'Photography', 2),
+        ('SK-APC', 'Apiculture', 1),
+    ],
+    'VAC1': [('VAC1-IND', 'Understanding India', 6), ('VAC1-YOG', 'Yoga', 3)],
+    'VAC2': [('VAC2-DGT', 'Digital Literacy', 6), ('VAC2-ETH', 'Ethics and Values', 3)],
+    'AEC': [('AEC-ENG', 'English Communication', 7), ('AEC-URD', 'Urdu Communication', 3)],
+}
+
+FIRST_NAMES = {
+    'M': ['Aamir', 'Bilal', 'Danish', 'Faisal', 'Haris', 'Imran', 'Junaid', 'Mudasir', 'Owais', 'Sajad',
+          'Tariq', 'Umar', 'Waseem', 'Yasir', 'Zahid', 'Adil'],
+    'F': ['Aasiya', 'Bisma', 'Farhana', 'Hina', 'Insha', 'Mehvish', 'Nusrat', 'Rubeena', 'Saima', 'Shazia',
+          'Tabasum', 'Uzma', 'Yasmeena', 'Zainab', 'Iqra', 'Mehak'],
+}
+LAST_NAMES = ['Bhat', 'Dar', 'Lone', 'Mir', 'Malik', 'Shah', 'Wani', 'Ganie', 'Sheikh', 'Rather', 'Khan', 'Parray']
+VILLAGES = ['Zainapora', 'Hermain', 'Kanjiullar', 'Wachi', 'Aglar', 'Rambhama', 'Turkawangam', 'Chitragam']
+COMMUNITIES = [('General', 12), ('OBC', 4), ('ST', 2), ('SC', 1), ('RBA', 3)]
+
+# Share of students holding a bonafide issued within the last year
+BONAFIDE_SHARE = 0.25
+
+
+def batch_years(batches, year=REFERENCE_YEAR):
+    """The ``batches`` intake years still on the rolls in ``year``, oldest first"""
+    return [year - offset for offset in reversed(range(batches))]
+
+
+def session_code(year):
+    return f'{year}-{str(year + 1)[-2:]}'
+
+
+def _weighted(rng, choices):
+    return rng.choices([choice[0] for choice in choices], weights=[choice[-1] for choice in choices])[0]
+
+
+def student_row(seed, index, batches, year=REFERENCE_YEAR):
+    """Student field values for position ``index``"""
+    rng = random.Random(f'{seed}:student:{index}')
+    batch = batch_years(batches, year)[index % batches]
+    gender = rng.choice('MF')
+    surname = rng.choice(LAST_NAMES)
+    return {
+        'reg_form_no': f'BF{index:07d}',
+        'u_registration_no': f'{index + 1}-ZP-{batch}',
+        'class_roll_no': f'{str(batch)[-2:]}{index:06d}',
+        'course_name': 'Bachelor of Arts' if rng.random() < 0.8 else 'Bachelor of Science',
+        'batch': str(batch),
+        'student_name': f'{rng.choice(FIRST_NAMES[gender])} {surname}',
+        'parent_name': f'{rng.choice(FIRST_NAMES["M"])} {surname}',
+        'mother_name': f'{rng.choice(FIRST_NAMES["F"])} {rng.choice(LAST_NAMES)}',
+        'gender': gender,
+        'state': 'J&K',
+        'district': 'Shopian',
+        'village': rng.choice(VILLAGES),
+        'address': rng.choice(VILLAGES),
+        'community': _weighted(rng, COMMUNITIES),
+        'mobile': f'9{rng.randrange(10 ** 9):09d}',
+        'is_active': rng.random() > 0.03,
+        'admission_date': date(batch, 8, 1),
+    }
+
+
+def enrollment_rows(seed, index, batches, year=REFERENCE_YEAR):
+    """
+    (session year, semester number, {slot: subject code}) for every semester
+    the student has reached: two per academic year since the batch started,
+    and only the odd semester of the current year so far. Major and minor
+    stay the same across semesters; the other slots are chosen per semester.
+    """
+    rng = random.Random(f'{seed}:enrollment:{index}')
+    batch = batch_years(batches, year)[index % batches]
+    major = _weighted(rng, SUBJECTS['MAJOR'])
+    minor = _weighted(rng, SUBJECTS['MINOR'])
+    rows = []
+    for session_year in range(batch, year + 1):
+        semester_numbers = [2 * (session_year - batch) + 1, 2 * (session_year - batch) + 2]
+        if session_year == year:
+            semester_numbers = semester_numbers[:1]
+        for number in semester_numbers:
+            if number > len(SEMESTERS):
+                break
+            slots = {'major_course': major, 'minor_course': minor, 'aec': _weighted(rng, SUBJECTS['AEC'])}
+            if number <= 3:
+                slots['md1' if number % 2 else 'md2'] = _weighted(rng, SUBJECTS['MD1' if number % 2 else 'MD2'])
+                slots['vac1' if number % 2 else 'vac2'] = _weighted(rng, SUBJECTS['VAC1' if number % 2 else 'VAC2'])
+            if number <= 6:
+                slots['skill'] = _weighted(rng, SUBJECTS['SKILL'])
+            rows.append((session_year, number, slots))
+    return rows
+
+
+def bonafide_age(seed, index):
+    """Days since the student's last bonafide, or None if they never got one"""
+    rng = random.Random(f'{seed}:bonafide:{index}')
+    return rng.randrange(365) if rng.random() < BONAFIDE_SHARE else None
+
+
+def ensure_reference_data(batches, year=REFERENCE_YEAR):
+    """Sessions, semesters and subjects; returns lookups by session year, semester number and subject code"""
+    AcademicSession.objects.bulk_create(
+        [
+            AcademicSession(
+                session_code=session_code(session_year), start_date=date(session_year, 8, 1),
+                end_date=date(session_year + 1, 7, 31), is_current=session_year == year,
+            )
+            for session_year in batch_years(batches, year)
+        ],
+        ignore_conflicts=True,
+    )
+    Semester.objects.bulk_create(
+        [Semester(semester_number=number, semester_name=name) for number, name in SEMESTERS],
+        ignore_conflicts=True,
+    )
+    Subject.objects.bulk_create(
+        [
+            Subject(subject_code=code, subject_name=name, course_type=course_type)
+            for course_type, subjects in SUBJECTS.items()
+            for code, name, _ in subjects
+        ],
+        ignore_conflicts=True,
+    )
+    sessions = {
+        int(code[:4]): session_id
+        for code, session_id in AcademicSession.objects.values_list('session_code', 'id')
+    }
+    return {
+        'sessions': sessions,
+        'semesters': dict(Semester.objects.values_list('semester_number', 'id')),
+        'subjects': dict(Subject.objects.values_list('subject_code', 'id')),
+    }
+
+
+def generate(students, batches=4, seed=0, year=REFERENCE_YEAR, chunk_size=5000, progress=None):
+    """
+    Grow the database to ``students`` generated students; returns how many
+    were added. Bulk inserts skip the signal handlers, so the lookup and
+    eligibility indexes are filled per chunk and the enrollment rollup is
+    rebuilt at the end.
+    """
+    lookups = ensure_reference_data(batches, year)
+    start = Student.objects.filter(reg_form_no__startswith='BF').count()
+    today = timezone.now().date()
+
+    for chunk_start in range(start, students, chunk_size):
+        indexes = range(chunk_start, min(chunk_start + chunk_size, students))
+        with transaction.atomic():
+            created = Student.objects.bulk_create([Student(**student_row(seed, i, batches, year)) for i in indexes])
+            lookup.index_students(created)
+
+            records, latest = [], {}
+            for i, student in zip(indexes, created):
+                for session_year, number, slots in enrollment_rows(seed, i, batches, year):
+                    record = StudentSemester(
+                        student=student, session_id=lookups['sessions'][session_year],
+                        semester_id=lookups['semesters'][number],
+                        enrollment_date=date(session_year, 8, 1) if number % 2 else date(session_year + 1, 2, 1),
+                        **{f'{slot}_id': lookups['subjects'][code] for slot, code in slots.items()},
+                    )
+                    records.append(record)
+                    latest[i] = record
+            StudentSemester.objects.bulk_create(records, batch_size=2000)
+            StudentSubjectEnrollment.objects.assign({record.pk: record.slot_ids for record in records}, replace=False)
+
+            certificates = []
+            for i, student in zip(indexes, created):
+                age = bonafide_age(seed, i)
+                if age is not None:
+                    issued = today - timedelta(days=age)
+                    certificates.append(Certificate(
+                        student=student, student_semester=latest.get(i), certificate_type='bonafide',
+                        issue_date=issued, purpose='Scholarship', issued_by='Benchmark',
+                    ))
+            Certificate.objects.bulk_create(certificates, batch_size=2000)
+            eligibility.refresh([certificate.student_id for certificate in certificates])
+        if progress:
+            progress(indexes.stop)
+
+    if students > start:
+        rollup.rebuild()
+    return max(students - start, 0)
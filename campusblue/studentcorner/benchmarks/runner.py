@@ -0,0 +1,167 @@
+"""
+Running scenarios across dataset sizes and judging the results
+
+Results are plain JSON: run metadata plus ``{size: {scenario: {metric: value}}}``.
+check() fails a run against fixed limits (a thresholds file mapping
+"size.scenario.metric" or "*.scenario.metric" to {"max": n} / {"min": n}) and
+against an earlier result file, allowing ``tolerance`` in the worse direction.
+"""
+
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+
+from . import data
+from .scenarios import SCENARIOS, Run
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_TOLERANCE = 0.25
+THRESHOLDS_FILE = os.path.join(os.path.dirname(__file__), 'thresholds.json')
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+@contextmanager
+def scratch_database(path=None, keep=False):
+    """
+    Point the default connection at a freshly migrated database (a file,
+    ``path`` or a temporary one, for SQLite) with its own cache and file
+    stores, and drop it afterwards unless ``keep``. Yields the scratch
+    directory.
+    """
+    scratch = tempfile.mkdtemp(prefix='studentcorner-benchmark-')
+    if path:
+        connection.settings_dict['TEST']['NAME'] = path
+    elif connection.vendor == 'sqlite':
+        # A file rather than the in-memory test database, to measure real I/O
+        connection.settings_dict['TEST']['NAME'] = os.path.join(scratch, 'benchmark.sqlite3')
+
+    isolated = override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                            'LOCATION': 'studentcorner-benchmark'}},
+        BONAFIDE_PDF_CACHE_DIR=os.path.join(scratch, 'pdf_cache'),
+        PERF_METRICS_DIR=os.path.join(scratch, 'perf_metrics'),
+        BONAFIDE_RENDER_WORKERS=0,
+        ALLOWED_HOSTS=['testserver'],
+        # DEBUG keeps every query in memory, which skews timings
+        DEBUG=False,
+    )
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keep)
+    try:
+        with isolated:
+            yield scratch
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def metadata(seed, batches, repeats):
+    return {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'seed': seed,
+        'batches': batches,
+        'repeats': repeats,
+    }
+
+
+def run(sizes=DEFAULT_SIZES, scenarios=None, seed=0, batches=4, repeats=50, progress=None):
+    """Generate each size in turn (smallest first) and time the scenarios on it"""
+    progress = progress or (lambda message: None)
+    scenarios = scenarios or list(SCENARIOS)
+    report = {'meta': metadata(seed, batches, repeats), 'results': {}}
+
+    for size in sorted(sizes):
+        started = time.perf_counter()
+        added = data.generate(size, batches=batches, seed=seed)
+        results = report['results'][str(size)] = {
+            'generate': {'students_added': added, 'seconds': round(time.perf_counter() - started, 3)},
+        }
+        progress(f'{size} students: generated {added} in {results["generate"]["seconds"]:.1f}s')
+
+        current = Run(size=size, seed=seed, batches=batches, repeats=repeats)
+        for name in scenarios:
+            results[name] = SCENARIOS[name](current)
+            progress(f'  {name}: ' + ', '.join(f'{metric} {value}' for metric, value in results[name].items()))
+    return report
+
+
+def flatten(report):
+    """{'size.scenario.metric': value}"""
+    return {
+        f'{size}.{scenario}.{metric}': value
+        for size, scenarios in report['results'].items()
+        for scenario, metrics in scenarios.items()
+        for metric, value in metrics.items()
+    }
+
+
+def lower_is_better(metric):
+    return metric.endswith(('_ms', 'seconds', 'queries'))
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_sec')
+
+
+def check(report, thresholds=None, baseline=None, tolerance=DEFAULT_TOLERANCE):
+    """Human-readable failures; an empty list means the run passed"""
+    failures = []
+    flat = flatten(report)
+
+    for name, value in flat.items():
+        _, scenario_metric = name.split('.', 1)
+        limit = (thresholds or {}).get(name) or (thresholds or {}).get(f'*.{scenario_metric}')
+        if not limit:
+            continue
+        if 'max' in limit and value > limit['max']:
+            failures.append(f'{name} = {value}, above the limit of {limit["max"]}')
+        if 'min' in limit and value < limit['min']:
+            failures.append(f'{name} = {value}, below the limit of {limit["min"]}')
+
+    previous = flatten(baseline) if baseline else {}
+    for name, value in flat.items():
+        before = previous.get(name)
+        if not before:
+            continue
+        if lower_is_better(name) and value > before * (1 + tolerance):
+            failures.append(f'{name} = {value}, up from {before} (more than {tolerance:.0%} worse)')
+        elif higher_is_better(name) and value < before * (1 - tolerance):
+            failures.append(f'{name} = {value}, down from {before} (more than {tolerance:.0%} worse)')
+    return failures
+
+
+def load(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save(report, path):
+    with open(path, 'w') as handle:
+        json.dump(report, handle, indent=2)
+        handle.write('\n')
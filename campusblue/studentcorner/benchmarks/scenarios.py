@@ -0,0 +1,210 @@
+"""
+Timed scenarios over a generated dataset
+
+Each scenario takes a Run and returns flat metrics. Names say which way is
+better: ``*_ms`` and ``*seconds`` are latencies, ``*_per_sec`` throughputs
+and ``*queries`` query counts. Scenarios that write do so inside a
+transaction that is rolled back, so every size is measured on exactly the
+generated data.
+"""
+
+import random
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import caching, importer, lookup, pdf_generator
+from ..issuance import issue_bonafide_bulk, select_students
+from ..models import Certificate, Student
+from . import data
+
+
+@dataclass
+class Run:
+    size: int
+    seed: int = 0
+    batches: int = 4
+    repeats: int = 50
+
+    def rng(self, scenario):
+        return random.Random(f'{self.seed}:{scenario}:{self.size}')
+
+    def sample_indexes(self, scenario, count=None):
+        """Positions of generated students to exercise, the same in every run"""
+        return self.rng(scenario).sample(range(self.size), min(count or self.repeats, self.size))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def timings(values):
+    """p50/p95 in milliseconds and calls per second for per-call latencies in seconds"""
+    return {
+        'p50_ms': round(percentile(values, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+        'ops_per_sec': round(len(values) / sum(values), 1),
+    }
+
+
+def timed_calls(calls):
+    latencies = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def timed_requests(calls):
+    """
+    Latencies and query counts of calls that each make one request. Queries
+    are captured per request because the test client's request_started
+    signal clears the connection's query log. Savepoints are left out: inside
+    rolled_back() they stand in for the BEGIN and COMMIT that are not logged.
+    """
+    latencies, queries = [], []
+    for call in calls:
+        with CaptureQueriesContext(connection) as captured:
+            latencies += timed_calls([call])
+        queries.append(sum('SAVEPOINT' not in query['sql'] for query in captured))
+    return latencies, queries
+
+
+def fetch(client, url, data=None):
+    response = client.post(url, data) if data is not None else client.get(url)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{url} answered {response.status_code}')
+    return response
+
+
+@contextmanager
+def rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def search(run):
+    """Typeahead prefix searches and exact identifier lookups"""
+    terms = []
+    for i in run.sample_indexes('search'):
+        row = data.student_row(run.seed, i, run.batches)
+        terms += [row['class_roll_no'][:5], row['student_name'].split()[0][:3]]
+    exact = [data.student_row(run.seed, i, run.batches)['u_registration_no'] for i in run.sample_indexes('find')]
+
+    metrics = {f'prefix_{name}': value for name, value in timings(timed_calls(
+        [lambda term=term: lookup.search(term, limit=10) for term in terms])).items()}
+    metrics.update({f'exact_{name}': value for name, value in timings(timed_calls(
+        [lambda term=term: lookup.find_student(term) for term in exact])).items()})
+    return metrics
+
+
+def issuance(run):
+    """One certificate at a time through the bonafide page, then a whole batch at once"""
+    client = Client()
+    url = reverse('bonafide_certificate')
+    reg_form_nos = [data.student_row(run.seed, i, run.batches)['reg_form_no'] for i in run.sample_indexes('issuance')]
+    student_ids = list(Student.objects.filter(reg_form_no__in=reg_form_nos).values_list('id', flat=True))
+
+    with rolled_back():
+        latencies, queries = timed_requests([
+            lambda student_id=student_id: fetch(client, url, {'issue_certificate': '1', 'student_id': student_id})
+            for student_id in student_ids
+        ])
+    metrics = {f'single_{name}': value for name, value in timings(latencies).items()}
+    metrics['single_queries'] = round(sum(queries) / len(queries), 1)
+
+    batch = str(data.batch_years(run.batches)[-1])
+    with rolled_back():
+        started = time.perf_counter()
+        issued, skipped = issue_bonafide_bulk(select_students(batch=batch), purpose='Benchmark')
+        seconds = time.perf_counter() - started
+    metrics['bulk_certificates'] = len(issued)
+    metrics['bulk_seconds'] = round(seconds, 3)
+    metrics['bulk_per_sec'] = round(len(issued) / seconds, 1)
+    return metrics
+
+
+def pdf_render(run):
+    """Rendering bonafide PDFs in this process, without the on-disk store or worker pool"""
+    certificates = list(
+        Certificate.objects.filter(certificate_type='bonafide')
+        .select_related('student', 'student_semester__semester').order_by('id')[:run.repeats]
+    )
+    payloads = pdf_generator.bonafide_payloads(certificates)
+    if not payloads:
+        return {}
+    pdf_generator.render_bonafide_payload(payloads[0])  # Fonts and static layer
+    return timings(timed_calls([lambda payload=payload: pdf_generator.render_bonafide_payload(payload)
+                                for payload in payloads]))
+
+
+def bulk_import(run):
+    """Re-importing every student and the current session's enrollments from CSV"""
+    directory = Path(tempfile.mkdtemp())
+    try:
+        students, enrollments = [], []
+        for i in range(run.size):
+            row = data.student_row(run.seed, i, run.batches)
+            students.append(dict(row, gender='Male' if row['gender'] == 'M' else 'Female'))
+            for session_year, number, slots in data.enrollment_rows(run.seed, i, run.batches):
+                if session_year == data.REFERENCE_YEAR:
+                    enrollments.append(dict(
+                        class_roll_no=row['class_roll_no'], session_code=data.session_code(session_year),
+                        semester_number=number, **slots,
+                    ))
+        pd.DataFrame(students).to_csv(directory / 'students.csv', index=False)
+        pd.DataFrame(enrollments).to_csv(directory / 'enrollments.csv', index=False)
+
+        with rolled_back():
+            started = time.perf_counter()
+            results = importer.import_workbooks([directory / 'students.csv', directory / 'enrollments.csv'])
+            seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    rows = sum(result.rows for result in results)
+    return {
+        'rows': rows,
+        'rejected': sum(len(result.rejected) for result in results),
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows / seconds, 1),
+    }
+
+
+def statistics(run):
+    """The statistics page with empty caches and then with warm ones"""
+    client = Client()
+    url = reverse('student_statistics')
+
+    def cold_request():
+        caching.bump(caching.STATISTICS)
+        fetch(client, url)
+
+    cold, queries = timed_requests([cold_request] * run.repeats)
+    warm = timed_calls([lambda: fetch(client, url)] * run.repeats)
+
+    metrics = {f'cold_{name}': value for name, value in timings(cold).items()}
+    metrics['cold_queries'] = round(sum(queries) / len(queries), 1)
+    metrics.update({f'warm_{name}': value for name, value in timings(warm).items()})
+    return metrics
+
+
+SCENARIOS = {
+    'search': search,
+    'issuance': issuance,
+    'pdf_render': pdf_render,
+    'bulk_import': bulk_import,
+    'statistics': statistics,
+}
@@ -0,0 +1,166 @@
+"""
+Version-stamped caching for lookup tables and dashboard data
+
+Cached values live under keys that embed the current version of one or more
+namespaces. Signal handlers bump a namespace when its source data changes,
+which orphans every key built on the old version; nothing is deleted
+explicitly and stale entries simply expire. The backend must be shared by
+all worker processes (file-based, Redis, memcached): with a process-local one
+only the process that saved a change would see the new version.
+"""
+
+import time
+
+from django.core.cache import cache
+
+from .models import AcademicSession, Semester, Student, Subject
+
+# Semester, Subject and AcademicSession rows
+LOOKUPS = 'lookups'
+# Student headcounts and the EnrollmentStats rollup
+STATISTICS = 'statistics'
+
+LOOKUP_TIMEOUT = 60 * 60
+STATISTICS_TIMEOUT = 5 * 60
+
+_MISSING = object()
+
+
+def _version_key(namespace):
+    return f'studentcorner:version:{namespace}'
+
+
+def versions(*namespaces):
+    """Current version of each namespace, as a string usable inside cache keys"""
+    keys = [_version_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Start from the clock so a lost version key never revives old entries
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return '-'.join(str(found[key]) for key in keys)
+
+
+def bump(*namespaces):
+    """Invalidate everything cached under ``namespaces``"""
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def _counter_key(view, outcome):
+    return f'studentcorner:counter:{view}:{outcome}'
+
+
+def record(view, hit):
+    key = _counter_key(view, 'hits' if hit else 'misses')
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def hit_miss_counts(*views):
+    """{view: {'hits': n, 'misses': n}} for the given view names"""
+    keys = {(view, outcome): _counter_key(view, outcome) for view in views for outcome in ('hits', 'misses')}
+    found = cache.get_many(keys.values())
+    counts = {view: {'hits': 0, 'misses': 0} for view in views}
+    for (view, outcome), key in keys.items():
+        counts[view][outcome] = found.get(key, 0)
+    return counts
+
+
+def get_or_set(namespaces, name, compute, timeout, view=None):
+    """
+    Return the cached value of ``name`` for the current versions of
+    ``namespaces``, computing and storing it on a miss. Hits and misses are
+    counted under ``view`` when given.
+    """
+    key = f'studentcorner:{versions(*namespaces)}:{name}'
+    value = cache.get(key, _MISSING)
+    hit = value is not _MISSING
+    if not hit:
+        value = compute()
+        cache.set(key, value, timeout)
+    if view:
+        record(view, hit)
+    return value
+
+
+async def aversions(*namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, time.time_ns(), None)
+            found[key] = await cache.aget(key)
+    return '-'.join(str(found[key]) for key in keys)
+
+
+async def arecord(view, hit):
+    key = _counter_key(view, 'hits' if hit else 'misses')
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+async def aget_or_set(namespaces, name, acompute, timeout, view=None):
+    """get_or_set() for async views; ``acompute`` is a coroutine function"""
+    key = f'studentcorner:{await aversions(*namespaces)}:{name}'
+    value = await cache.aget(key, _MISSING)
+    hit = value is not _MISSING
+    if not hit:
+        value = await acompute()
+        await cache.aset(key, value, timeout)
+    if view:
+        await arecord(view, hit)
+    return value
+
+
+def current_session():
+    """The AcademicSession marked current, or None"""
+    found = get_or_set(
+        (LOOKUPS,), 'current_session',
+        lambda: [AcademicSession.objects.filter(is_current=True).first()],
+        LOOKUP_TIMEOUT,
+    )
+    return found[0]
+
+
+def sessions():
+    return get_or_set((LOOKUPS,), 'sessions', lambda: list(AcademicSession.objects.all()), LOOKUP_TIMEOUT)
+
+
+def batches():
+    """Batches of the active students, for filters"""
+    return get_or_set(
+        (STATISTICS,), 'batches',
+        lambda: list(Student.objects.filter(is_active=True).values_list('batch', flat=True).distinct().order_by('batch')),
+        STATISTICS_TIMEOUT,
+    )
+
+
+def semesters():
+    return get_or_set((LOOKUPS,), 'semesters', lambda: list(Semester.objects.all()), LOOKUP_TIMEOUT)
+
+
+def subject_catalogue():
+    """{course_type: [Subject, ...]} of every subject, loaded with one query"""
+    def load():
+        catalogue = {}
+        for subject in Subject.objects.all():
+            catalogue.setdefault(subject.course_type, []).append(subject)
+        return catalogue
+
+    return get_or_set((LOOKUPS,), 'subject_catalogue', load, LOOKUP_TIMEOUT)
+
+
+def subjects_for_course_type(course_type):
+    return subject_catalogue().get(course_type, [])
@@ -0,0 +1,96 @@
+"""
+SQLite tuning for concurrent use
+
+Every new SQLite connection gets the PRAGMAs in settings.SQLITE_PRAGMAS: a
+busy timeout so writers queue up instead of failing with "database is
+locked", and a larger page cache and memory map. With settings.SQLITE_WAL it
+also gets write-ahead logging, so readers never wait for the writer, and
+synchronous=NORMAL (safe with WAL, and one fsync per checkpoint rather than
+per commit). The journal mode is stored in the database file, so WAL is left
+to the production server rather than switched on by every management
+command. Together with transaction_mode IMMEDIATE in DATABASES OPTIONS, which
+takes the write lock at the start of a transaction instead of failing when a
+read upgrades to a write, concurrent issuance waits its turn instead of
+erroring.
+
+optimize() refreshes the query planner's statistics; run it regularly with
+`manage.py optimize_db`. estimated_count() reads a table's row count from
+those statistics, for when COUNT(*) over a large table is too slow.
+"""
+
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+# Added by SQLITE_WAL unless SQLITE_PRAGMAS sets them itself
+WAL_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}
+
+
+def pragmas():
+    found = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if getattr(settings, 'SQLITE_WAL', False):
+        found = {**WAL_PRAGMAS, **found}
+    return found
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # The raw connection, so this runs before (and outside) any execute wrappers
+    for name, value in pragmas().items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def current_pragmas(alias='default'):
+    """{name: value} of the tuned PRAGMAs as the connection sees them"""
+    with connections[alias].cursor() as cursor:
+        found = {}
+        for name in pragmas():
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            found[name] = row[0] if row else None
+        return found
+
+
+def optimize(alias='default', analyze=False, checkpoint=False):
+    """
+    Run PRAGMA optimize, or a full ANALYZE with ``analyze``, and with
+    ``checkpoint`` copy the write-ahead log back into the database and
+    truncate it. Returns the seconds each step took.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return {}
+    timings = {}
+    with connection.cursor() as cursor:
+        started = time.perf_counter()
+        cursor.execute('ANALYZE' if analyze else 'PRAGMA optimize')
+        timings['analyze' if analyze else 'optimize'] = time.perf_counter() - started
+        if checkpoint:
+            started = time.perf_counter()
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            timings['checkpoint'] = time.perf_counter() - started
+    return timings
+
+
+def estimated_count(model, alias='default'):
+    """
+    Rows in ``model``'s table as of the last ANALYZE (or PRAGMA optimize),
+    or None when there are no statistics for it
+    """
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            return None
+        # Each row's stat starts with the number of rows in the table
+        cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [model._meta.db_table])
+        row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
@@ -0,0 +1,216 @@
+"""
+Certificate rules and the CertificateEligibility index
+
+RULES says, per certificate type, how often it may be issued: at most
+``max_count`` times, ``cooldown_days`` apart, only to students who already
+hold every type in ``requires`` and none in ``excludes``.
+
+Applying them needs a student's whole certificate history, so the outcome is
+stored instead: one CertificateEligibility row per student and certificate
+type, for every student holding any certificate, with the date from which
+another may be issued (or ``blocked``). refresh() recomputes a student's rows
+whenever their certificates change (see signals.py; bulk_create callers call
+it themselves), and checking one student or a whole batch is one indexed
+lookup. Students without rows have no history and get the defaults.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import Certificate, CertificateEligibility
+
+BONAFIDE_COOLDOWN_DAYS = 180
+
+
+@dataclass(frozen=True)
+class Rule:
+    max_count: int = None
+    cooldown_days: int = None
+    requires: tuple = ()
+    excludes: tuple = ()
+
+
+RULES = {
+    'bonafide': Rule(cooldown_days=BONAFIDE_COOLDOWN_DAYS),
+    'marks_sheet': Rule(max_count=1),
+    'degree': Rule(max_count=1),
+    'discharge_cum_character': Rule(max_count=1, requires=('degree',)),
+    # For students who left without passing, so never alongside a degree
+    'character_not_passed': Rule(max_count=1, excludes=('degree',)),
+}
+
+LABELS = dict(Certificate.CERTIFICATE_TYPE_CHOICES)
+
+
+@dataclass
+class Decision:
+    """Whether a certificate type may be issued to a student on a given day"""
+    certificate_type: str
+    allowed: bool
+    issued: int = 0
+    last_issued: date = None
+    eligible_from: date = None
+    reason: str = ''
+
+
+def apply_rule(certificate_type, history):
+    """
+    ``(blocked, eligible_from, reason)`` for ``certificate_type`` given a
+    student's history {certificate type: (count, last issue date)}
+    """
+    rule = RULES[certificate_type]
+    issued, last_issued = history.get(certificate_type, (0, None))
+    for other in rule.excludes:
+        if history.get(other, (0, None))[0]:
+            return True, None, f"Not issued to students who hold a {LABELS[other]} certificate"
+    for other in rule.requires:
+        if not history.get(other, (0, None))[0]:
+            return True, None, f"Requires a {LABELS[other]} certificate first"
+    if rule.max_count is not None and issued >= rule.max_count:
+        return True, None, f"Already issued on {last_issued}. Can only be issued once."
+    if rule.cooldown_days and last_issued is not None:
+        return False, last_issued + timedelta(days=rule.cooldown_days), ''
+    return False, None, ''
+
+
+def decide(row, today):
+    """Decision from a CertificateEligibility row, valid on ``today``"""
+    waiting = row.eligible_from is not None and row.eligible_from > today
+    reason = row.reason
+    if waiting:
+        days = (row.eligible_from - today).days
+        reason = f"Last certificate was issued on {row.last_issued}. Please wait {days} more days."
+    return Decision(
+        certificate_type=row.certificate_type,
+        allowed=not (row.blocked or waiting),
+        issued=row.issued,
+        last_issued=row.last_issued,
+        eligible_from=row.eligible_from,
+        reason=reason,
+    )
+
+
+def default_row(student_id, certificate_type):
+    """The row a student without any certificates would have"""
+    blocked, eligible_from, reason = apply_rule(certificate_type, {})
+    return CertificateEligibility(
+        student_id=student_id, certificate_type=certificate_type,
+        blocked=blocked, eligible_from=eligible_from, reason=reason,
+    )
+
+
+def check(student, certificate_type, today=None):
+    """Decision for one student (one query)"""
+    return check_many([student], certificate_type, today)[getattr(student, 'id', student)]
+
+
+def check_many(students, certificate_type, today=None):
+    """{student id: Decision} for students or student ids (one query)"""
+    today = today or timezone.now().date()
+    ids = [getattr(student, 'id', student) for student in students]
+    rows = {
+        row.student_id: row
+        for row in CertificateEligibility.objects.filter(student_id__in=ids, certificate_type=certificate_type)
+    }
+    return {
+        student_id: decide(rows.get(student_id) or default_row(student_id, certificate_type), today)
+        for student_id in ids
+    }
+
+
+def blocked_ids(students, certificate_type, today=None):
+    """Ids among ``students`` (or student ids) that may not get ``certificate_type`` on ``today`` (one query)"""
+    today = today or timezone.now().date()
+    ids = {getattr(student, 'id', student) for student in students}
+    rows = CertificateEligibility.objects.filter(certificate_type=certificate_type, student_id__in=ids)
+    waiting = Q(blocked=True) | Q(eligible_from__gt=today)
+    if not default_row(None, certificate_type).blocked:
+        return set(rows.filter(waiting).values_list('student_id', flat=True))
+    # Blocked by default, so everyone without a row is blocked too
+    return ids - set(rows.exclude(waiting).values_list('student_id', flat=True))
+
+
+def histories(student_ids=None):
+    """{student id: {certificate type: (count, last issue date)}} from the certificates (one query)"""
+    certificates = Certificate.objects.all()
+    if student_ids is not None:
+        certificates = certificates.filter(student_id__in=student_ids)
+    found = defaultdict(dict)
+    for row in (certificates.values('student_id', 'certificate_type')
+                .annotate(n=Count('id'), last=Max('issue_date')).order_by()):
+        found[row['student_id']][row['certificate_type']] = (row['n'], row['last'])
+    return found
+
+
+def rows_for(student_id, history):
+    rows = []
+    for certificate_type in RULES:
+        blocked, eligible_from, reason = apply_rule(certificate_type, history)
+        issued, last_issued = history.get(certificate_type, (0, None))
+        rows.append(CertificateEligibility(
+            student_id=student_id, certificate_type=certificate_type, issued=issued,
+            last_issued=last_issued, eligible_from=eligible_from, blocked=blocked, reason=reason,
+        ))
+    return rows
+
+
+def refresh(student_ids, chunk_size=500):
+    """Recompute the rows of ``student_ids`` from their certificates"""
+    student_ids = list(student_ids)
+    with transaction.atomic(savepoint=False):
+        for start in range(0, len(student_ids), chunk_size):
+            chunk = student_ids[start:start + chunk_size]
+            found = histories(chunk)
+            gone = [student_id for student_id in chunk if student_id not in found]
+            if gone:
+                CertificateEligibility.objects.filter(student_id__in=gone).delete()
+            rows = [row for student_id, history in found.items() for row in rows_for(student_id, history)]
+            if rows:
+                CertificateEligibility.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=['student', 'certificate_type'],
+                    update_fields=['issued', 'last_issued', 'eligible_from', 'blocked', 'reason'],
+                )
+
+
+def compute():
+    """{(student id, certificate type): (issued, last_issued, eligible_from, blocked)} from the certificates"""
+    return {
+        (row.student_id, row.certificate_type): (row.issued, row.last_issued, row.eligible_from, row.blocked)
+        for student_id, history in histories().items()
+        for row in rows_for(student_id, history)
+    }
+
+
+def stored():
+    return {
+        (row['student_id'], row['certificate_type']): (
+            row['issued'], row['last_issued'], row['eligible_from'], row['blocked'])
+        for row in CertificateEligibility.objects.values(
+            'student_id', 'certificate_type', 'issued', 'last_issued', 'eligible_from', 'blocked')
+    }
+
+
+def differences():
+    """Rows whose stored values disagree with the certificates: key -> (stored, live)"""
+    live, current = compute(), stored()
+    return {
+        key: (current.get(key), live.get(key))
+        for key in live.keys() | current.keys()
+        if current.get(key) != live.get(key)
+    }
+
+
+def rebuild():
+    """Replace the index with rows recomputed from scratch; returns the row count"""
+    rows = [row for student_id, history in histories().items() for row in rows_for(student_id, history)]
+    with transaction.atomic():
+        CertificateEligibility.objects.all().delete()
+        CertificateEligibility.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,256 @@
+"""
+Exports of rosters, enrollments, subject statistics and the certificate
+register as CSV, XLSX or Parquet
+
+Each dataset is one values_list() query read with .iterator(chunk_size), and
+each format writes rows as they arrive: CSV line by line, XLSX through a
+write-only openpyxl workbook and Parquet (pyarrow, optional) one record batch
+per chunk, the latter two spooled to a temporary file. Memory stays flat
+however large the table. Views hand achunks() to a StreamingHttpResponse:
+under ASGI a synchronous iterator would be read into a list before the first
+byte is sent, so each chunk is produced in a thread instead.
+
+The students, enrollments, subjects, sessions and semesters exports have the
+columns importer.py recognises, so exported files import back unchanged
+(import_excel takes .csv, .xlsx and .parquet).
+"""
+
+import csv
+import io
+import tempfile
+from dataclasses import dataclass
+
+import openpyxl
+from asgiref.sync import sync_to_async
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+
+from .importer import STUDENT_TEXT_FIELDS
+from .models import (
+    COURSE_SLOTS, AcademicSession, Certificate, EnrollmentStats, Semester, Student, StudentSemester,
+    StudentSubjectEnrollment, Subject,
+)
+from .rollup import HEADCOUNT
+
+DEFAULT_CHUNK_SIZE = 2000
+FILE_CHUNK_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    title: str
+    # (column, type) with type one of text, int, date, bool
+    columns: tuple
+    queryset: object
+
+    @property
+    def header(self):
+        return [name for name, _ in self.columns]
+
+    def rows(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Rows as tuples, fetched ``chunk_size`` at a time"""
+        return self.queryset().values_list(*self.header).iterator(chunk_size=chunk_size)
+
+
+def sessions():
+    return AcademicSession.objects.order_by('start_date')
+
+
+def semesters():
+    return Semester.objects.order_by('semester_number')
+
+
+def subjects():
+    return Subject.objects.order_by('course_type', 'subject_code')
+
+
+def students():
+    return Student.objects.order_by('class_roll_no')
+
+
+def enrollments():
+    """StudentSemester records with the subject code of every slot"""
+    codes = {
+        slot: Subquery(StudentSubjectEnrollment.objects.filter(
+            student_semester=OuterRef('pk'), course_type=course_type,
+        ).values('subject__subject_code')[:1])
+        for slot, course_type in COURSE_SLOTS.items()
+    }
+    return (
+        StudentSemester.objects
+        .annotate(class_roll_no=F('student__class_roll_no'), session_code=F('session__session_code'),
+                  semester_number=F('semester__semester_number'), **codes)
+        .order_by('student__class_roll_no', 'session__start_date', 'semester__semester_number')
+    )
+
+
+def subject_enrollments():
+    """Active enrollments per session, semester, batch and subject slot, from the rollup"""
+    return (
+        EnrollmentStats.objects.filter(count__gt=0).exclude(course_type=HEADCOUNT)
+        .values('batch', session_code=F('session__session_code'), semester_number=F('semester__semester_number'),
+                slot=F('course_type'), subject_code=F('subject__subject_code'),
+                subject_name=F('subject__subject_name'))
+        .annotate(male=Sum('count', filter=Q(gender='M')),
+                  female=Sum('count', filter=Q(gender='F')), total=Sum('count'))
+        .order_by('session_code', 'semester_number', 'batch', 'slot', 'subject_code')
+    )
+
+
+def certificates():
+    return (
+        Certificate.objects
+        .annotate(class_roll_no=F('student__class_roll_no'), u_registration_no=F('student__u_registration_no'),
+                  student_name=F('student__student_name'), batch=F('student__batch'))
+        .order_by('issue_date', 'id')
+    )
+
+
+DATASETS = {
+    'sessions': Dataset('Sessions', (
+        ('session_code', 'text'), ('start_date', 'date'), ('end_date', 'date'), ('is_current', 'bool'),
+    ), sessions),
+    'semesters': Dataset('Semesters', (('semester_number', 'int'), ('semester_name', 'text')), semesters),
+    'subjects': Dataset('Subjects', (
+        ('subject_code', 'text'), ('subject_name', 'text'), ('course_type', 'text'),
+    ), subjects),
+    'students': Dataset('Student roster', (
+        ('reg_form_no', 'text'), ('class_roll_no', 'text'), ('student_name', 'text'), ('gender', 'text'),
+        *[(name, 'text') for name in STUDENT_TEXT_FIELDS],
+        ('is_active', 'bool'), ('admission_date', 'date'),
+    ), students),
+    'enrollments': Dataset('Enrollments', (
+        ('class_roll_no', 'text'), ('session_code', 'text'), ('semester_number', 'int'),
+        *[(slot, 'text') for slot in COURSE_SLOTS],
+        ('is_enrolled', 'bool'),
+    ), enrollments),
+    'subject_enrollments': Dataset('Enrollments per subject', (
+        ('session_code', 'text'), ('semester_number', 'int'), ('batch', 'text'), ('slot', 'text'),
+        ('subject_code', 'text'), ('subject_name', 'text'), ('male', 'int'), ('female', 'int'), ('total', 'int'),
+    ), subject_enrollments),
+    'certificates': Dataset('Certificate register', (
+        ('certificate_number', 'text'), ('certificate_type', 'text'), ('issue_date', 'date'),
+        ('class_roll_no', 'text'), ('u_registration_no', 'text'), ('student_name', 'text'), ('batch', 'text'),
+        ('purpose', 'text'), ('issued_by', 'text'), ('hard_copy_issued', 'bool'),
+    ), certificates),
+}
+
+# Offered on the statistics page; the rest are there for complete round trips
+REPORTS = ('students', 'enrollments', 'subject_enrollments', 'certificates')
+
+
+def available_formats():
+    formats = ['csv', 'xlsx']
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        formats.append('parquet')
+    return formats
+
+
+def filename(name, format):
+    return f'{name}.{format}'
+
+
+def _csv_value(value):
+    return '' if value is None else value
+
+
+def csv_chunks(dataset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """The CSV file, a few rows per chunk, with a BOM so Excel reads it as UTF-8"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(dataset.header)
+    for count, row in enumerate(dataset.rows(chunk_size), 1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % 100 == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _spooled(write):
+    """Chunks of the file ``write`` fills, from a temporary file"""
+    with tempfile.TemporaryFile() as handle:
+        write(handle)
+        handle.seek(0)
+        while block := handle.read(FILE_CHUNK_SIZE):
+            yield block
+
+
+def xlsx_chunks(dataset, chunk_size=DEFAULT_CHUNK_SIZE):
+    def write(handle):
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet(dataset.title[:31])
+        sheet.append(dataset.header)
+        for row in dataset.rows(chunk_size):
+            sheet.append(row)
+        workbook.save(handle)
+
+    return _spooled(write)
+
+
+def parquet_chunks(dataset, chunk_size=DEFAULT_CHUNK_SIZE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'text': pa.string(), 'int': pa.int64(), 'date': pa.date32(), 'bool': pa.bool_()}
+    schema = pa.schema([(name, types[kind]) for name, kind in dataset.columns])
+
+    def write(handle):
+        with pq.ParquetWriter(handle, schema) as writer:
+            batch = []
+            for row in dataset.rows(chunk_size):
+                batch.append(row)
+                if len(batch) == chunk_size:
+                    writer.write_batch(pa.RecordBatch.from_arrays(list(map(list, zip(*batch))), schema=schema))
+                    batch = []
+            if batch:
+                writer.write_batch(pa.RecordBatch.from_arrays(list(map(list, zip(*batch))), schema=schema))
+
+    return _spooled(write)
+
+
+WRITERS = {'csv': csv_chunks, 'xlsx': xlsx_chunks, 'parquet': parquet_chunks}
+
+
+def chunks(name, format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """The bytes of dataset ``name`` in ``format``, as an iterator of chunks"""
+    if name not in DATASETS:
+        raise ValueError(f'Unknown dataset {name}; choose from {", ".join(DATASETS)}')
+    if format not in available_formats():
+        raise ValueError(f'Cannot export {format}; available: {", ".join(available_formats())}')
+    return WRITERS[format](DATASETS[name], chunk_size)
+
+
+def achunks(name, format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """chunks() as an async iterator, each chunk written in the sync thread that holds the query"""
+    iterator = chunks(name, format, chunk_size)
+
+    async def stream():
+        try:
+            while (chunk := await sync_to_async(next)(iterator, None)) is not None:
+                yield chunk
+        finally:
+            await sync_to_async(iterator.close)()
+
+    return stream()
+
+
+def write(name, format, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Export dataset ``name`` to ``path``; returns the bytes written"""
+    size = 0
+    with open(path, 'wb') as handle:
+        for chunk in chunks(name, format, chunk_size):
+            handle.write(chunk)
+            size += len(chunk)
+    return size
@@ -0,0 +1,123 @@
+import re
+
+from django import forms
+from django.utils.http import urlencode
+
+from . import caching
+from .models import COURSE_SLOTS, AcademicSession, Semester, StudentSemester, Subject
+
+
+class BulkBonafideForm(forms.Form):
+    OUTPUT_CHOICES = [
+        ('pdf', 'Single merged PDF'),
+        ('zip', 'Zip of individual PDFs'),
+    ]
+
+    batch = forms.CharField(max_length=50, required=False)
+    session = forms.ModelChoiceField(
+        queryset=AcademicSession.objects.all(),
+        required=False,
+        help_text='Defaults to the current session when a semester is selected',
+    )
+    semester = forms.ModelChoiceField(queryset=Semester.objects.all(), required=False)
+    roll_numbers = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'rows': 4}),
+        help_text='Class roll numbers separated by commas, spaces or new lines',
+    )
+    purpose = forms.CharField(required=False, widget=forms.Textarea(attrs={'rows': 2}))
+    output = forms.ChoiceField(choices=OUTPUT_CHOICES, initial='pdf')
+
+    def clean_roll_numbers(self):
+        return [roll for roll in re.split(r'[\s,;]+', self.cleaned_data['roll_numbers']) if roll]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not (cleaned_data.get('batch') or cleaned_data.get('semester') or cleaned_data.get('roll_numbers')):
+            raise forms.ValidationError('Select a batch, a semester or enter class roll numbers.')
+        if cleaned_data.get('session') and not cleaned_data.get('semester'):
+            raise forms.ValidationError('A session can only be used together with a semester.')
+        return cleaned_data
+
+
+class SubjectChoiceField(forms.ModelChoiceField):
+    """
+    An optional subject of one course type, checked against the cached
+    subject catalogue rather than with a query
+    """
+    def __init__(self, course_type, **kwargs):
+        self.course_type = course_type
+        kwargs.setdefault('required', False)
+        super().__init__(queryset=Subject.objects.filter(course_type=course_type), **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, Subject):
+            value = value.pk
+        for subject in caching.subjects_for_course_type(self.course_type):
+            if str(subject.pk) == str(value):
+                return subject
+        raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
+
+def slot_field(course_type):
+    return SubjectChoiceField(course_type)
+
+
+class StudentSemesterForm(forms.ModelForm):
+    """
+    StudentSemester with one subject picker per course slot; the slots are
+    stored as StudentSubjectEnrollment rows when the record is saved
+    """
+    major_course = slot_field('MAJOR')
+    minor_course = slot_field('MINOR')
+    md1 = slot_field('MD1')
+    md2 = slot_field('MD2')
+    skill = slot_field('SKILL')
+    vac1 = slot_field('VAC1')
+    vac2 = slot_field('VAC2')
+    aec = slot_field('AEC')
+
+    class Meta:
+        model = StudentSemester
+        fields = ['student', 'session', 'semester', 'is_enrolled', 'enrollment_date']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for slot in COURSE_SLOTS:
+            self.initial.setdefault(slot, getattr(self.instance, f'{slot}_id'))
+
+    def save(self, commit=True):
+        for slot in COURSE_SLOTS:
+            setattr(self.instance, slot, self.cleaned_data.get(slot))
+        return super().save(commit)
+
+
+class SemesterStatsForm(forms.Form):
+    """Filters of the semester drill-down; choices come from the cached lookups"""
+    session = forms.ChoiceField(required=False)
+    batch = forms.ChoiceField(required=False)
+    gender = forms.ChoiceField(choices=[('', 'All'), ('M', 'Male'), ('F', 'Female')], required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['session'].choices = [('', 'All sessions')] + [
+            (session.session_code, session.session_code) for session in caching.sessions()]
+        self.fields['batch'].choices = [('', 'All batches')] + [(batch, batch) for batch in caching.batches()]
+
+    def filters(self):
+        """{session_code, batch, gender} of the chosen filters, for stats.semester_detail()"""
+        if not self.is_valid():
+            return {}
+        return {
+            name: self.cleaned_data[field]
+            for name, field in (('session_code', 'session'), ('batch', 'batch'), ('gender', 'gender'))
+            if self.cleaned_data[field]
+        }
+
+    def query(self):
+        """The chosen filters as a query string, for links that keep them"""
+        if not self.is_valid():
+            return ''
+        return urlencode({field: value for field, value in self.cleaned_data.items() if value})
@@ -1,14 +1,5 @@
-import pandas as pd
-from studentcorner.models import AcademicSession
+# Kept for `python manage.py shell < studentcorner/import.py`; the import
+# itself lives in studentcorner/importer.py (see `manage.py import_excel --help`)
+from django.core.management import call_command
 
-df = pd.read_excel('../excel_data/Session.xlsx')
-
-for index, row in df.iterrows():
-    AcademicSession.objects.create(
-        session_code=row['session_code'],
-        start_date=pd.to_datetime(row['start_date']).date(),
-        end_date=pd.to_datetime(row['end_date']).date(),
-        is_current=bool(row.get('is_current', False))
-    )
-
-print("Import complete!")
\ No newline at end of file
+call_command('import_excel')
@@ -0,0 +1,500 @@
+"""
+Bulk import of the admission spreadsheets in excel_data/
+
+Each sheet is recognised by its columns, normalised and validated column-wise
+with pandas, has its foreign keys resolved through in-memory dicts, and is
+upserted with chunked bulk_create(update_conflicts=True). Sheets are imported
+in dependency order: sessions, semesters, subjects, students, enrollments.
+
+import_workbooks() reads each sheet whole. stream_workbooks() reads rows with
+openpyxl in read-only mode (or csv, or pyarrow for the Parquet files
+exports.py writes) and commits fixed-size chunks, each in its
+own transaction together with an ImportCheckpoint, so memory stays bounded and
+an interrupted import resumes after the last committed chunk.
+"""
+
+import csv
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+import openpyxl
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching, lookup, rollup
+from .models import (
+    COURSE_SLOTS, AcademicSession, ImportCheckpoint, Semester, Student, StudentSemester,
+    StudentSubjectEnrollment, Subject,
+)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Columns that identify each kind of sheet
+SHEET_KINDS = {
+    'sessions': {'session_code', 'start_date', 'end_date'},
+    'semesters': {'semester_number', 'semester_name'},
+    'subjects': {'subject_code', 'subject_name', 'course_type'},
+    'enrollments': {'class_roll_no', 'session_code', 'semester_number'},
+    'students': {'reg_form_no', 'class_roll_no', 'student_name'},
+}
+
+IMPORT_ORDER = ['sessions', 'semesters', 'subjects', 'students', 'enrollments']
+
+STUDENT_TEXT_FIELDS = [
+    'u_registration_no', 'course_name', 'batch', 'parent_name', 'mother_name', 'state', 'district',
+    'tehsil', 'constituency', 'province', 'village', 'address', 'community', 'mobile', 'email_id',
+]
+# Student columns that are NOT NULL in the database; blanks become ''
+STUDENT_REQUIRED_TEXT = [
+    'course_name', 'batch', 'parent_name', 'mother_name', 'state', 'district', 'address', 'community', 'mobile',
+]
+
+
+@dataclass
+class ImportResult:
+    source: str
+    kind: str
+    rows: int = 0
+    imported: int = 0
+    rejected: list = field(default_factory=list)  # (spreadsheet row number, reason)
+    seconds: float = 0.0
+    # Streaming imports: rows already committed by an earlier run
+    resumed_from: int = 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def detect_kind(columns):
+    columns = set(columns)
+    for kind, required in SHEET_KINDS.items():
+        if required <= columns:
+            return kind
+    return None
+
+
+def text(series):
+    """Strings without surrounding blanks; 1404.0 -> '1404'; blanks -> <NA>"""
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if (values % 1 == 0).all():
+            series = series.astype('Int64')
+    elif series.dtype == object:
+        series = series.map(lambda value: int(value) if isinstance(value, float) and value.is_integer() else value)
+    series = series.astype('string').str.strip()
+    return series.mask(series == '', pd.NA)
+
+
+def flag(series, default):
+    """Spreadsheet booleans (True/'yes'/1) as bool, blanks as ``default``"""
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype(bool)
+    lowered = series.astype('string').str.strip().str.lower()
+    return lowered.isin(['true', '1', '1.0', 'yes', 'y']).where(lowered.notna(), default).astype(bool)
+
+
+def dates(series, default=None):
+    parsed = pd.to_datetime(series, errors='coerce', dayfirst=False)
+    values = parsed.dt.date.astype(object)
+    if default is not None:
+        values = values.where(parsed.notna(), default)
+    return values.where(parsed.notna() | (default is not None), None)
+
+
+class Validator:
+    """Collects the first failure reason per row"""
+
+    def __init__(self, frame):
+        self.reasons = pd.Series('', index=frame.index, dtype=object)
+
+    def check(self, failed, reason):
+        self.reasons = self.reasons.mask(failed & (self.reasons == ''), reason)
+
+    @property
+    def valid(self):
+        return self.reasons == ''
+
+    def rejected(self):
+        bad = self.reasons[~self.valid]
+        # +2: one for the header row, one because spreadsheets count from 1
+        return [(int(index) + 2, reason) for index, reason in bad.items()]
+
+
+def records(frame):
+    """Rows as dicts with pandas missing values turned into None"""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+def prepare_sessions(frame):
+    out = pd.DataFrame(index=frame.index)
+    out['session_code'] = text(frame['session_code'])
+    out['start_date'] = dates(frame['start_date'])
+    out['end_date'] = dates(frame['end_date'])
+    out['is_current'] = flag(frame['is_current'], False) if 'is_current' in frame else False
+
+    v = Validator(out)
+    v.check(out['session_code'].isna(), 'missing session_code')
+    v.check(out['start_date'].isna() | out['end_date'].isna(), 'invalid start_date/end_date')
+    return out, v
+
+
+def prepare_semesters(frame):
+    out = pd.DataFrame(index=frame.index)
+    out['semester_number'] = pd.to_numeric(frame['semester_number'], errors='coerce').astype('Int64')
+    out['semester_name'] = text(frame['semester_name'])
+
+    v = Validator(out)
+    v.check(out['semester_number'].isna(), 'invalid semester_number')
+    v.check(out['semester_name'].isna(), 'missing semester_name')
+    return out, v
+
+
+def prepare_subjects(frame):
+    out = pd.DataFrame(index=frame.index)
+    out['subject_code'] = text(frame['subject_code'])
+    out['subject_name'] = text(frame['subject_name'])
+    out['course_type'] = text(frame['course_type']).str.upper()
+
+    v = Validator(out)
+    v.check(out['subject_code'].isna(), 'missing subject_code')
+    v.check(out['subject_name'].isna(), 'missing subject_name')
+    valid_types = [choice for choice, _ in Subject.COURSE_TYPE_CHOICES]
+    v.check(~out['course_type'].isin(valid_types).fillna(False).astype(bool), 'unknown course_type')
+    return out, v
+
+
+def prepare_students(frame):
+    out = pd.DataFrame(index=frame.index)
+    out['reg_form_no'] = text(frame['reg_form_no'])
+    out['class_roll_no'] = text(frame['class_roll_no'])
+    out['student_name'] = text(frame['student_name'])
+    for name in STUDENT_TEXT_FIELDS:
+        out[name] = text(frame[name]) if name in frame else pd.Series(pd.NA, index=frame.index, dtype='string')
+    for name in STUDENT_REQUIRED_TEXT:
+        out[name] = out[name].fillna('')
+    out['gender'] = text(frame['gender']).str.upper().str[0] if 'gender' in frame else pd.NA
+    out['is_active'] = flag(frame['is_active'], True) if 'is_active' in frame else True
+    today = timezone.now().date()
+    out['admission_date'] = dates(frame['admission_date'], today) if 'admission_date' in frame else today
+
+    v = Validator(out)
+    v.check(out['reg_form_no'].isna(), 'missing reg_form_no')
+    v.check(out['class_roll_no'].isna(), 'missing class_roll_no')
+    v.check(out['student_name'].isna(), 'missing student_name')
+    v.check(~out['gender'].isin(['M', 'F']).fillna(False).astype(bool), 'gender must be male or female')
+    return out, v
+
+
+def prepare_enrollments(frame, lookups):
+    out = pd.DataFrame(index=frame.index)
+    v = Validator(out)
+
+    roll = text(frame['class_roll_no'])
+    out['student_id'] = roll.map(lookups['students']).astype('Int64')
+    v.check(out['student_id'].isna(), 'unknown class_roll_no')
+
+    out['session_id'] = text(frame['session_code']).map(lookups['sessions']).astype('Int64')
+    v.check(out['session_id'].isna(), 'unknown session_code')
+
+    semester_number = pd.to_numeric(frame['semester_number'], errors='coerce').astype('Int64')
+    out['semester_id'] = semester_number.map(lookups['semesters']).astype('Int64')
+    v.check(out['semester_id'].isna(), 'unknown semester_number')
+
+    # Slots without a column are left out, so the import keeps their subjects
+    for slot in COURSE_SLOTS:
+        if slot not in frame:
+            continue
+        codes = text(frame[slot])
+        out[f'{slot}_id'] = codes.map(lookups['subjects']).astype('Int64')
+        v.check(codes.notna() & out[f'{slot}_id'].isna(), f'unknown subject code in {slot}')
+
+    out['is_enrolled'] = flag(frame['is_enrolled'], True) if 'is_enrolled' in frame else True
+    return out, v
+
+
+# Sheet column each enrollment lookup is keyed by
+LOOKUP_KEYS = {
+    'sessions': 'session_code', 'semesters': 'semester_number', 'subjects': 'subject_code', 'students': 'class_roll_no',
+}
+# Stands in for the id of a row a dry run validated but did not insert
+PENDING_ID = 0
+
+
+def enrollment_lookups():
+    """In-memory foreign key maps for enrollment rows, one query per table"""
+    return {
+        'students': dict(Student.objects.values_list('class_roll_no', 'id')),
+        'sessions': dict(AcademicSession.objects.values_list('session_code', 'id')),
+        'semesters': dict(Semester.objects.values_list('semester_number', 'id')),
+        'subjects': dict(Subject.objects.values_list('subject_code', 'id')),
+    }
+
+
+UPSERTS = {
+    'sessions': (AcademicSession, ['session_code'], ['start_date', 'end_date', 'is_current']),
+    'semesters': (Semester, ['semester_number'], ['semester_name']),
+    'subjects': (Subject, ['subject_code'], ['subject_name', 'course_type']),
+    'students': (
+        Student, ['reg_form_no'],
+        ['class_roll_no', 'student_name', 'gender', 'is_active', 'admission_date', 'updated_at'] + STUDENT_TEXT_FIELDS,
+    ),
+    'enrollments': (
+        StudentSemester, ['student', 'session', 'semester'],
+        ['is_enrolled', 'updated_at'],
+    ),
+}
+
+
+def prepare(kind, frame, lookups=None):
+    """Normalise and validate ``frame``; returns (valid rows as a DataFrame, rejected)"""
+    if kind == 'enrollments':
+        out, v = prepare_enrollments(frame, lookups or enrollment_lookups())
+    else:
+        out, v = globals()[f'prepare_{kind}'](frame)
+
+    valid = out[v.valid]
+    unique_fields = [f if kind != 'enrollments' else f'{f}_id' for f in UPSERTS[kind][1]]
+    valid = valid.drop_duplicates(subset=unique_fields, keep='last')
+    rejected = v.rejected()
+
+    if kind == 'students':
+        clashes = student_conflicts(valid)
+        valid = valid.drop(clashes.index)
+        rejected = sorted(rejected + [(int(index) + 2, reason) for index, reason in clashes.items()])
+    return valid, rejected
+
+
+def student_conflicts(frame):
+    """
+    Reasons, by row, for rows whose class roll no or registration no belongs
+    to another student, in the database or elsewhere in ``frame``. Students
+    are upserted by reg_form_no, so these would fail the other unique
+    constraints.
+    """
+    reasons = pd.Series(dtype=object)
+    for column in ('class_roll_no', 'u_registration_no'):
+        values = list(frame[column].dropna())
+        owners = {}
+        for start in range(0, len(values), DEFAULT_CHUNK_SIZE):
+            owners.update(Student.objects.filter(
+                **{f'{column}__in': values[start:start + DEFAULT_CHUNK_SIZE]}
+            ).values_list(column, 'reg_form_no'))
+        owner = frame[column].map(owners)
+        taken = owner.notna() & (owner != frame['reg_form_no']).fillna(False).astype(bool)
+        repeated = frame[column].notna() & frame.duplicated(subset=[column], keep=False)
+        clashes = frame.index[(taken | repeated).fillna(False).astype(bool)].difference(reasons.index)
+        reasons = pd.concat([reasons, pd.Series(f'{column} belongs to another student', index=clashes)])
+    return reasons
+
+
+def upsert(kind, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Insert or update ``rows`` (dicts of model field values) in chunks"""
+    model, unique_fields, update_fields = UPSERTS[kind]
+    objs = [model(**row) for row in rows]
+    # An enrollment sheet replaces only the slots it has a column for
+    slots = [slot for slot in COURSE_SLOTS if f'{slot}_id' in rows[0]] if kind == 'enrollments' and rows else []
+    for start in range(0, len(objs), chunk_size):
+        chunk = objs[start:start + chunk_size]
+        model.objects.bulk_create(
+            chunk,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+        if slots:
+            StudentSubjectEnrollment.objects.assign(
+                {record.pk: record.slot_ids for record in chunk}, slots=slots)
+    return objs
+
+
+def refresh_derived(kinds, student_reg_form_nos=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """Bring the indexes that signals normally maintain up to date after a bulk import"""
+    kinds = set(kinds)
+    if kinds & {'sessions', 'semesters', 'subjects'}:
+        caching.bump(caching.LOOKUPS)
+    reg_form_nos = list(student_reg_form_nos)
+    for start in range(0, len(reg_form_nos), chunk_size):
+        lookup.index_students(Student.objects.filter(reg_form_no__in=reg_form_nos[start:start + chunk_size]))
+    if kinds & {'students', 'enrollments'}:
+        rollup.rebuild()
+
+
+def import_frame(kind, frame, source='', chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, lookups=None):
+    start = time.perf_counter()
+    result = ImportResult(source=source, kind=kind, rows=len(frame))
+
+    valid, result.rejected = prepare(kind, frame, lookups)
+    if not dry_run:
+        with transaction.atomic():
+            upsert(kind, records(valid), chunk_size)
+        result.imported = len(valid)
+
+    result.seconds = time.perf_counter() - start
+    return result, valid
+
+
+def read_sheets(paths):
+    """(source, kind, DataFrame) for every recognised sheet, in import order"""
+    found = []
+    for path in paths:
+        if path.suffix.lower() == '.csv':
+            sheets = {'csv': pd.read_csv(path, encoding='utf-8-sig')}
+        elif path.suffix.lower() == '.parquet':
+            sheets = {'parquet': pd.read_parquet(path)}
+        else:
+            sheets = pd.read_excel(path, sheet_name=None)
+        for sheet_name, frame in sheets.items():
+            frame = frame.dropna(how='all')
+            kind = detect_kind(frame.columns)
+            if kind and len(frame):
+                found.append((f'{path.name} [{sheet_name}]', kind, frame))
+    return sorted(found, key=lambda item: IMPORT_ORDER.index(item[1]))
+
+
+def import_workbooks(paths, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    results = []
+    reg_form_nos = []
+    # A dry run writes nothing, so enrollments resolve against the database
+    # plus the rows validated in the earlier sheets
+    lookups = enrollment_lookups() if dry_run else None
+    for source, kind, frame in read_sheets(paths):
+        result, valid = import_frame(kind, frame, source, chunk_size, dry_run, lookups)
+        results.append(result)
+        if kind == 'students':
+            reg_form_nos.extend(valid['reg_form_no'])
+        if dry_run and kind in LOOKUP_KEYS:
+            for key in valid[LOOKUP_KEYS[kind]]:
+                lookups[kind].setdefault(key, PENDING_ID)
+
+    if not dry_run:
+        refresh_derived([result.kind for result in results if result.imported], reg_form_nos, chunk_size)
+    return results
+
+
+def sheet_rows(path, sheet):
+    """Header and data rows of one sheet, read lazily"""
+    if path.suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            yield from csv.reader(handle)
+        return
+    if path.suffix.lower() == '.parquet':
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        yield parquet.schema_arrow.names
+        for batch in parquet.iter_batches():
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+        return
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook[sheet].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def sheet_names(path):
+    if path.suffix.lower() in ('.csv', '.parquet'):
+        return [path.suffix.lower()[1:]]
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def plan_sheets(paths):
+    """(path, sheet, kind, header) for every recognised sheet, in import order, from header rows only"""
+    found = []
+    for path in paths:
+        for sheet in sheet_names(path):
+            header = next(sheet_rows(path, sheet), None) or ()
+            header = [str(name).strip() if name is not None else '' for name in header]
+            kind = detect_kind(header)
+            if kind:
+                found.append((path, sheet, kind, header))
+    return sorted(found, key=lambda item: IMPORT_ORDER.index(item[2]))
+
+
+def fingerprint(path):
+    stat = path.stat()
+    return f'{stat.st_size}-{stat.st_mtime_ns}'
+
+
+def chunks(rows, size, start=0):
+    """
+    Lists of (row index, values) holding ``size`` consecutive rows each, blank
+    rows left out. Indexes count data rows from 0 like DataFrame indexes.
+    """
+    index = start
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield index + len(batch), [
+            (index + offset, values) for offset, values in enumerate(batch)
+            if any(value not in (None, '') for value in values)
+        ]
+        index += len(batch)
+
+
+def stream_sheet(path, sheet, kind, header, chunk_size=DEFAULT_CHUNK_SIZE, restart=False, progress=None):
+    """
+    Import one sheet chunk by chunk, resuming after the rows a previous run
+    committed unless ``restart`` or the file has changed since
+    """
+    started = time.perf_counter()
+    checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+        source=str(path.resolve()), sheet=sheet, defaults={'fingerprint': fingerprint(path)},
+    )
+    if restart or checkpoint.fingerprint != fingerprint(path):
+        checkpoint.fingerprint, checkpoint.rows_done, checkpoint.completed = fingerprint(path), 0, False
+        checkpoint.save()
+
+    result = ImportResult(source=f'{path.name} [{sheet}]', kind=kind, resumed_from=checkpoint.rows_done)
+    if checkpoint.completed:
+        return result
+
+    width = len(header)
+    lookups = enrollment_lookups() if kind == 'enrollments' else None
+    # Skip the header and the rows committed by an earlier run
+    rows = islice(sheet_rows(path, sheet), 1 + checkpoint.rows_done, None)
+    for rows_done, batch in chunks(rows, chunk_size, checkpoint.rows_done):
+        frame = pd.DataFrame(
+            [(tuple(values) + (None,) * width)[:width] for _, values in batch],
+            columns=header, index=[index for index, _ in batch], dtype=object,
+        ).replace('', None)
+        valid, rejected = prepare(kind, frame, lookups)
+
+        with transaction.atomic():
+            upsert(kind, records(valid), chunk_size)
+            if kind == 'students':
+                lookup.index_students(Student.objects.filter(reg_form_no__in=list(valid['reg_form_no'])))
+            checkpoint.rows_done = rows_done
+            checkpoint.save(update_fields=['rows_done', 'updated_at'])
+
+        result.rows += len(batch)
+        result.imported += len(valid)
+        result.rejected.extend(rejected)
+        result.seconds = time.perf_counter() - started
+        if progress:
+            progress(result, rows_done)
+
+    checkpoint.completed = True
+    checkpoint.save(update_fields=['completed', 'updated_at'])
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def stream_workbooks(paths, chunk_size=DEFAULT_CHUNK_SIZE, restart=False, progress=None):
+    results = [
+        stream_sheet(path, sheet, kind, header, chunk_size, restart, progress)
+        for path, sheet, kind, header in plan_sheets(paths)
+    ]
+    # Students were indexed chunk by chunk; the rollup and cache versions follow
+    # here, also for sheets an interrupted earlier run committed
+    refresh_derived([result.kind for result in results if result.rows or result.resumed_from], (), chunk_size)
+    return results
@@ -0,0 +1,412 @@
+"""
+Per-view latency and query instrumentation
+
+RequestTimingMiddleware measures every request that resolves to a view: wall
+time, time spent in the database, the number of queries, how many of them
+repeated an earlier query of the same request verbatim, and time spent on
+certificate renders (code wraps those in ``timed('pdf')``). The breakdown is
+sent in a Server-Timing header and appended to a per-view ring buffer holding
+the last PERF_BUFFER_SIZE requests, from which the performance dashboard
+computes p50/p95/p99. Every PERF_PERSIST_INTERVAL seconds a background thread
+writes the process's buffers to PERF_METRICS_DIR/<host>-<pid>.json, off the
+request path, so the dashboard can combine all worker processes and the
+numbers outlive a restart.
+
+``?profile=1`` (staff users, or anyone with DEBUG on) samples the stacks of
+every busy thread while the request runs and answers with the call tree
+instead of the page. Threads serving other requests are sampled too, so
+profile on a quiet instance.
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+DEFAULT_BUFFER_SIZE = 1000
+DEFAULT_PERSIST_INTERVAL = 60
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+PROFILE_INTERVAL = 0.001
+# A thread whose innermost Python frame is in one of these is waiting, not working
+IDLE_MODULES = (
+    'threading.py', 'selectors.py', 'queue.py', 'socketserver.py',
+    os.path.join('concurrent', 'futures', 'thread.py'),
+    os.path.join('multiprocessing', 'connection.py'),
+)
+
+
+def buffer_size():
+    return getattr(settings, 'PERF_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+
+
+def metrics_dir():
+    return Path(getattr(settings, 'PERF_METRICS_DIR', Path(settings.BASE_DIR) / 'perf_metrics'))
+
+
+def persist_interval():
+    return getattr(settings, 'PERF_PERSIST_INTERVAL', DEFAULT_PERSIST_INTERVAL)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class RequestMetrics:
+    """Timings of the request being served (seconds)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.pdf = 0.0
+        self.queries = 0
+        self.duplicates = 0
+        self._seen = set()
+
+    def execute(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() hook"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+            statement = (sql, repr(params))
+            if statement in self._seen:
+                self.duplicates += 1
+            else:
+                self._seen.add(statement)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def sample(self, wall, status):
+        """A ring buffer entry; times in milliseconds"""
+        return {
+            'at': time.time(),
+            'status': status,
+            'wall': round(wall * 1000, 2),
+            'db': round(self.db * 1000, 2),
+            'pdf': round(self.pdf * 1000, 2),
+            'queries': self.queries,
+            'duplicates': self.duplicates,
+        }
+
+    def server_timing(self, wall):
+        parts = [f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries, {self.duplicates} duplicate"']
+        if self.pdf:
+            parts.append(f'pdf;dur={self.pdf * 1000:.1f}')
+        parts.append(f'total;dur={wall * 1000:.1f}')
+        return ', '.join(parts)
+
+
+_current = ContextVar('studentcorner_request_metrics', default=None)
+
+
+def _execute(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_hook(sender, connection, **kwargs):
+    """
+    Count queries on every connection. Async views run their queries on
+    another thread with its own connection; the context variable follows
+    them there, so the hook is installed per connection, not per request.
+    """
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+@contextmanager
+def timed(part):
+    """Add the time spent in the block to ``part`` ('pdf') of the current request, if any"""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            setattr(metrics, part, getattr(metrics, part) + time.perf_counter() - started)
+
+
+# Ring buffers of this process, by view name
+_buffers = defaultdict(lambda: deque(maxlen=buffer_size()))
+_buffers_lock = threading.Lock()
+# Thread saving the buffers; started by the first sample (again after a fork)
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def record(view, sample):
+    with _buffers_lock:
+        _buffers[view].append(sample)
+    if _flusher is None or not _flusher.is_alive():
+        start_flusher()
+
+
+def start_flusher():
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_periodically, name='studentcorner-metrics', daemon=True)
+            _flusher.start()
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(persist_interval())
+        try:
+            persist()
+        except OSError:
+            pass  # Read-only or full disk; the samples stay in memory until the next round
+
+
+def snapshot():
+    """{view: [sample, ...]} recorded by this process"""
+    with _buffers_lock:
+        return {view: list(samples) for view, samples in _buffers.items()}
+
+
+def reset():
+    with _buffers_lock:
+        _buffers.clear()
+
+
+def _own_file():
+    return metrics_dir() / f'{socket.gethostname()}-{os.getpid()}.json'
+
+
+def persist():
+    """Atomically write this process's buffers to its file in PERF_METRICS_DIR"""
+    path = _own_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {'saved_at': time.time(), 'views': snapshot()}
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as tmp:
+            json.dump(data, tmp)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def collect(max_age=DEFAULT_MAX_AGE):
+    """
+    Samples by view from this process's live buffers plus every file persisted
+    by other processes in the last ``max_age`` seconds
+    """
+    combined = defaultdict(list)
+    own = _own_file()
+    for path in sorted(metrics_dir().glob('*.json')):
+        if path == own:
+            continue
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # Being replaced, or left half-written by a crash
+        if time.time() - data.get('saved_at', 0) > max_age:
+            continue
+        for view, samples in data.get('views', {}).items():
+            combined[view].extend(samples)
+    for view, samples in snapshot().items():
+        combined[view].extend(samples)
+    return combined
+
+
+def summary(max_age=DEFAULT_MAX_AGE):
+    """One row per view with percentiles of each measurement, slowest p95 first"""
+    rows = []
+    for view, samples in collect(max_age).items():
+        if not samples:
+            continue
+        column = lambda name: [sample[name] for sample in samples]
+        wall, db, pdf = column('wall'), column('db'), column('pdf')
+        queries, duplicates = column('queries'), column('duplicates')
+        rows.append({
+            'view': view,
+            'requests': len(samples),
+            'errors': sum(1 for sample in samples if sample['status'] >= 500),
+            'wall_p50': percentile(wall, 0.5),
+            'wall_p95': percentile(wall, 0.95),
+            'wall_p99': percentile(wall, 0.99),
+            'db_p50': percentile(db, 0.5),
+            'db_p95': percentile(db, 0.95),
+            'pdf_p95': percentile(pdf, 0.95),
+            'queries_avg': sum(queries) / len(samples),
+            'queries_max': max(queries),
+            'duplicates_avg': sum(duplicates) / len(samples),
+            'duplicates_max': max(duplicates),
+            'last_seen': max(sample['at'] for sample in samples),
+        })
+    rows.sort(key=lambda row: row['wall_p95'], reverse=True)
+    return rows
+
+
+class StackSampler:
+    """
+    Statistical profiler in the spirit of pyinstrument: a background thread
+    records the Python stack of every busy thread each ``interval`` seconds.
+    Sampling all threads catches work the request hands to sync_to_async
+    threads, which a cProfile of the request thread would miss.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='studentcorner-profiler', daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                if stack[0][1].endswith(IDLE_MODULES):
+                    continue
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def tree(self):
+        """
+        Nested {'count', 'children'} nodes keyed by (function, file, line).
+        Only frames under BASE_DIR are kept, plus the innermost frame of each
+        sample, which shows where outside the project the time went.
+        """
+        project = str(settings.BASE_DIR)
+        root = {'count': 0, 'children': {}}
+        for stack, count in self.stacks.items():
+            root['count'] += count
+            node = root
+            for depth, frame in enumerate(stack):
+                if not (frame[1].startswith(project) or depth == len(stack) - 1):
+                    continue
+                node = node['children'].setdefault(frame, {'count': 0, 'children': {}})
+                node['count'] += count
+        return root
+
+    def format(self, min_fraction=0.01):
+        root = self.tree()
+        total = root['count'] or 1
+        project = str(settings.BASE_DIR)
+        lines = []
+
+        def walk(node, depth):
+            children = sorted(node['children'].items(), key=lambda item: item[1]['count'], reverse=True)
+            for (function, filename, line), child in children:
+                if child['count'] / total < min_fraction:
+                    continue
+                if filename.startswith(project):
+                    filename = os.path.relpath(filename, project)
+                else:
+                    filename = os.path.join(*Path(filename).parts[-2:])
+                lines.append(f"{child['count'] / total:6.1%}  {'  ' * depth}{function}  {filename}:{line}")
+                walk(child, depth + 1)
+
+        walk(root, 0)
+        return '\n'.join(lines)
+
+
+def profile_response(request, response, metrics, wall, sampler):
+    summary = (
+        f"{request.method} {request.get_full_path()} -> {response.status_code} in {wall * 1000:.1f} ms "
+        f"(db {metrics.db * 1000:.1f} ms, {metrics.queries} queries, {metrics.duplicates} duplicate, "
+        f"pdf {metrics.pdf * 1000:.1f} ms)"
+    )
+    header = (
+        f"{sum(sampler.stacks.values())} busy samples every {sampler.interval * 1000:g} ms over "
+        f"{sampler.duration * 1000:.1f} ms; frames outside the project are shown only where the time was spent"
+    )
+    return HttpResponse(f"{summary}\n{header}\n\n{sampler.format()}\n", content_type='text/plain; charset=utf-8')
+
+
+def profiling_allowed(user):
+    return settings.DEBUG or (user is not None and user.is_staff)
+
+
+class RequestTimingMiddleware:
+    """See the module docstring; place it after AuthenticationMiddleware"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profiling = 'profile' in request.GET and profiling_allowed(getattr(request, 'user', None))
+        with self.measure(profiling) as (metrics, sampler):
+            response = self.get_response(request)
+        return self.finish(request, response, metrics, sampler)
+
+    async def __acall__(self, request):
+        profiling = 'profile' in request.GET and profiling_allowed(
+            await request.auser() if hasattr(request, 'auser') else None)
+        with self.measure(profiling) as (metrics, sampler):
+            response = await self.get_response(request)
+        return self.finish(request, response, metrics, sampler)
+
+    @contextmanager
+    def measure(self, profiling):
+        metrics = RequestMetrics()
+        sampler = StackSampler().start() if profiling else None
+        token = _current.set(metrics)
+        try:
+            yield metrics, sampler
+        finally:
+            _current.reset(token)
+            if sampler is not None:
+                sampler.stop()
+
+    def finish(self, request, response, metrics, sampler):
+        wall = metrics.elapsed()
+        if request.resolver_match is not None:
+            record(request.resolver_match.view_name, metrics.sample(wall, response.status_code))
+        if sampler is not None:
+            response = profile_response(request, response, metrics, wall, sampler)
+        response['Server-Timing'] = metrics.server_timing(wall)
+        return response
@@ -0,0 +1,155 @@
+"""
+Bonafide certificate issuance, one student at a time or many at once
+"""
+
+from dataclasses import dataclass
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import eligibility, numbering
+from .models import Certificate, Student, StudentSemester
+
+
+def select_students(batch=None, session=None, semester=None, roll_numbers=None):
+    """Active students matching every selector that was given"""
+    students = Student.objects.filter(is_active=True)
+    if batch:
+        students = students.filter(batch=batch)
+    if roll_numbers:
+        students = students.filter(class_roll_no__in=roll_numbers)
+    if semester:
+        enrolled = StudentSemester.objects.filter(semester=semester, is_enrolled=True)
+        if session:
+            enrolled = enrolled.filter(session=session)
+        students = students.filter(id__in=enrolled.values('student_id'))
+    return students.order_by('class_roll_no')
+
+
+@dataclass
+class Issuance:
+    """Outcome of issue_bonafide()"""
+    # 'issued', 'replayed' (idempotency key seen before), 'cooldown' or
+    # 'conflict' (idempotency key already used for another student)
+    status: str
+    certificate: Certificate = None
+    last_issue_date: date = None
+    decision: eligibility.Decision = None  # Why not, for 'cooldown' and 'conflict'
+
+    @property
+    def issued(self):
+        return self.status in ('issued', 'replayed')
+
+    def days_remaining(self, today=None):
+        today = today or timezone.now().date()
+        return (self.decision.eligible_from - today).days
+
+
+def issue_bonafide(student, student_semester=None, purpose='', remarks='', issued_by='Admin',
+                   idempotency_key=None, today=None):
+    """
+    Issue a bonafide to ``student`` unless they got one within the cooldown.
+
+    The eligibility check and the insert share one transaction that holds
+    the write lock from its first statement (BEGIN IMMEDIATE on SQLite, see
+    DATABASES OPTIONS; a lock on the student row on other databases), so
+    concurrent submissions for a student run one after the other and only the
+    first issues. The check is a single lookup in the eligibility index, which
+    the insert updates in the same transaction. A repeated
+    ``idempotency_key`` returns the certificate it issued the first time; a
+    key already used for another student is refused.
+    """
+    today = today or timezone.now().date()
+    with transaction.atomic():
+        lock_students([student.id])
+
+        if idempotency_key:
+            # Keys are unique across all students, so look the key up on its own
+            previous = Certificate.objects.filter(idempotency_key=idempotency_key).first()
+            if previous is not None and previous.student_id != student.id:
+                return Issuance('conflict', None, None, eligibility.Decision(
+                    'bonafide', False, reason='This form was submitted for another student; search again.'))
+            if previous is not None:
+                return Issuance('replayed', previous, previous.issue_date)
+
+        decision = eligibility.check(student, 'bonafide', today)
+        if not decision.allowed:
+            return Issuance('cooldown', None, decision.last_issued, decision)
+
+        certificate = Certificate(
+            student=student,
+            student_semester=student_semester,
+            certificate_type='bonafide',
+            issue_date=today,
+            purpose=purpose,
+            remarks=remarks,
+            issued_by=issued_by,
+            idempotency_key=idempotency_key or None,
+        )
+        numbering.assign([certificate])
+        certificate.save(force_insert=True)
+    return Issuance('issued', certificate, today)
+
+
+def lock_students(student_ids, batch_size=1000):
+    """
+    Lock the students' rows until the transaction ends, in id order so that
+    overlapping callers cannot deadlock. A no-op on SQLite, where BEGIN
+    IMMEDIATE already serialises writers.
+    """
+    if not connection.features.has_select_for_update:
+        return
+    student_ids = sorted(set(student_ids))
+    for start in range(0, len(student_ids), batch_size):
+        list(Student.objects.select_for_update().filter(
+            id__in=student_ids[start:start + batch_size]).order_by('id').values_list('id'))
+
+
+def latest_semesters(students):
+    """Map student id -> most recent StudentSemester (one query)"""
+    records = StudentSemester.objects.filter(
+        student__in=students
+    ).select_related('semester').order_by('student_id', '-session__start_date')
+
+    latest = {}
+    for record in records:
+        latest.setdefault(record.student_id, record)
+    return latest
+
+
+def issue_bonafide_bulk(students, purpose='', remarks='', issued_by='Admin'):
+    """
+    Issue bonafide certificates to every eligible student in ``students``.
+
+    Returns ``(issued, skipped)``: the created certificates, numbered in one
+    block, with ``student`` and ``student_semester`` attached for rendering,
+    and the students still inside the cooldown window. The students are
+    locked as in issue_bonafide() before their cooldowns are checked.
+    """
+    students = list(students)
+    today = timezone.now().date()
+
+    with transaction.atomic():
+        lock_students([student.id for student in students])
+        blocked = eligibility.blocked_ids(students, 'bonafide', today)
+        eligible = [s for s in students if s.id not in blocked]
+        skipped = [s for s in students if s.id in blocked]
+        semesters = latest_semesters([s.id for s in eligible])
+
+        issued = Certificate.objects.bulk_create(numbering.assign([
+            Certificate(
+                student=student,
+                student_semester=semesters.get(student.id),
+                certificate_type='bonafide',
+                issue_date=today,
+                purpose=purpose,
+                remarks=remarks,
+                issued_by=issued_by,
+            )
+            for student in eligible
+        ]))
+        # bulk_create sends no signals
+        eligibility.refresh([student.id for student in eligible])
+
+    return issued, skipped
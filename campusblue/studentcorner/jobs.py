@@ -0,0 +1,175 @@
+"""
+Database-backed job queue for certificate rendering
+
+Jobs are RenderJob rows. Workers (`manage.py render_jobs work`) poll for
+queued jobs whose run_after has passed and claim one with a conditional
+UPDATE, so several workers can share the table without an external broker.
+A failed attempt is retried with exponential backoff until max_attempts; a
+job left running by a worker that died is queued again once it has been
+running for longer than its lease (BONAFIDE_JOB_LEASE seconds).
+"""
+
+import asyncio
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from . import pdf_cache
+from .models import Certificate, RenderJob
+
+TERMINAL = ('done', 'failed')
+
+DEFAULT_LEASE = 5 * 60
+MAX_RETRY_DELAY = 5 * 60
+
+
+def lease():
+    return timedelta(seconds=getattr(settings, 'BONAFIDE_JOB_LEASE', DEFAULT_LEASE))
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue_bonafide_pdf(certificate):
+    """Queue rendering of ``certificate`` into the PDF store, unless already queued"""
+    pending = RenderJob.objects.filter(
+        kind='bonafide_pdf', certificate=certificate, status__in=['queued', 'running'],
+    ).first()
+    return pending or RenderJob.objects.create(kind='bonafide_pdf', certificate=certificate)
+
+
+def render_bonafide_pdf(job):
+    certificate = Certificate.objects.select_related('student', 'student_semester__semester').get(
+        id=job.certificate_id)
+    _, key = pdf_cache.get_or_render(certificate.student, certificate, certificate.student_semester)
+    return key
+
+
+HANDLERS = {
+    'bonafide_pdf': render_bonafide_pdf,
+}
+
+
+def requeue_expired(now=None):
+    """Put back jobs running for longer than the lease; their worker presumably died"""
+    now = now or timezone.now()
+    return RenderJob.objects.filter(status='running', started_at__lt=now - lease()).update(
+        status='queued', locked_by='',
+    )
+
+
+def claim(worker):
+    """Mark the oldest runnable job as running for ``worker`` and return it, or None"""
+    while True:
+        now = timezone.now()
+        candidate = (
+            RenderJob.objects.filter(status='queued', run_after__lte=now)
+            .order_by('run_after', 'id').values_list('id', flat=True).first()
+        )
+        if candidate is None:
+            return None
+        # Only one worker's UPDATE can still see the job queued
+        claimed = RenderJob.objects.filter(id=candidate, status='queued').update(
+            status='running', locked_by=worker, started_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return RenderJob.objects.get(id=candidate)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(2 ** attempts, MAX_RETRY_DELAY))
+
+
+def run(job):
+    """Execute a claimed job and record the outcome"""
+    try:
+        result = HANDLERS[job.kind](job)
+    except Exception:
+        job.error = traceback.format_exc(limit=5)
+        job.locked_by = ''
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'locked_by', 'run_after', 'finished_at'])
+        return job
+
+    job.status = 'done'
+    job.result = result or ''
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def work(worker=None, poll_interval=1.0, max_jobs=None, drain=False, stop=None):
+    """
+    Claim and run jobs until ``max_jobs`` have run, the queue is empty (with
+    ``drain``), or ``stop()`` returns true; sleeps ``poll_interval`` seconds
+    while the queue is empty. Returns the number of jobs run.
+    """
+    worker = worker or worker_name()
+    done = 0
+    while not (stop and stop()) and (max_jobs is None or done < max_jobs):
+        requeue_expired()
+        job = claim(worker)
+        if job is None:
+            if drain:
+                break
+            time.sleep(poll_interval)
+            continue
+        run(job)
+        done += 1
+    return done
+
+
+async def await_job(job_id, timeout):
+    """
+    The job once it has finished, or as it stands after ``timeout`` seconds.
+    Sleeps on the event loop between reads, so a waiting status request
+    holds no thread.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await RenderJob.objects.aget(id=job_id)
+        if job.status in TERMINAL or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(min(0.5, max(deadline - time.monotonic(), 0)))
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def metrics(sample=500):
+    """Queue depth by status plus wait and run time percentiles (seconds) of recent jobs"""
+    now = timezone.now()
+    depth = {status: 0 for status, _ in RenderJob.STATUS_CHOICES}
+    depth.update(RenderJob.objects.order_by().values_list('status').annotate(n=Count('id')))
+
+    oldest = RenderJob.objects.filter(status='queued').aggregate(oldest=Min('created_at'))['oldest']
+    recent = RenderJob.objects.filter(status='done').order_by('-finished_at').values_list(
+        'created_at', 'started_at', 'finished_at')[:sample]
+    waits = [(started - created).total_seconds() for created, started, _ in recent]
+    runs = [(finished - started).total_seconds() for _, started, finished in recent]
+    return {
+        'depth': depth,
+        'oldest_queued_seconds': (now - oldest).total_seconds() if oldest else None,
+        'wait_p50': _percentile(waits, 0.5),
+        'wait_p95': _percentile(waits, 0.95),
+        'run_p50': _percentile(runs, 0.5),
+        'run_p95': _percentile(runs, 0.95),
+        'sampled': len(waits),
+    }
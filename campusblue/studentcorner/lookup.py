@@ -0,0 +1,103 @@
+"""
+Student lookup by identifier or name through the StudentLookup index
+
+Every identifier is stored once per student in a normalized form (casefolded,
+separators removed), and names are stored as the whole name plus each word.
+Exact and prefix searches are single range scans over the (key, kind) index
+instead of OR-ing unique columns on the students table.
+"""
+
+import re
+
+from django.db.models import F
+
+from .models import Student, StudentLookup
+
+IDENTIFIER_KINDS = ('u_registration_no', 'class_roll_no', 'reg_form_no')
+
+# Upper bound for prefix range scans; sorts after every other character
+_PREFIX_END = '\U0010ffff'
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize(value):
+    """'201-ZP-2024 ' -> '201zp2024'"""
+    return _SEPARATORS.sub('', value.casefold()) if value else ''
+
+
+def student_keys(student):
+    """(kind, key) pairs indexed for ``student``"""
+    keys = set()
+    for kind in IDENTIFIER_KINDS:
+        key = normalize(getattr(student, kind))
+        if key:
+            keys.add((kind, key))
+
+    name = student.student_name or ''
+    for part in [name] + _SEPARATORS.split(name):
+        key = normalize(part)
+        if key:
+            keys.add(('name', key))
+    return keys
+
+
+def index_students(students):
+    """Replace the lookup keys of ``students``; usable after bulk writes that skip signals"""
+    students = list(students)
+    StudentLookup.objects.filter(student__in=[student.id for student in students]).delete()
+    StudentLookup.objects.bulk_create(
+        [
+            StudentLookup(student_id=student.id, kind=kind, key=key)
+            for student in students
+            for kind, key in student_keys(student)
+        ],
+        batch_size=1000,
+    )
+
+
+def find_student(term):
+    """
+    The student whose registration no, class roll no or form no matches
+    ``term`` exactly (ignoring case and separators), or None. When the term
+    matches different students under different kinds, the order of
+    IDENTIFIER_KINDS decides.
+    """
+    key = normalize(term)
+    if not key:
+        return None
+
+    matches = {
+        student.matched_kind: student
+        for student in Student.objects.filter(
+            lookup_keys__key=key, lookup_keys__kind__in=IDENTIFIER_KINDS
+        ).annotate(matched_kind=F('lookup_keys__kind'))
+    }
+    for kind in IDENTIFIER_KINDS:
+        if kind in matches:
+            return matches[kind]
+    return None
+
+
+def search(term, limit=10):
+    """
+    Students with an identifier or name word starting with ``term``, closest
+    completions first. Reads at most a few index entries per result, however
+    many students share the prefix.
+    """
+    key = normalize(term)
+    if not key:
+        return []
+
+    matched = StudentLookup.objects.filter(
+        key__gte=key, key__lt=key + _PREFIX_END
+    ).order_by('key', 'kind').values_list('student_id', flat=True)
+
+    student_ids = list(dict.fromkeys(matched[:limit * 4]))[:limit]
+    students = {
+        row['id']: row
+        for row in Student.objects.filter(id__in=student_ids).values(
+            'id', 'student_name', 'class_roll_no', 'u_registration_no', 'batch'
+        )
+    }
+    return [students[student_id] for student_id in student_ids if student_id in students]
@@ -0,0 +1,71 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from studentcorner.models import Certificate, Semester, Student, StudentSemester
+from studentcorner.pdf_generator import bonafide_render_inputs, clear_static_layer, generate_bonafide_certificate
+from studentcorner.render_service import RenderService
+
+
+class Command(BaseCommand):
+    help = "Benchmark bonafide PDF rendering with a cold and a warm static layer cache, and across worker pools"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Certificates to render per run')
+        parser.add_argument(
+            '--workers', type=int, nargs='*', default=[],
+            help='Also render through render service pools of these sizes, e.g. --workers 1 2 4',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        student = Student(
+            student_name='Benchmark Student', parent_name='Benchmark Parent', gender='F',
+            batch='2024', class_roll_no='24001', u_registration_no='201-ZP-2024',
+            course_name='Bachelor of Arts',
+        )
+        semester = StudentSemester(semester=Semester(semester_number=3, semester_name='3rd'))
+        certificate = Certificate(id=1, certificate_type='bonafide', issue_date=date.today())
+
+        def run(cold):
+            start = time.perf_counter()
+            for _ in range(count):
+                if cold:
+                    clear_static_layer()
+                generate_bonafide_certificate(student, certificate, semester)
+            return count / (time.perf_counter() - start)
+
+        generate_bonafide_certificate(student, certificate, semester)  # import/font warm-up
+        before = run(cold=True)
+        after = run(cold=False)
+
+        self.stdout.write(f"Rendered {count} certificates per run")
+        self.stdout.write(f"  without static layer cache: {before:8.1f} certificates/sec")
+        self.stdout.write(f"  with static layer cache:    {after:8.1f} certificates/sec")
+        self.stdout.write(self.style.SUCCESS(f"Speed-up: {after / before:.1f}x"))
+
+        if not options['workers']:
+            return
+
+        certificate.created_at = timezone.now()
+        payloads = []
+        for certificate_id in range(1, count + 1):
+            certificate.id = certificate_id
+            payloads.append(bonafide_render_inputs(student, certificate, semester))
+
+        baseline = None
+        for workers in options['workers']:
+            service = RenderService(workers, max_pending=4 * workers)
+            try:
+                service.warm()
+                start = time.perf_counter()
+                service.render_many(payloads)
+                rate = count / (time.perf_counter() - start)
+            finally:
+                service.shutdown()
+            baseline = baseline or rate
+            self.stdout.write(
+                f"  render service, {workers:2d} worker(s): {rate:8.1f} certificates/sec ({rate / baseline:.1f}x)"
+            )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from studentcorner.benchmarks import contention, data, runner
+
+
+class Command(BaseCommand):
+    help = (
+        "Issue certificates from concurrent writer threads while readers look students up, with SQLite's "
+        "default settings and with the tuned profile from settings, and compare lock errors and throughput"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--students', type=int, default=1000, help='Size of the generated dataset')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark is for the SQLite backend')
+
+        with runner.scratch_database():
+            data.generate(options['students'], seed=options['seed'])
+            comparison = contention.compare(
+                writers=options['writers'], readers=options['readers'],
+                seconds=options['seconds'], seed=options['seed'],
+            )
+
+        self.stdout.write(
+            f"{options['writers']} writers and {options['readers']} readers for {options['seconds']:g}s, "
+            f"{options['students']} students"
+        )
+        for name, results in comparison.items():
+            self.stdout.write(
+                f"  {name:8} writes {results['writes_per_sec']:7.1f}/s  p95 {results['write_p95_ms']} ms  "
+                f"locked {results['write_locked_errors']:5d}   "
+                f"reads {results['reads_per_sec']:7.1f}/s  p95 {results['read_p95_ms']} ms  "
+                f"locked {results['read_locked_errors']}"
+            )
+
+        default, tuned = comparison['default'], comparison['tuned']
+        locked_before = default['write_locked_errors'] + default['read_locked_errors']
+        locked_after = tuned['write_locked_errors'] + tuned['read_locked_errors']
+        self.stdout.write(self.style.SUCCESS(
+            f"Lock errors {locked_before} -> {locked_after}; "
+            f"write throughput {tuned['writes_per_sec'] / max(default['writes_per_sec'], 0.1):.1f}x, "
+            f"read throughput {tuned['reads_per_sec'] / max(default['reads_per_sec'], 0.1):.1f}x"
+        ))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from studentcorner.benchmarks import runner
+from studentcorner.benchmarks.scenarios import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = (
+        "Time search, issuance, PDF rendering, bulk import and the statistics page on generated "
+        "datasets of increasing size, in a scratch database; writes the results as JSON and fails "
+        "when a threshold or the tolerance against a baseline run is exceeded"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(runner.DEFAULT_SIZES),
+                            help='Numbers of students to benchmark at')
+        parser.add_argument('--scenario', action='append', dest='scenarios', choices=sorted(SCENARIOS),
+                            help='Scenario to run (repeatable; default: all)')
+        parser.add_argument('--batches', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeats', type=int, default=50, help='Timed calls per measurement')
+        parser.add_argument('--output', help='Result file (default: benchmark-<timestamp>.json)')
+        parser.add_argument('--thresholds', default=runner.THRESHOLDS_FILE,
+                            help='JSON limits per metric; pass "" to skip')
+        parser.add_argument('--baseline', help='Earlier result file to compare against')
+        parser.add_argument('--tolerance', type=float, default=runner.DEFAULT_TOLERANCE,
+                            help='Allowed slowdown against the baseline, as a fraction')
+        parser.add_argument('--database', help='Scratch database file; with --keep it is reused by later runs')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch database')
+
+    def handle(self, *args, **options):
+        if options['keep'] and not options['database']:
+            raise CommandError('--keep needs --database')
+        thresholds = runner.load(options['thresholds']) if options['thresholds'] else None
+        baseline = runner.load(options['baseline']) if options['baseline'] else None
+        output = options['output'] or f"benchmark-{timezone.now().strftime('%Y%m%d-%H%M%S')}.json"
+
+        with runner.scratch_database(options['database'], keep=options['keep']):
+            report = runner.run(
+                sizes=options['sizes'], scenarios=options['scenarios'], seed=options['seed'],
+                batches=options['batches'], repeats=options['repeats'], progress=self.stdout.write,
+            )
+
+        runner.save(report, output)
+        self.stdout.write(f'Results written to {output}')
+
+        failures = runner.check(report, thresholds, baseline, options['tolerance'])
+        for failure in failures:
+            self.stderr.write(f'  {failure}')
+        if failures:
+            raise CommandError(f'{len(failures)} benchmark check(s) failed')
+        self.stdout.write(self.style.SUCCESS('All benchmark checks passed'))
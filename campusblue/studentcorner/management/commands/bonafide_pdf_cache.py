@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from studentcorner import pdf_cache
+from studentcorner.models import Certificate
+
+
+class Command(BaseCommand):
+    help = "Warm, evict, purge or inspect the on-disk bonafide PDF cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['warm', 'evict', 'purge', 'stats'])
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='warm: only certificates issued on or after this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        action = options['action']
+
+        if action == 'warm':
+            certificates = Certificate.objects.filter(
+                certificate_type='bonafide'
+            ).select_related('student', 'student_semester__semester')
+            if options['since']:
+                certificates = certificates.filter(issue_date__gte=options['since'])
+
+            rendered = 0
+            for certificate in certificates.iterator(chunk_size=500):
+                key = pdf_cache.content_key(certificate.student, certificate, certificate.student_semester)
+                if not pdf_cache.path_for(certificate.id, key).exists():
+                    pdf_cache.get_or_render(certificate.student, certificate, certificate.student_semester, key=key)
+                    rendered += 1
+            self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} certificates into the cache"))
+
+        elif action == 'evict':
+            removed = pdf_cache.evict()
+            self.stdout.write(self.style.SUCCESS(f"Evicted {removed} files"))
+
+        elif action == 'purge':
+            removed = pdf_cache.purge()
+            self.stdout.write(self.style.SUCCESS(f"Purged {removed} files"))
+
+        stats = pdf_cache.stats()
+        self.stdout.write(
+            f"{stats['files']} files, {stats['bytes'] / 1024 / 1024:.1f} MB "
+            f"(cap {pdf_cache.max_bytes() / 1024 / 1024:.0f} MB) in {pdf_cache.cache_dir()}"
+        )
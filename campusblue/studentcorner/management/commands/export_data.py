@@ -0,0 +1,36 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from studentcorner import exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Export rosters, enrollments, per-subject enrollment counts and the certificate register as CSV, "
+        "XLSX or Parquet files, one per dataset. The files import back with import_excel"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('datasets', nargs='*', metavar='dataset',
+                            help=f'Datasets to export (default: all): {", ".join(exports.DATASETS)}')
+        parser.add_argument('--format', default='csv', choices=list(exports.WRITERS))
+        parser.add_argument('--output', default='.', help='Directory for the files')
+        parser.add_argument('--chunk-size', type=int, default=exports.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        unknown = set(options['datasets']) - set(exports.DATASETS)
+        if unknown:
+            raise CommandError(f"Unknown datasets {', '.join(sorted(unknown))}; choose from {', '.join(exports.DATASETS)}")
+        if options['format'] not in exports.available_formats():
+            raise CommandError(f"{options['format']} export needs pyarrow installed")
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+
+        for name in options['datasets'] or exports.DATASETS:
+            path = output / exports.filename(name, options['format'])
+            started = time.perf_counter()
+            size = exports.write(name, options['format'], path, options['chunk_size'])
+            self.stdout.write(f'{path}: {size / 1024:.1f} KiB in {time.perf_counter() - started:.2f}s')
+        self.stdout.write(self.style.SUCCESS(f'Exported to {output}'))
@@ -0,0 +1,77 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from studentcorner import importer
+
+
+def default_paths():
+    return [settings.BASE_DIR.parent / 'excel_data', settings.BASE_DIR / 'studentcorner' / 'Session.xlsx']
+
+
+def workbooks(paths):
+    found = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(sorted([*path.glob('*.xlsx'), *path.glob('*.csv'), *path.glob('*.parquet')]))
+        elif path.exists():
+            found.append(path)
+    # Skip the ~$ lock files Excel leaves next to open workbooks
+    return [path for path in found if not path.name.startswith('~$')]
+
+
+class Command(BaseCommand):
+    help = 'Import sessions, semesters, subjects, students and enrollments from Excel workbooks, CSV or Parquet files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Workbooks or directories of workbooks (default: excel_data/)')
+        parser.add_argument('--chunk-size', type=int, default=importer.DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate without writing anything')
+        parser.add_argument('--show-rejected', type=int, default=10, help='Rejected rows to list per sheet')
+        parser.add_argument(
+            '--stream', action='store_true',
+            help='Read rows lazily and commit each chunk with a checkpoint; reruns resume after the last committed chunk',
+        )
+        parser.add_argument('--restart', action='store_true', help='With --stream, ignore earlier checkpoints')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        paths = workbooks(options['paths'] or default_paths())
+        if not paths:
+            raise CommandError('No .xlsx, .csv or .parquet files found')
+        if options['stream'] and options['dry_run']:
+            raise CommandError('--dry-run cannot be combined with --stream')
+
+        started = time.perf_counter()
+        if options['stream']:
+            results = importer.stream_workbooks(paths, options['chunk_size'], options['restart'], self.progress)
+        else:
+            results = importer.import_workbooks(paths, options['chunk_size'], options['dry_run'])
+        if not results:
+            raise CommandError('No recognisable sheets in ' + ', '.join(path.name for path in paths))
+
+        for result in results:
+            if result.resumed_from and not result.rows:
+                self.stdout.write(f'{result.source}: already imported, use --restart to import it again')
+                continue
+            if result.resumed_from:
+                self.stdout.write(f'{result.source}: resumed after {result.resumed_from} committed rows')
+            self.stdout.write(
+                f'{result.source}: {result.kind}, {result.rows} rows, {result.imported} imported, '
+                f'{len(result.rejected)} rejected in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/s)'
+            )
+            for row, reason in result.rejected[:options['show_rejected']]:
+                self.stdout.write(self.style.WARNING(f'  row {row}: {reason}'))
+
+        rows = sum(result.rows for result in results)
+        elapsed = time.perf_counter() - started
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {rows} rows in {elapsed:.2f}s ({rows / elapsed:.0f} rows/s)'))
+
+    def progress(self, result, rows_done):
+        if self.verbosity >= 1:
+            self.stdout.write(
+                f'{result.source}: {rows_done} rows committed ({result.rows_per_second:.0f} rows/s)'
+            )
@@ -0,0 +1,101 @@
+import asyncio
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from studentcorner.models import Certificate
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec of the sync (WSGI) and async (ASGI) request paths, "
+        "in-process through Django's handlers or against running servers with --url"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to request (repeatable); defaults to statistics and a PDF download')
+        parser.add_argument('--requests', type=int, default=300, help='Requests per path and mode')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--mode', choices=['wsgi', 'asgi'], action='append', dest='modes',
+                            help='In-process handler to drive (default: both)')
+        parser.add_argument('--url', action='append', dest='urls', default=[],
+                            help='Base URL of a running deployment, e.g. http://127.0.0.1:8000 (repeatable)')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self.default_paths()
+        count, concurrency = options['requests'], options['concurrency']
+
+        modes = options['modes'] or ([] if options['urls'] else ['wsgi', 'asgi'])
+        targets = [(f'{mode} (in-process)', mode, None) for mode in modes]
+        targets += [(url, 'url', url.rstrip('/')) for url in options['urls']]
+
+        self.stdout.write(f"{count} requests per path, concurrency {concurrency}")
+        for path in paths:
+            self.stdout.write(path)
+            for label, mode, base in targets:
+                started = time.perf_counter()
+                if mode == 'asgi':
+                    results = asyncio.run(self.run_async(path, count, concurrency))
+                else:
+                    results = self.run_threads(path, count, concurrency, base)
+                elapsed = time.perf_counter() - started
+
+                latencies = [latency for _, latency in results]
+                errors = sum(1 for status, _ in results if status >= 500)
+                self.stdout.write(
+                    f"  {label:28} {count / elapsed:8.1f} req/s   p50 {percentile(latencies, 0.5) * 1000:7.1f} ms"
+                    f"   p95 {percentile(latencies, 0.95) * 1000:7.1f} ms   errors {errors}"
+                )
+
+    def default_paths(self):
+        # The student lookup is staff-only, so anonymous clients cannot drive it
+        paths = [reverse('student_statistics')]
+        certificate = Certificate.objects.filter(certificate_type='bonafide').first()
+        if certificate is not None:
+            paths.append(reverse('download_bonafide_pdf', args=[certificate.id]))
+        return paths
+
+    def run_threads(self, path, count, concurrency, base=None):
+        if base is None:
+            def fetch(_):
+                client = Client()
+                started = time.perf_counter()
+                status = client.get(path).status_code
+                return status, time.perf_counter() - started
+        else:
+            def fetch(_):
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(base + path) as response:
+                        response.read()
+                        status = response.status
+                except urllib.error.HTTPError as exc:
+                    status = exc.code
+                except OSError as exc:
+                    raise CommandError(f'{base}{path}: {exc}')
+                return status, time.perf_counter() - started
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            return list(pool.map(fetch, range(count)))
+
+    async def run_async(self, path, count, concurrency):
+        client = AsyncClient()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with slots:
+                started = time.perf_counter()
+                response = await client.get(path)
+                return response.status_code, time.perf_counter() - started
+
+        return await asyncio.gather(*(fetch() for _ in range(count)))
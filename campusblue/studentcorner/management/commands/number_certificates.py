@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from studentcorner import numbering
+
+
+class Command(BaseCommand):
+    help = (
+        "Store certificate numbers for certificates issued before numbers were stored. Bonafides keep "
+        "the number printed on them (certificate id + 100) unless --renumber"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renumber', action='store_true',
+                            help='Number old bonafides from the per-year sequence instead of keeping their printed numbers')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        numbered = numbering.backfill(
+            renumber=options['renumber'], batch_size=options['batch_size'],
+            progress=lambda message: self.stdout.write(message),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Numbered {numbered} certificates"))
@@ -0,0 +1,45 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from studentcorner import database
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh SQLite's query planner statistics (PRAGMA optimize, or ANALYZE) and optionally "
+        "checkpoint the write-ahead log; run it from cron, or keep it running with --every"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='Full ANALYZE instead of PRAGMA optimize')
+        parser.add_argument('--checkpoint', action='store_true', help='Also checkpoint and truncate the WAL')
+        parser.add_argument('--every', type=float, help='Repeat every this many seconds until stopped')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f"Nothing to do for the {connection.vendor} backend")
+            return
+
+        self.stdout.write(', '.join(f'{name}={value}' for name, value in database.current_pragmas().items()))
+
+        stopping = []
+        if options['every']:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *_: stopping.append(True))
+
+        while True:
+            timings = database.optimize(analyze=options['analyze'], checkpoint=options['checkpoint'])
+            self.stdout.write(self.style.SUCCESS(
+                ', '.join(f'{step} took {seconds * 1000:.1f} ms' for step, seconds in timings.items())))
+            if not options['every']:
+                break
+            deadline = time.monotonic() + options['every']
+            while not stopping and time.monotonic() < deadline:
+                time.sleep(min(1.0, deadline - time.monotonic()))
+            if stopping:
+                break
+            # Each round on a fresh connection, as a short-lived cron run would
+            connection.close()
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from studentcorner import promotion
+from studentcorner.models import AcademicSession, Semester
+
+
+def session(code):
+    found = AcademicSession.objects.filter(session_code=code).first()
+    if found is None:
+        raise CommandError(f'No session {code}')
+    return found
+
+
+def semester(number):
+    found = Semester.objects.filter(semester_number=number).first()
+    if found is None:
+        raise CommandError(f'No semester {number}')
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        "Enroll the students of one session and semester in the next: copy their subjects, remapped "
+        "through the subject progressions of the target semester, skipping students already enrolled there"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source_session', help='Session code, e.g. 2024-25')
+        parser.add_argument('source_semester', type=int, help='Semester number')
+        parser.add_argument('target_session')
+        parser.add_argument('target_semester', type=int)
+        parser.add_argument('--batch', help='Only students of this batch')
+        parser.add_argument('--dry-run', action='store_true', help='List the records that would be created')
+        parser.add_argument('--show', type=int, default=20, help='Records to list with --dry-run (0 for all)')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            result = promotion.promote(
+                session(options['source_session']), semester(options['source_semester']),
+                session(options['target_session']), semester(options['target_semester']),
+                batch=options['batch'], dry_run=options['dry_run'], batch_size=options['batch_size'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['dry_run']:
+            lines = result.diff()
+            shown = lines[:options['show']] if options['show'] else lines
+            for line in shown:
+                self.stdout.write(line)
+            if len(shown) < len(lines):
+                self.stdout.write(f'... and {len(lines) - len(shown)} more')
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(result.records)} records ({result.remapped} subjects remapped); '
+            f'skipped {result.skipped} students already enrolled'))
+        self.stdout.write(', '.join(f'{step} {seconds:.2f}s' for step, seconds in result.timings.items()))
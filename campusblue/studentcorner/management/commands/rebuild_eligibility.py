@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from studentcorner import eligibility
+
+
+class Command(BaseCommand):
+    help = "Recompute the certificate eligibility index from the certificates and verify it"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only compare the stored index with the certificates; fail if they differ')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            differences = eligibility.differences()
+            for (student_id, certificate_type), (stored, live) in sorted(differences.items(), key=str)[:20]:
+                self.stdout.write(f"  student {student_id} {certificate_type}: stored {stored}, live {live}")
+            if differences:
+                raise CommandError(f"{len(differences)} eligibility rows are out of date; run rebuild_eligibility")
+            self.stdout.write(self.style.SUCCESS("Certificate eligibility matches the certificates"))
+            return
+
+        rows = eligibility.rebuild()
+        differences = eligibility.differences()
+        if differences:
+            raise CommandError(f"Rebuilt index still differs from the certificates in {len(differences)} rows")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} certificate eligibility rows; verified against certificates"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from studentcorner import rollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the EnrollmentStats rollup from scratch and verify it against live enrollments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only compare the stored rollup with live data; fail if they differ')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            differences = rollup.differences()
+            for key, (stored, live) in sorted(differences.items(), key=str)[:20]:
+                self.stdout.write(f"  {dict(zip(rollup.KEY_FIELDS, key))}: stored {stored}, live {live}")
+            if differences:
+                raise CommandError(f"{len(differences)} rollup counters are out of date; run rebuild_stats")
+            self.stdout.write(self.style.SUCCESS("Enrollment stats match live data"))
+            return
+
+        rows = rollup.rebuild()
+        differences = rollup.differences()
+        if differences:
+            raise CommandError(f"Rebuilt rollup still differs from live data in {len(differences)} counters")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} enrollment stats rows; verified against live data"))
@@ -0,0 +1,55 @@
+import signal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from studentcorner import jobs
+from studentcorner.models import RenderJob
+
+
+class Command(BaseCommand):
+    help = "Run render job workers, or inspect, retry and prune the render job queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['work', 'stats', 'retry', 'prune'])
+        parser.add_argument('--poll', type=float, default=1.0, help='work: seconds between polls of an empty queue')
+        parser.add_argument('--max-jobs', type=int, help='work: exit after running this many jobs')
+        parser.add_argument('--drain', action='store_true', help='work: exit once the queue is empty')
+        parser.add_argument('--days', type=int, default=30, help='prune: remove finished jobs older than this')
+
+    def handle(self, *args, **options):
+        action = options['action']
+
+        if action == 'work':
+            stopping = []
+            # Finish the job in hand on SIGTERM/SIGINT instead of dying mid-render
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *_: stopping.append(True))
+            worker = jobs.worker_name()
+            self.stdout.write(f"Worker {worker} polling every {options['poll']}s")
+            count = jobs.work(
+                worker, poll_interval=options['poll'], max_jobs=options['max_jobs'],
+                drain=options['drain'], stop=lambda: bool(stopping),
+            )
+            self.stdout.write(self.style.SUCCESS(f"Ran {count} jobs"))
+
+        elif action == 'retry':
+            count = RenderJob.objects.filter(status='failed').update(
+                status='queued', attempts=0, run_after=timezone.now(), finished_at=None)
+            self.stdout.write(self.style.SUCCESS(f"Queued {count} failed jobs again"))
+
+        elif action == 'prune':
+            cutoff = timezone.now() - timedelta(days=options['days'])
+            count, _ = RenderJob.objects.filter(status__in=jobs.TERMINAL, finished_at__lt=cutoff).delete()
+            self.stdout.write(self.style.SUCCESS(f"Removed {count} finished jobs"))
+
+        metrics = jobs.metrics()
+        self.stdout.write(', '.join(f"{count} {status}" for status, count in metrics['depth'].items()))
+        if metrics['oldest_queued_seconds'] is not None:
+            self.stdout.write(f"Oldest queued job waiting {metrics['oldest_queued_seconds']:.1f}s")
+        if metrics['sampled']:
+            self.stdout.write(
+                f"Last {metrics['sampled']} jobs: wait p50 {metrics['wait_p50']:.2f}s p95 {metrics['wait_p95']:.2f}s, "
+                f"run p50 {metrics['run_p50']:.2f}s p95 {metrics['run_p95']:.2f}s"
+            )
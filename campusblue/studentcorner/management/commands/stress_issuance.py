@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from studentcorner.benchmarks import contention, data, runner
+
+
+class Command(BaseCommand):
+    help = (
+        "Race threads issuing bonafides to a handful of students, every form submitted twice, on a scratch "
+        "database, and fail if any student ends up with two bonafides inside the cooldown"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--students', type=int, default=10, help='Students the threads compete for')
+        parser.add_argument('--forms', type=int, default=100, help='Issue forms, each submitted twice')
+        parser.add_argument('--naive', action='store_true',
+                            help='Check and insert in separate statements, as the page used to, for comparison')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with runner.scratch_database():
+            data.generate(max(options['students'] * 2, 100), seed=options['seed'])
+            results = contention.stress(
+                students=options['students'], threads=options['threads'], forms=options['forms'],
+                naive=options['naive'], seed=options['seed'],
+            )
+
+        self.stdout.write(
+            f"{results['submissions']} submissions for {results['students']} students from "
+            f"{options['threads']} threads in {results['seconds']}s: issued {results['issued']}, "
+            f"replayed {results['replayed']}, cooldown {results['cooldown']}, locked {results['locked']}"
+        )
+        problems = [
+            f"student {student_id} got bonafides on {earlier} and {later}"
+            for student_id, earlier, later in results['violations']
+        ] + [f"form {key} issued more than one certificate" for key in results['split_keys']]
+        if results['locked']:
+            problems.append(f"{results['locked']} submissions failed with a locked database")
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS(f"No duplicates: one bonafide for each of the {results['issued']} students issued"))
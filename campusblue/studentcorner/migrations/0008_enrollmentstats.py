@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+
+SLOTS = {
+    'major_course': 'MAJOR', 'minor_course': 'MINOR', 'md1': 'MD1', 'md2': 'MD2',
+    'skill': 'SKILL', 'vac1': 'VAC1', 'vac2': 'VAC2', 'aec': 'AEC',
+}
+
+
+def populate_enrollment_stats(apps, schema_editor):
+    StudentSemester = apps.get_model('studentcorner', 'StudentSemester')
+    EnrollmentStats = apps.get_model('studentcorner', 'EnrollmentStats')
+
+    counts = Counter()
+    records = StudentSemester.objects.filter(
+        is_enrolled=True, student__is_active=True
+    ).select_related('student')
+    for record in records.iterator(chunk_size=2000):
+        base = (record.session_id, record.semester_id, record.student.batch, record.student.gender)
+        counts[base + ('', None)] += 1
+        for slot, course_type in SLOTS.items():
+            subject_id = getattr(record, f'{slot}_id')
+            if subject_id is not None:
+                counts[base + (course_type, subject_id)] += 1
+
+    EnrollmentStats.objects.bulk_create([
+        EnrollmentStats(
+            session_id=session_id, semester_id=semester_id, batch=batch, gender=gender,
+            course_type=course_type, subject_id=subject_id, count=n,
+        )
+        for (session_id, semester_id, batch, gender, course_type, subject_id), n in counts.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studentcorner', '0007_alter_student_u_registration_no'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.CharField(max_length=50)),
+                ('gender', models.CharField(choices=[('M', 'Male'), ('F', 'Female')], max_length=1)),
+                ('course_type', models.CharField(blank=True, choices=[('MAJOR', 'Major Course'), ('MINOR', 'Minor Course'), ('MD1', 'Multidisciplinary 1'), ('MD2', 'Multidisciplinary 2'), ('SKILL', 'Skill Enhancement'), ('VAC1', 'Value Added Course 1'), ('VAC2', 'Value Added Course 2'), ('AEC', 'Ability Enhancement Course')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='studentcorner.semester')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='studentcorner.academicsession')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='studentcorner.subject')),
+            ],
+            options={
+                'db_table': 'enrollment_stats',
+                'indexes': [models.Index(fields=['semester', 'course_type'], name='enrollment__semeste_bd1f8a_idx')],
+                'unique_together': {('session', 'semester', 'batch', 'gender', 'course_type', 'subject')},
+            },
+        ),
+        migrations.RunPython(populate_enrollment_stats, migrations.RunPython.noop),
+    ]
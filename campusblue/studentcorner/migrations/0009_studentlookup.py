@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:08
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize(value):
+    return SEPARATORS.sub('', value.casefold()) if value else ''
+
+
+def populate_student_lookup(apps, schema_editor):
+    Student = apps.get_model('studentcorner', 'Student')
+    StudentLookup = apps.get_model('studentcorner', 'StudentLookup')
+
+    rows = []
+    for student in Student.objects.iterator(chunk_size=2000):
+        keys = set()
+        for kind in ('u_registration_no', 'class_roll_no', 'reg_form_no'):
+            key = normalize(getattr(student, kind))
+            if key:
+                keys.add((kind, key))
+        name = student.student_name or ''
+        for part in [name] + SEPARATORS.split(name):
+            key = normalize(part)
+            if key:
+                keys.add(('name', key))
+        rows.extend(StudentLookup(student_id=student.id, kind=kind, key=key) for kind, key in keys)
+
+    StudentLookup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studentcorner', '0008_enrollmentstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentLookup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('u_registration_no', 'University Registration No'), ('class_roll_no', 'Class Roll No'), ('reg_form_no', 'Registration Form No'), ('name', 'Name')], max_length=20)),
+                ('key', models.CharField(max_length=200)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lookup_keys', to='studentcorner.student')),
+            ],
+            options={
+                'db_table': 'student_lookup',
+                'indexes': [models.Index(fields=['key', 'kind'], name='student_loo_key_a95eda_idx')],
+            },
+        ),
+        migrations.RunPython(populate_student_lookup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studentcorner', '0011_renderjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studentcorner', '0012_certificate_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificateCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('certificate_type', models.CharField(choices=[('bonafide', 'Bonafide'), ('marks_sheet', 'Marks Sheet'), ('degree', 'Degree'), ('discharge_cum_character', 'Discharge cum Character'), ('character_not_passed', 'Character for Not Passed')], max_length=50)),
+                ('year', models.PositiveIntegerField()),
+                ('next_value', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'certificate_counter',
+                'constraints': [models.UniqueConstraint(fields=('certificate_type', 'year'), name='unique_certificate_counter')],
+            },
+        ),
+    ]
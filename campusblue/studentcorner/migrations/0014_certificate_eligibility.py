@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from collections import defaultdict
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+# The rules as of this migration: (max_count, cooldown_days, requires, excludes)
+RULES = {
+    'bonafide': (None, 180, (), ()),
+    'marks_sheet': (1, None, (), ()),
+    'degree': (1, None, (), ()),
+    'discharge_cum_character': (1, None, ('degree',), ()),
+    'character_not_passed': (1, None, (), ('degree',)),
+}
+LABELS = {
+    'bonafide': 'Bonafide',
+    'marks_sheet': 'Marks Sheet',
+    'degree': 'Degree',
+    'discharge_cum_character': 'Discharge cum Character',
+    'character_not_passed': 'Character for Not Passed',
+}
+
+
+def apply_rule(certificate_type, history):
+    max_count, cooldown_days, requires, excludes = RULES[certificate_type]
+    issued, last_issued = history.get(certificate_type, (0, None))
+    for other in excludes:
+        if history.get(other, (0, None))[0]:
+            return True, None, f"Not issued to students who hold a {LABELS[other]} certificate"
+    for other in requires:
+        if not history.get(other, (0, None))[0]:
+            return True, None, f"Requires a {LABELS[other]} certificate first"
+    if max_count is not None and issued >= max_count:
+        return True, None, f"Already issued on {last_issued}. Can only be issued once."
+    if cooldown_days and last_issued is not None:
+        return False, last_issued + timedelta(days=cooldown_days), ''
+    return False, None, ''
+
+
+def populate_certificate_eligibility(apps, schema_editor):
+    Certificate = apps.get_model('studentcorner', 'Certificate')
+    CertificateEligibility = apps.get_model('studentcorner', 'CertificateEligibility')
+
+    histories = defaultdict(dict)
+    for row in (Certificate.objects.values('student_id', 'certificate_type')
+                .annotate(n=Count('id'), last=Max('issue_date')).order_by()):
+        histories[row['student_id']][row['certificate_type']] = (row['n'], row['last'])
+
+    rows = []
+    for student_id, history in histories.items():
+        for certificate_type in RULES:
+            blocked, eligible_from, reason = apply_rule(certificate_type, history)
+            issued, last_issued = history.get(certificate_type, (0, None))
+            rows.append(CertificateEligibility(
+                student_id=student_id, certificate_type=certificate_type, issued=issued,
+                last_issued=last_issued, eligible_from=eligible_from, blocked=blocked, reason=reason,
+            ))
+    CertificateEligibility.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studentcorner', '0013_certificate_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificateEligibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('certificate_type', models.CharField(choices=[('bonafide', 'Bonafide'), ('marks_sheet', 'Marks Sheet'), ('degree', 'Degree'), ('discharge_cum_character', 'Discharge cum Character'), ('character_not_passed', 'Character for Not Passed')], max_length=50)),
+                ('issued', models.PositiveIntegerField(default=0)),
+                ('last_issued', models.DateField(blank=True, null=True)),
+                ('eligible_from', models.DateField(blank=True, null=True)),
+                ('blocked', models.BooleanField(default=False)),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eligibility', to='studentcorner.student')),
+            ],
+            options={
+                'db_table': 'certificate_eligibility',
+                'constraints': [models.UniqueConstraint(fields=('student', 'certificate_type'), name='unique_certificate_eligibility')],
+            },
+        ),
+        migrations.RunPython(populate_certificate_eligibility, migrations.RunPython.noop),
+    ]
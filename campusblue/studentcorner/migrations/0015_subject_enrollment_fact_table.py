@@ -0,0 +1,119 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+COURSE_SLOTS = {
+    'major_course': 'MAJOR',
+    'minor_course': 'MINOR',
+    'md1': 'MD1',
+    'md2': 'MD2',
+    'skill': 'SKILL',
+    'vac1': 'VAC1',
+    'vac2': 'VAC2',
+    'aec': 'AEC',
+}
+
+
+def copy_slots_to_enrollments(apps, schema_editor):
+    StudentSemester = apps.get_model('studentcorner', 'StudentSemester')
+    StudentSubjectEnrollment = apps.get_model('studentcorner', 'StudentSubjectEnrollment')
+
+    # Nothing read the table before; the slot columns are what counts
+    StudentSubjectEnrollment.objects.all().delete()
+    rows = []
+    slot_columns = [f'{slot}_id' for slot in COURSE_SLOTS]
+    for record in StudentSemester.objects.values('id', *slot_columns).iterator(chunk_size=2000):
+        for slot, course_type in COURSE_SLOTS.items():
+            if record[f'{slot}_id'] is not None:
+                rows.append(StudentSubjectEnrollment(
+                    student_semester_id=record['id'], subject_id=record[f'{slot}_id'], course_type=course_type,
+                ))
+    StudentSubjectEnrollment.objects.bulk_create(rows, batch_size=2000)
+
+
+def copy_enrollments_to_slots(apps, schema_editor):
+    StudentSemester = apps.get_model('studentcorner', 'StudentSemester')
+    StudentSubjectEnrollment = apps.get_model('studentcorner', 'StudentSubjectEnrollment')
+
+    slots = {}
+    for record_id, subject_id, course_type in StudentSubjectEnrollment.objects.values_list(
+            'student_semester_id', 'subject_id', 'course_type'):
+        slot = next(slot for slot, slot_type in COURSE_SLOTS.items() if slot_type == course_type)
+        slots.setdefault(record_id, {})[f'{slot}_id'] = subject_id
+    records = []
+    for record in StudentSemester.objects.filter(id__in=list(slots)).iterator(chunk_size=2000):
+        for column, subject_id in slots[record.id].items():
+            setattr(record, column, subject_id)
+        records.append(record)
+    StudentSemester.objects.bulk_update(records, [f'{slot}_id' for slot in COURSE_SLOTS], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studentcorner', '0014_certificate_eligibility'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='studentsubjectenrollment',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='studentsubjectenrollment',
+            name='course_type',
+            field=models.CharField(choices=[('MAJOR', 'Major Course'), ('MINOR', 'Minor Course'), ('MD1', 'Multidisciplinary 1'), ('MD2', 'Multidisciplinary 2'), ('SKILL', 'Skill Enhancement'), ('VAC1', 'Value Added Course 1'), ('VAC2', 'Value Added Course 2'), ('AEC', 'Ability Enhancement Course')], default='', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='studentsubjectenrollment',
+            name='subject',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='studentcorner.subject'),
+        ),
+        migrations.RunPython(copy_slots_to_enrollments, copy_enrollments_to_slots),
+        migrations.AddIndex(
+            model_name='studentsubjectenrollment',
+            index=models.Index(fields=['subject', 'student_semester'], name='student_sub_subject_973260_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentsubjectenrollment',
+            index=models.Index(fields=['course_type', 'subject'], name='student_sub_course__66bd61_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentsubjectenrollment',
+            constraint=models.UniqueConstraint(fields=('student_semester', 'course_type'), name='unique_enrollment_slot'),
+        ),
+        migrations.RemoveField(
+            model_name='studentsemester',
+            name='aec',
+        ),
+        migrations.RemoveField(
+            model_name='studentsemester',
+            name='major_course',
+        ),
+        migrations.RemoveField(
+            model_name='studentsemester',
+            name='md1',
+        ),
+        migrations.RemoveField(
+            model_name='studentsemester',
+            name='md2',
+        ),
+        migrations.RemoveField(
+            model_name='studentsemester',
+            name='minor_course',
+        ),
+        migrations.RemoveField(
+            model_name='studentsemester',
+            name='skill',
+        ),
+        migrations.RemoveField(
+            model_name='studentsemester',
+            name='vac1',
+        ),
+        migrations.RemoveField(
+            model_name='studentsemester',
+            name='vac2',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studentcorner', '0015_subject_enrollment_fact_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectProgression',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progressions', to='studentcorner.subject')),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_progressions', to='studentcorner.semester')),
+                ('to_subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='studentcorner.subject')),
+            ],
+            options={
+                'db_table': 'subject_progressions',
+                'unique_together': {('semester', 'from_subject')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:14
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+HEADCOUNT_KEY = ('session_id', 'semester_id', 'batch', 'gender', 'course_type')
+
+
+def merge_duplicate_headcounts(apps, schema_editor):
+    """Fold headcount rows inserted twice for one key into the oldest of them"""
+    EnrollmentStats = apps.get_model('studentcorner', 'EnrollmentStats')
+    duplicates = (
+        EnrollmentStats.objects.filter(subject__isnull=True)
+        .values(*HEADCOUNT_KEY).annotate(rows=Count('id'), keep=Min('id'), total=Sum('count'))
+        .filter(rows__gt=1).order_by()
+    )
+    for row in duplicates:
+        key = {field: row[field] for field in HEADCOUNT_KEY}
+        EnrollmentStats.objects.filter(id=row['keep']).update(count=row['total'])
+        EnrollmentStats.objects.filter(subject__isnull=True, **key).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studentcorner', '0016_subject_progression'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_headcounts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='enrollmentstats',
+            constraint=models.UniqueConstraint(condition=models.Q(('subject__isnull', True)), fields=('session', 'semester', 'batch', 'gender', 'course_type'), name='unique_enrollment_stats_headcount'),
+        ),
+    ]
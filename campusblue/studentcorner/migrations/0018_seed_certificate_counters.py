@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+from django.db import migrations
+from django.db.models import Max
+from django.db.models.functions import ExtractYear
+
+# Bonafides issued before numbers were stored printed certificate id + 100
+LEGACY_OFFSET = 100
+
+
+def seed_certificate_counters(apps, schema_editor):
+    """Start each bonafide counter above the numbers already printed on legacy certificates"""
+    Certificate = apps.get_model('studentcorner', 'Certificate')
+    CertificateCounter = apps.get_model('studentcorner', 'CertificateCounter')
+
+    legacy = (
+        Certificate.objects.filter(certificate_type='bonafide', certificate_number__isnull=True)
+        .values(year=ExtractYear('issue_date')).annotate(highest=Max('id')).order_by()
+    )
+    for row in legacy:
+        past = row['highest'] + LEGACY_OFFSET
+        counter, _ = CertificateCounter.objects.get_or_create(certificate_type='bonafide', year=row['year'])
+        if counter.next_value <= past:
+            CertificateCounter.objects.filter(pk=counter.pk).update(next_value=past + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studentcorner', '0017_enrollment_stats_headcount_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_certificate_counters, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.utils import timezone
 
 # Create your models here.
@@ -110,6 +111,46 @@ class Student(models.Model):
         return f"{self.u_registration_no} - {self.student_name}"
 
 
+class StudentLookup(models.Model):
+    """
+    Normalized search keys for a student, maintained by the signal handlers
+    in studentcorner/signals.py. See studentcorner/lookup.py.
+    """
+    KIND_CHOICES = [
+        ('u_registration_no', 'University Registration No'),
+        ('class_roll_no', 'Class Roll No'),
+        ('reg_form_no', 'Registration Form No'),
+        ('name', 'Name'),
+    ]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='lookup_keys')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    key = models.CharField(max_length=200)
+
+    class Meta:
+        db_table = 'student_lookup'
+        indexes = [
+            models.Index(fields=['key', 'kind']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.key}"
+
+
+# StudentSemester subject slots and the Subject.course_type each one holds
+COURSE_SLOTS = {
+    'major_course': 'MAJOR',
+    'minor_course': 'MINOR',
+    'md1': 'MD1',
+    'md2': 'MD2',
+    'skill': 'SKILL',
+    'vac1': 'VAC1',
+    'vac2': 'VAC2',
+    'aec': 'AEC',
+}
+SLOT_BY_COURSE_TYPE = {course_type: slot for slot, course_type in COURSE_SLOTS.items()}
+
+
 class StudentSemester(models.Model):
     """Records student's enrollment for each semester-session combination"""
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='semester_records')
@@ -117,16 +158,9 @@ class StudentSemester(models.Model):
     semester = models.ForeignKey(Semester, on_delete=models.PROTECT)
     
     
-    # Subjects for this semester (can change each semester)
-    major_course = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True, related_name='major_enrollments')
-
-    minor_course = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True, related_name='minor_enrollments')
-    md1 = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True, related_name='md1_enrollments')
-    md2 = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True, related_name='md2_enrollments')
-    skill = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True, related_name='skill_enrollments')
-    vac1 = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True, related_name='vac1_enrollments')
-    vac2 = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True, related_name='vac2_enrollments')
-    aec = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True, related_name='aec_enrollments')
+    # Subjects for this semester (can change each semester) are the
+    # StudentSubjectEnrollment rows; major_course ... aec and major_course_id
+    # ... aec_id below read and assign them slot by slot
     
     # Enrollment status for this semester
     is_enrolled = models.BooleanField(default=True)
@@ -148,6 +182,83 @@ class StudentSemester(models.Model):
     def __str__(self):
         return f"{self.student.student_name} - {self.session.session_code} - Sem {self.semester.semester_number}"
 
+    # {slot: subject id}, read from subject_enrollments on first use
+    _slot_ids = None
+    _slot_subjects = None
+    _slots_changed = False
+
+    @property
+    def slot_ids(self):
+        """
+        {slot: subject id} of the filled slots. Uses prefetch_related('subject_enrollments')
+        if done; otherwise the slots are read with their subjects in one query
+        """
+        if self._slot_ids is None:
+            self._slot_ids, self._slot_subjects = {}, {}
+            if self.pk is not None:
+                enrollments = self.subject_enrollments.all()
+                if 'subject_enrollments' not in getattr(self, '_prefetched_objects_cache', {}):
+                    enrollments = enrollments.select_related('subject')
+                for enrollment in enrollments:
+                    slot = SLOT_BY_COURSE_TYPE[enrollment.course_type]
+                    self._slot_ids[slot] = enrollment.subject_id
+                    if StudentSubjectEnrollment.subject.is_cached(enrollment):
+                        self._slot_subjects[slot] = enrollment.subject
+        return self._slot_ids
+
+    def save(self, *args, **kwargs):
+        # The record and its slots are written together or not at all
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self._slots_changed:
+                StudentSubjectEnrollment.objects.assign({self.pk: self.slot_ids})
+        self._slots_changed = False
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._slot_ids, self._slots_changed = None, False
+
+
+def _slot_properties(slot):
+    def get_id(record):
+        return record.slot_ids.get(slot)
+
+    def set_id(record, subject_id):
+        record.slot_ids[slot] = subject_id
+        record._slot_subjects.pop(slot, None)
+        record._slots_changed = True
+
+    def get_subject(record):
+        subject_id = record.slot_ids.get(slot)
+        if subject_id is None:
+            return None
+        subject = record._slot_subjects.get(slot)
+        if subject is None or subject.pk != subject_id:
+            # Prefetched without their subjects, or assigned by id: fetch
+            # every slot still missing its subject at once
+            missing = {
+                other: other_id for other, other_id in record.slot_ids.items()
+                if other_id is not None and getattr(record._slot_subjects.get(other), 'pk', None) != other_id
+            }
+            subjects = Subject.objects.in_bulk(set(missing.values()))
+            for other, other_id in missing.items():
+                record._slot_subjects[other] = subjects[other_id]
+            subject = record._slot_subjects[slot]
+        return subject
+
+    def set_subject(record, subject):
+        set_id(record, subject.pk if subject is not None else None)
+        if subject is not None:
+            record._slot_subjects[slot] = subject
+
+    return property(get_subject, set_subject), property(get_id, set_id)
+
+
+for _slot in COURSE_SLOTS:
+    _subject, _subject_id = _slot_properties(_slot)
+    setattr(StudentSemester, _slot, _subject)
+    setattr(StudentSemester, f'{_slot}_id', _subject_id)
+
 
 class Certificate(models.Model):
     CERTIFICATE_TYPE_CHOICES = [
@@ -171,6 +282,8 @@ class Certificate(models.Model):
     purpose = models.TextField(null=True, blank=True)
     remarks = models.TextField(null=True, blank=True)
     issued_by = models.CharField(max_length=200, null=True, blank=True)
+    # One per submitted issue form, so a resubmission returns the same certificate
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     final_year = models.CharField(max_length=20, null=True, blank=True)
     cgpa = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
@@ -179,35 +292,20 @@ class Certificate(models.Model):
     hard_copy_collected_by = models.CharField(max_length=200, null=True, blank=True)
     hard_copy_collection_date = models.DateField(null=True, blank=True)
 
+    @classmethod
     def can_issue_certificate(cls, student, certificate_type):
-        """Check if certificate can be issued"""
-        rules = {
-            'bonafide': {'max_count': None, 'wait_days': 180},
-            'degree': {'max_count': 1, 'wait_days': None},
-            'marks_card': {'max_count': 1, 'wait_days': None},
-            'character': {'max_count': 1, 'wait_days': None},
-        }
-        
-        rule = rules.get(certificate_type)
-        if not rule:
+        """Check if certificate can be issued; the rules are in studentcorner/eligibility.py"""
+        from .eligibility import RULES, check
+
+        if certificate_type not in RULES:
             return False, "Invalid certificate type", None
-        
-        existing = cls.objects.filter(student=student, certificate_type=certificate_type).order_by('-issue_date')
-        
-        # Check lifetime limit
-        if rule['max_count'] and existing.count() >= rule['max_count']:
-            last_cert = existing.first()
-            return False, f"Already issued on {last_cert.issue_date}. Can only be issued once.", last_cert
-        
-        # Check time gap
-        if rule['wait_days'] and existing.exists():
-            last_cert = existing.first()
-            days_since = (timezone.now().date() - last_cert.issue_date).days
-            if days_since < rule['wait_days']:
-                remaining = rule['wait_days'] - days_since
-                return False, f"Wait {remaining} more days", last_cert
-        
-        return True, "Can issue", None
+
+        decision = check(student, certificate_type)
+        if decision.allowed:
+            return True, "Can issue", None
+        last_cert = cls.objects.filter(
+            student=student, certificate_type=certificate_type).order_by('-issue_date', '-id').first()
+        return False, decision.reason, last_cert
     
     # Timestamps
     created_at = models.DateTimeField(default=timezone.now)
@@ -223,15 +321,222 @@ class Certificate(models.Model):
     def __str__(self):
         return f"{self.get_certificate_type_display()} - {self.student.student_name} - {self.issue_date}"
 
+class SubjectEnrollmentManager(models.Manager):
+    def assign(self, slots_by_record, replace=True, slots=None, batch_size=2000):
+        """
+        Store {student_semester id: {slot: subject id or None}} as the
+        records' subjects, without signals. With ``replace`` the records'
+        other slots are emptied; pass False for records that have none yet.
+        ``slots`` limits both to those slots, leaving the others as they are.
+        """
+        record_ids = list(slots_by_record)
+        slots = list(COURSE_SLOTS) if slots is None else list(slots)
+        if replace:
+            course_types = [COURSE_SLOTS[slot] for slot in slots]
+            for start in range(0, len(record_ids), batch_size):
+                self.filter(
+                    student_semester_id__in=record_ids[start:start + batch_size], course_type__in=course_types,
+                ).delete()
+        self.bulk_create([
+            self.model(student_semester_id=record_id, subject_id=subject_id, course_type=COURSE_SLOTS[slot])
+            for record_id, record_slots in slots_by_record.items()
+            for slot, subject_id in record_slots.items()
+            if subject_id is not None and slot in slots
+        ], batch_size=batch_size)
+
+
 class StudentSubjectEnrollment(models.Model):
+    """
+    A subject a student takes in one StudentSemester, in the slot given by
+    course_type (see COURSE_SLOTS). This is where subject choices are stored;
+    course_type is kept here so per-subject and per-slot counts need no join.
+    """
     student_semester = models.ForeignKey(StudentSemester, on_delete=models.CASCADE, related_name='subject_enrollments')
-    subject = models.ForeignKey(Subject, on_delete=models.PROTECT)
-    
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='enrollments')
+    course_type = models.CharField(max_length=20, choices=Subject.COURSE_TYPE_CHOICES)
+
+    objects = SubjectEnrollmentManager()
+
     class Meta:
         db_table = 'student_subject_enrollments'
-        unique_together = [['student_semester', 'subject']]
+        constraints = [
+            models.UniqueConstraint(fields=['student_semester', 'course_type'], name='unique_enrollment_slot'),
+        ]
+        indexes = [
+            models.Index(fields=['subject', 'student_semester']),
+            models.Index(fields=['course_type', 'subject']),
+        ]
+
+    def __str__(self):
+        return f"{self.student_semester_id} {self.course_type}: {self.subject_id}"
 
 
+class SubjectProgression(models.Model):
+    """
+    The subject students take in ``semester`` after taking ``from_subject``
+    the semester before, used when promoting a batch (see promotion.py).
+    Subjects without a row carry over unchanged; an empty ``to_subject``
+    leaves the slot empty.
+    """
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE, related_name='subject_progressions')
+    from_subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='progressions')
+    to_subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+
+    class Meta:
+        db_table = 'subject_progressions'
+        unique_together = [['semester', 'from_subject']]
+
+    def __str__(self):
+        return f"Sem {self.semester.semester_number}: {self.from_subject.subject_code} -> " + (
+            self.to_subject.subject_code if self.to_subject_id else 'dropped')
+
+    def clean(self):
+        if self.to_subject_id and self.from_subject_id and \
+                self.to_subject.course_type != self.from_subject.course_type:
+            raise ValidationError({'to_subject': 'Must be of the same course type as the subject it follows.'})
+
+
+class EnrollmentStats(models.Model):
+    """
+    Rollup of active enrollments, maintained by the signal handlers in
+    studentcorner/signals.py and rebuilt by the rebuild_stats command.
+
+    Rows with a subject count enrollments per subject slot; rows with an empty
+    course_type and no subject count the enrollments themselves.
+    """
+    session = models.ForeignKey(AcademicSession, on_delete=models.CASCADE)
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
+    batch = models.CharField(max_length=50)
+    gender = models.CharField(max_length=1, choices=Student.GENDER_CHOICES)
+    course_type = models.CharField(max_length=20, choices=Subject.COURSE_TYPE_CHOICES, blank=True)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'enrollment_stats'
+        unique_together = [['session', 'semester', 'batch', 'gender', 'course_type', 'subject']]
+        constraints = [
+            # NULLs are distinct in unique_together, so headcount rows need their own key
+            models.UniqueConstraint(
+                fields=['session', 'semester', 'batch', 'gender', 'course_type'],
+                condition=models.Q(subject__isnull=True),
+                name='unique_enrollment_stats_headcount',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['semester', 'course_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id}/{self.semester_id}/{self.batch}/{self.gender}/{self.course_type or '*'}/{self.subject_id}: {self.count}"
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Progress of a streaming spreadsheet import, committed together with each
+    chunk so an interrupted import resumes after the last committed row.
+    See studentcorner/importer.py.
+    """
+    source = models.CharField(max_length=500)
+    sheet = models.CharField(max_length=100)
+    # Size and modification time of the file; a changed file starts over
+    fingerprint = models.CharField(max_length=100)
+    rows_done = models.PositiveIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'import_checkpoint'
+        unique_together = [['source', 'sheet']]
+
+    def __str__(self):
+        return f"{self.source} [{self.sheet}]: {self.rows_done} rows"
+
+
+class RenderJob(models.Model):
+    """
+    A background task in the database-backed job queue, picked up by
+    `manage.py render_jobs work`. See studentcorner/jobs.py.
+    """
+    KIND_CHOICES = [
+        ('bonafide_pdf', 'Bonafide PDF'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    certificate = models.ForeignKey(Certificate, on_delete=models.CASCADE, null=True, blank=True, related_name='render_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Not picked up before this time; pushed back after a failed attempt
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    result = models.CharField(max_length=200, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'render_job'
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}: {self.status}"
+
+
+class CertificateEligibility(models.Model):
+    """
+    Whether a student may be issued a certificate type, from their
+    certificates and the rules in studentcorner/eligibility.py, which keeps it
+    up to date.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='eligibility')
+    certificate_type = models.CharField(max_length=50, choices=Certificate.CERTIFICATE_TYPE_CHOICES)
+    issued = models.PositiveIntegerField(default=0)
+    last_issued = models.DateField(null=True, blank=True)
+    # Not before this date (a cooldown); null when there is nothing to wait for
+    eligible_from = models.DateField(null=True, blank=True)
+    # Never again, or not until a prerequisite changes; see reason
+    blocked = models.BooleanField(default=False)
+    reason = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        db_table = 'certificate_eligibility'
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'certificate_type'], name='unique_certificate_eligibility'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} {self.certificate_type}: {'blocked' if self.blocked else self.eligible_from}"
+
+
+class CertificateCounter(models.Model):
+    """
+    The next certificate number for one certificate type in one year. Only
+    changed through studentcorner/numbering.py, which takes numbers in blocks.
+    """
+    certificate_type = models.CharField(max_length=50, choices=Certificate.CERTIFICATE_TYPE_CHOICES)
+    year = models.PositiveIntegerField()
+    next_value = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        db_table = 'certificate_counter'
+        constraints = [
+            models.UniqueConstraint(fields=['certificate_type', 'year'], name='unique_certificate_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.certificate_type} {self.year}: next {self.next_value}"
+
 # Add these fields to your Certificate model
 final_year = models.CharField(max_length=20, null=True, blank=True)
 cgpa = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
@@ -0,0 +1,147 @@
+"""
+Certificate numbers: PREFIX/YEAR/SEQUENCE, e.g. SMMDCZ/GN/2025/07
+
+Every certificate type has its own sequence per year, held in a
+CertificateCounter row. reserve() takes a block of consecutive numbers with
+one UPDATE, so bulk issuance numbers a whole batch in one round trip instead
+of going back to the counter for each certificate. Numbers are taken inside
+the issuing transaction: a rolled back issue hands its block back, and the
+sequence stays without gaps.
+
+Numbers are stored in Certificate.certificate_number when the certificate is
+issued. Certificates from before that printed ``id + 100`` as the sequence;
+migration 0018 starts the bonafide counters above those numbers, and
+backfill() stores them as printed, or renumbers them.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Certificate, CertificateCounter
+
+PREFIXES = {
+    'bonafide': 'SMMDCZ/GN',
+    'marks_sheet': 'SMMDCZ/MS',
+    'degree': 'SMMDCZ/DG',
+    'discharge_cum_character': 'SMMDCZ/DC',
+    'character_not_passed': 'SMMDCZ/CH',
+}
+# Sequence the PDFs printed before numbers were stored: certificate id + 100
+LEGACY_OFFSET = 100
+
+
+def format_number(certificate_type, year, sequence):
+    return f"{PREFIXES[certificate_type]}/{year}/{sequence:02d}"
+
+
+def parse_number(number):
+    """(prefix, year, sequence) of a formatted number, or None"""
+    prefix, _, rest = number.strip().upper().rpartition('/')
+    prefix, _, year = prefix.rpartition('/')
+    if not (prefix and year.isdigit() and rest.isdigit()):
+        return None
+    return prefix, int(year), int(rest)
+
+
+def canonical_number(number):
+    """``number`` as it is stored (upper case, sequence padded), or None if it is not one"""
+    parsed = parse_number(number)
+    if parsed is None:
+        return None
+    prefix, year, sequence = parsed
+    return f"{prefix}/{year}/{sequence:02d}"
+
+
+def legacy_number(certificate):
+    return format_number(certificate.certificate_type, certificate.issue_date.year,
+                         certificate.id + LEGACY_OFFSET)
+
+
+def number_of(certificate):
+    """The number to print: the stored one, or what was printed before numbers were stored"""
+    return certificate.certificate_number or legacy_number(certificate)
+
+
+def reserve(certificate_type, year, count=1):
+    """The next ``count`` sequence numbers of ``certificate_type`` in ``year``, as a range"""
+    with transaction.atomic(savepoint=False):
+        counter = CertificateCounter.objects.filter(certificate_type=certificate_type, year=year)
+        if not counter.update(next_value=F('next_value') + count):
+            try:
+                with transaction.atomic():
+                    CertificateCounter.objects.create(certificate_type=certificate_type, year=year,
+                                                      next_value=1 + count)
+                return range(1, 1 + count)
+            except IntegrityError:
+                # Created by someone else in the meantime
+                counter.update(next_value=F('next_value') + count)
+        next_value = counter.values_list('next_value', flat=True).get()
+    return range(next_value - count, next_value)
+
+
+def assign(certificates):
+    """
+    Number the certificates that have no number yet, in order, one block per
+    certificate type and year. Saving them is up to the caller.
+    """
+    groups = defaultdict(list)
+    for certificate in certificates:
+        if not certificate.certificate_number:
+            groups[certificate.certificate_type, certificate.issue_date.year].append(certificate)
+    for (certificate_type, year), group in groups.items():
+        for certificate, sequence in zip(group, reserve(certificate_type, year, len(group))):
+            certificate.certificate_number = format_number(certificate_type, year, sequence)
+    return certificates
+
+
+def advance(certificate_type, year, past):
+    """Make sure the counter hands out numbers above ``past``"""
+    counter, _ = CertificateCounter.objects.get_or_create(certificate_type=certificate_type, year=year)
+    if counter.next_value <= past:
+        CertificateCounter.objects.filter(pk=counter.pk).update(next_value=past + 1)
+
+
+def backfill(renumber=False, batch_size=1000, progress=None):
+    """
+    Store numbers for certificates that have none. Bonafides keep the number
+    already printed on them unless ``renumber``, and the counters are moved
+    past those numbers; everything else gets the next numbers in issue order.
+    Returns how many certificates were numbered.
+    """
+    progress = progress or (lambda message: None)
+    pending = Certificate.objects.filter(certificate_number__isnull=True).order_by('issue_date', 'id')
+    numbered = 0
+    with transaction.atomic():
+        if not renumber:
+            legacy = list(pending.filter(certificate_type='bonafide').only('id', 'certificate_type', 'issue_date'))
+            numbers = [legacy_number(certificate) for certificate in legacy]
+            taken = set()
+            for start in range(0, len(numbers), batch_size):
+                taken.update(Certificate.objects.filter(
+                    certificate_number__in=numbers[start:start + batch_size],
+                ).values_list('certificate_number', flat=True))
+            highest = {}
+            for certificate in legacy:
+                number = legacy_number(certificate)
+                if number in taken:
+                    continue  # Collides with a number issued since; gets a fresh one below
+                certificate.certificate_number = number
+                key = (certificate.certificate_type, certificate.issue_date.year)
+                highest[key] = max(highest.get(key, 0), certificate.id + LEGACY_OFFSET)
+            for (certificate_type, year), past in highest.items():
+                advance(certificate_type, year, past)
+            kept = [certificate for certificate in legacy if certificate.certificate_number]
+            Certificate.objects.bulk_update(kept, ['certificate_number'], batch_size=batch_size)
+            numbered += len(kept)
+            progress(f'Kept the printed numbers of {len(kept)} bonafides')
+
+        while True:
+            batch = list(pending.only('id', 'certificate_type', 'issue_date')[:batch_size])
+            if not batch:
+                break
+            Certificate.objects.bulk_update(assign(batch), ['certificate_number'], batch_size=batch_size)
+            numbered += len(batch)
+            progress(f'Numbered {numbered} certificates')
+    return numbered
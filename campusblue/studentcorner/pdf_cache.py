@@ -0,0 +1,146 @@
+"""
+Content-addressed on-disk store for rendered bonafide certificates
+
+A PDF is filed under its certificate id plus a SHA-256 of everything that is
+drawn on the page, so a certificate is rendered once and served from disk
+until the student record, the layout or the logos change.
+
+The store is kept under BONAFIDE_PDF_CACHE_MAX_BYTES by evict(), which stats
+every cached file. store() runs it only after each 1/EVICT_FRACTION of the cap
+written by this process, so a render costs a constant amount of filesystem
+work on average however large the store grows; the cap may be overshot by
+that much per process in between. `manage.py bonafide_pdf_cache evict` from
+cron enforces it exactly.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+from . import render_service
+from .pdf_generator import bonafide_render_inputs
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+EVICT_FRACTION = 20
+
+# Bytes this process has stored since it last ran evict()
+_written = 0
+_written_lock = threading.Lock()
+
+
+def cache_dir():
+    return Path(getattr(settings, 'BONAFIDE_PDF_CACHE_DIR', Path(settings.BASE_DIR) / 'pdf_cache'))
+
+
+def max_bytes():
+    return getattr(settings, 'BONAFIDE_PDF_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+
+def content_key(student, certificate, student_semester=None):
+    return payload_key(bonafide_render_inputs(student, certificate, student_semester))
+
+
+def payload_key(payload):
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _bucket(certificate_id):
+    return cache_dir() / f"{certificate_id % 256:02x}"
+
+
+def path_for(certificate_id, key):
+    return _bucket(certificate_id) / f"{certificate_id}-{key}.pdf"
+
+
+def _entries():
+    root = cache_dir()
+    if not root.is_dir():
+        return []
+    entries = []
+    for path in root.glob('*/*.pdf'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def store(certificate_id, key, pdf_bytes):
+    """Atomically write a rendered PDF and drop older renders of the same certificate"""
+    path = path_for(certificate_id, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(pdf_bytes)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    for stale in path.parent.glob(f"{certificate_id}-*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+    if _due_for_eviction(len(pdf_bytes)):
+        evict()
+    return path
+
+
+def _due_for_eviction(size):
+    global _written
+    with _written_lock:
+        _written += size
+        if _written < max_bytes() / EVICT_FRACTION:
+            return False
+        _written = 0
+        return True
+
+
+def get_or_render(student, certificate, student_semester=None, key=None):
+    """Return ``(path, key)`` for the certificate PDF, rendering it on a miss"""
+    payload = bonafide_render_inputs(student, certificate, student_semester)
+    key = key or payload_key(payload)
+    path = path_for(certificate.id, key)
+    if path.exists():
+        os.utime(path)  # Mark as recently used for eviction
+        return path, key
+
+    return store(certificate.id, key, render_service.render(payload)), key
+
+
+def evict(limit=None):
+    """Remove least recently used PDFs until the store fits under ``limit`` bytes"""
+    limit = max_bytes() if limit is None else limit
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def purge():
+    """Remove every cached PDF"""
+    removed = 0
+    for _, _, path in _entries():
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def stats():
+    entries = _entries()
+    return {'files': len(entries), 'bytes': sum(size for _, size, _ in entries)}
@@ -4,118 +4,277 @@ Replace your existing pdf_generator.py with this file
 """
 
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import inch, mm
+from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
+from PIL import Image
 from io import BytesIO
-from datetime import datetime
+from datetime import date, datetime
 import os
+import threading
+import zipfile
 from django.conf import settings
+from django.utils import timezone
+
+# Bump whenever the certificate layout changes so cached PDFs are re-rendered
+LAYOUT_VERSION = 3
+
+PAGE_WIDTH, PAGE_HEIGHT = A4  # 595.27 x 841.89 points
+
+LETTERHEAD_FORM = 'bonafide_letterhead'
+
+# Vertical positions shared by the static layer and the per-certificate fields
+HEADER_TEXT_Y = PAGE_HEIGHT - 50
+CERT_NUMBER_Y = HEADER_TEXT_Y - 90
+TITLE_Y = CERT_NUMBER_Y - 35
+
+
+def _logo_paths():
+    images_dir = os.path.join(settings.BASE_DIR, 'studentcorner', 'static', 'images')
+    return (
+        os.path.join(images_dir, 'left_logo.png'),
+        os.path.join(images_dir, 'right_logo.png'),
+    )
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class _FlattenedLogo:
+    """
+    A logo decoded once and flattened onto the white page, so it needs no
+    soft mask. Drawn with the public drawImage(); the ImageReader keeps the
+    decoded pixels, so each canvas only compresses them into its own
+    document.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        image = Image.open(path).convert('RGBA')
+        flattened = Image.new('RGB', image.size, 'white')
+        flattened.paste(image, mask=image.getchannel('A'))
+        self.image = ImageReader(flattened)
+        self.image.getRGBData()
+
+    def draw(self, p, x, y, width, height):
+        p.drawImage(self.image, x, y, width=width, height=height, preserveAspectRatio=True)
+
+
+class StaticLayer:
+    """
+    Fixed part of the bonafide certificate: letterhead, logos, title and
+    photo box. Built once per set of logo files and stamped onto each
+    certificate as a form XObject.
+    """
+
+    def __init__(self, left_logo_path, right_logo_path):
+        self.left_logo_path = left_logo_path
+        self.right_logo_path = right_logo_path
+        self.mtimes = (_mtime(left_logo_path), _mtime(right_logo_path))
+        self.left_logo = self._load(left_logo_path, self.mtimes[0])
+        self.right_logo = self._load(right_logo_path, self.mtimes[1])
+
+    @staticmethod
+    def _load(path, mtime):
+        if mtime is None:
+            return None
+        try:
+            return _FlattenedLogo(path)
+        except Exception:
+            return None  # Skip if logo cannot be read
+
+    def is_stale(self):
+        return self.mtimes != (_mtime(self.left_logo_path), _mtime(self.right_logo_path))
+
+    def install(self, p):
+        """Define the letterhead form on canvas ``p`` (once per document)."""
+        if p.hasForm(LETTERHEAD_FORM):
+            return
+        p.beginForm(LETTERHEAD_FORM)
+        self.draw(p)
+        p.endForm()
+
+    def draw(self, p):
+        width, height = PAGE_WIDTH, PAGE_HEIGHT
+
+        # ===== HEADER SECTION WITH LOGOS =====
+        header_y = height - 80  # Start from top
+
+        # Left logo (0.75625 inch x 0.9819 inch from document)
+        if self.left_logo is not None:
+            self.left_logo.draw(p, 50, header_y, width=0.75625*inch, height=0.9819*inch)
+
+        # Right logo (0.7347 inch x 0.8736 inch from document)
+        if self.right_logo is not None:
+            self.right_logo.draw(p, width - 50 - 0.7347*inch, header_y, width=0.7347*inch, height=0.8736*inch)
+
+        # ===== COLLEGE HEADER TEXT (CENTER ALIGNED) =====
+        text_y = HEADER_TEXT_Y
+
+        # Line 1: Office of the Principal (Bold + Underlined)
+        p.setFont("Helvetica-Bold", 14)
+        line1 = "Office of the Principal Saqib Mohi-ud-Din Memorial"
+        line1_width = p.stringWidth(line1, "Helvetica-Bold", 14)
+        line1_x = (width - line1_width) / 2
+        p.drawString(line1_x, text_y, line1)
+        # Draw underline
+        p.line(line1_x, text_y - 2, line1_x + line1_width, text_y - 2)
+
+        # Line 2: College Name (Bold)
+        text_y -= 20
+        p.setFont("Helvetica-Bold", 13)
+        line2 = "Govt. Degree College Zainapora (Shopian)"
+        p.drawCentredString(width/2, text_y, line2)
+
+        # Line 3: UT Of J&K (Bold)
+        text_y -= 20
+        p.setFont("Helvetica-Bold", 14)
+        line3 = "UT Of J&K"
+        p.drawCentredString(width/2, text_y, line3)
+
+        # Line 4: Contact Information (Bold, smaller font)
+        text_y -= 20
+        p.setFont("Helvetica-Bold", 9)
+        line4 = "Mail: gdczainapora@gmail.com Website: www.gdczainapora.edu.in"
+        p.drawCentredString(width/2, text_y, line4)
+
+        # ===== TITLE: BONAFIDE CERTIFICATE =====
+        p.setFont("Helvetica-Bold", 14)
+        title = "BONAFIDE CERTIFICATE"
+        p.drawCentredString(width/2, TITLE_Y, title)
+
+        # ===== PHOTO PLACEHOLDER BOX (TOP RIGHT) =====
+        # Position photo box in top right area
+        photo_x = width - 150  # 150 points from right edge
+        photo_y = TITLE_Y - 20  # Below the title
+        photo_width = 1.2 * inch
+        photo_height = 1.5 * inch
+
+        # Draw photo box
+        p.setLineWidth(1)
+        p.rect(photo_x, photo_y - photo_height, photo_width, photo_height, stroke=1, fill=0)
+
+        # Add "Affix Photograph Here" text inside box
+        p.setFont("Helvetica", 8)
+        p.drawCentredString(photo_x + photo_width/2, photo_y - photo_height/2 + 10, "Affix")
+        p.drawCentredString(photo_x + photo_width/2, photo_y - photo_height/2 - 5, "Photograph")
+        p.drawCentredString(photo_x + photo_width/2, photo_y - photo_height/2 - 20, "Here")
+
+
+_static_layer = None
+_static_layer_lock = threading.Lock()
+
+
+def get_static_layer():
+    """Return the cached static layer, rebuilding it when a logo file changes."""
+    global _static_layer
+    layer = _static_layer
+    if layer is None or layer.is_stale():
+        with _static_layer_lock:
+            layer = _static_layer
+            if layer is None or layer.is_stale():
+                layer = _static_layer = StaticLayer(*_logo_paths())
+    return layer
+
+
+def clear_static_layer():
+    """Drop the cached static layer so the next render rebuilds it."""
+    global _static_layer
+    with _static_layer_lock:
+        _static_layer = None
+
+
+def bonafide_render_inputs(student, certificate, student_semester=None):
+    """Everything that ends up on the page; equal inputs render identical bytes."""
+    # Not at module level: render worker processes import this module without the ORM
+    from .numbering import number_of
+
+    return {
+        'layout_version': LAYOUT_VERSION,
+        'static_layer': get_static_layer().mtimes,
+        'certificate_id': certificate.id,
+        'certificate_number': number_of(certificate),
+        'issue_date': certificate.issue_date.isoformat(),
+        'created_at': certificate.created_at.isoformat(),
+        'student_name': student.student_name,
+        'parent_name': student.parent_name,
+        'gender': student.gender,
+        'batch': student.batch,
+        'class_roll_no': student.class_roll_no,
+        'u_registration_no': student.u_registration_no,
+        'course_name': student.course_name,
+        'semester_name': student_semester.semester.semester_name if student_semester else None,
+    }
+
 
 def generate_bonafide_certificate(student, certificate, student_semester=None):
     """
     Generate a bonafide certificate PDF matching the exact Word document format
     """
+    return BytesIO(render_bonafide_payload(bonafide_render_inputs(student, certificate, student_semester)))
+
+
+def render_bonafide_payload(payload):
+    """PDF bytes for one certificate payload; needs no database access"""
     buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4  # 595.27 x 841.89 points
-    
+    p = canvas.Canvas(buffer, pagesize=A4, invariant=True)
+
     # Set title
-    p.setTitle(f"Bonafide Certificate - {student.student_name}")
-    
-    # ===== HEADER SECTION WITH LOGOS =====
-    header_y = height - 80  # Start from top
-    
-    left_logo_path = os.path.join(settings.BASE_DIR, 'studentcorner', 'static', 'images', 'left_logo.png')
-    right_logo_path = os.path.join(settings.BASE_DIR, 'studentcorner', 'static', 'images', 'right_logo.png') 
-    # Left logo (0.75625 inch x 0.9819 inch from document)
-    try:
-        if os.path.exists(left_logo_path):
-            p.drawImage(left_logo_path, 50, header_y, 
-                       width=0.75625*inch, height=0.9819*inch, 
-                       preserveAspectRatio=True, mask='auto')
-    except Exception as e:
-        pass  # Skip if logo not found
-    
-    # Right logo (0.7347 inch x 0.8736 inch from document)
-    try:
-        if os.path.exists(right_logo_path):
-            p.drawImage(right_logo_path, width - 50 - 0.7347*inch, header_y,
-                       width=0.7347*inch, height=0.8736*inch,
-                       preserveAspectRatio=True, mask='auto')
-    except Exception as e:
-        pass  # Skip if logo not found
-    
-    # ===== COLLEGE HEADER TEXT (CENTER ALIGNED) =====
-    text_y = height - 50
-    
-    # Line 1: Office of the Principal (Bold + Underlined)
-    p.setFont("Helvetica-Bold", 14)
-    line1 = "Office of the Principal Saqib Mohi-ud-Din Memorial"
-    line1_width = p.stringWidth(line1, "Helvetica-Bold", 14)
-    line1_x = (width - line1_width) / 2
-    p.drawString(line1_x, text_y, line1)
-    # Draw underline
-    p.line(line1_x, text_y - 2, line1_x + line1_width, text_y - 2)
-    
-    # Line 2: College Name (Bold)
-    text_y -= 20
-    p.setFont("Helvetica-Bold", 13)
-    line2 = "Govt. Degree College Zainapora (Shopian)"
-    p.drawCentredString(width/2, text_y, line2)
-    
-    # Line 3: UT Of J&K (Bold)
-    text_y -= 20
-    p.setFont("Helvetica-Bold", 14)
-    line3 = "UT Of J&K"
-    p.drawCentredString(width/2, text_y, line3)
+    p.setTitle(f"Bonafide Certificate - {payload['student_name']}")
+
+    draw_bonafide_payload(p, payload)
+
+    # Save
+    p.save()
+    return buffer.getvalue()
+
+
+def render_bonafide_payloads(payloads):
+    """One multi-page PDF for many certificate payloads; the letterhead form is defined once"""
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4, invariant=True)
+    p.setTitle(f"Bonafide Certificates ({len(payloads)})")
+
+    for payload in payloads:
+        draw_bonafide_payload(p, payload)
+
+    p.save()
+    return buffer.getvalue()
+
+
+def draw_bonafide_page(p, student, certificate, student_semester=None):
+    """Stamp one certificate onto the current page of ``p`` and end the page."""
+    draw_bonafide_payload(p, bonafide_render_inputs(student, certificate, student_semester))
+
+
+def draw_bonafide_payload(p, payload):
+    """Stamp the certificate described by ``payload`` (see bonafide_render_inputs) and end the page."""
+    issue_date = date.fromisoformat(payload['issue_date'])
+    layer = get_static_layer()
+    layer.install(p)
+    p.doForm(LETTERHEAD_FORM)
+
+    width = PAGE_WIDTH
     left_margin = 70
-    # Line 4: Contact Information (Bold, smaller font)
-    text_y -= 20
-    p.setFont("Helvetica-Bold", 9)
-    line4 = "Mail: gdczainapora@gmail.com Website: www.gdczainapora.edu.in"
-    p.drawCentredString(width/2, text_y, line4)
-    
+
     # ===== CERTIFICATE NUMBER AND DATE =====
-    text_y -= 30
+    text_y = CERT_NUMBER_Y
     p.setFont("Helvetica-Bold", 12)
-    
+
     # Certificate number (left aligned)
-    current_year = datetime.now().year
-    cert_no=certificate.id+100
-    cert_number = f"SMMDCZ/GN/{current_year}/{cert_no:02d}"
-    p.drawString(left_margin, text_y, cert_number)
-    
+    p.drawString(left_margin, text_y, payload['certificate_number'])
+
     # Date (right aligned)
-    date_str = f"Dated: {certificate.issue_date.strftime('%d-%m-%Y')}"
-    date_width = p.stringWidth(date_str, "Helvetica-Bold", 12)
+    date_str = f"Dated: {issue_date.strftime('%d-%m-%Y')}"
     p.drawRightString(width - 70, text_y, date_str)
-    
-    # ===== TITLE: BONAFIDE CERTIFICATE =====
-    text_y -= 35
-    p.setFont("Helvetica-Bold", 14)
-    title = "BONAFIDE CERTIFICATE"
-    p.drawCentredString(width/2, text_y, title)
-    
-    # ===== PHOTO PLACEHOLDER BOX (TOP RIGHT) =====
-    # Position photo box in top right area
-    photo_x = width - 150  # 150 points from right edge
-    photo_y = text_y - 20  # Below the title
-    body_y=text_y-70
-    photo_width = 1.2 * inch
-    photo_height = 1.5 * inch
-    
-    # Draw photo box
-    p.setLineWidth(1)
-    p.rect(photo_x, photo_y - photo_height, photo_width, photo_height, stroke=1, fill=0)
-    
-    # Add "Affix Photograph Here" text inside box
-    p.setFont("Helvetica", 8)
-    p.drawCentredString(photo_x + photo_width/2, photo_y - photo_height/2 + 10, "Affix")
-    p.drawCentredString(photo_x + photo_width/2, photo_y - photo_height/2 - 5, "Photograph")
-    p.drawCentredString(photo_x + photo_width/2, photo_y - photo_height/2 - 20, "Here")
-    
- # ===== CERTIFICATE BODY =====
+
+    text_y = TITLE_Y
+
+    # ===== CERTIFICATE BODY =====
     body_y = text_y - 40
     left_margin = 70  # Define left margin here
     line_spacing = 22
@@ -131,7 +290,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     name_x = left_margin + line1_width
     
     p.setFont("Helvetica-Bold", 14)
-    student_name = student.student_name.upper()
+    student_name = payload['student_name'].upper()
     name_width = p.stringWidth(student_name, "Helvetica-Bold", 14)
     
     # Center the name on the underline
@@ -144,7 +303,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     # Line 2: S.O/D.O
     body_y -= line_spacing
     p.setFont("Helvetica", 14)
-    relation = "S.O" if student.gender == 'M' else "D.O"
+    relation = "S.O" if payload['gender'] == 'M' else "D.O"
     line2 = f"{relation} "
     line2_width = p.stringWidth(line2, "Helvetica", 14)
     p.drawString(left_margin, body_y, line2)
@@ -152,7 +311,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     # Parent name (centered on underline)
     parent_x = left_margin + line2_width
     p.setFont("Helvetica-Bold", 14)
-    parent_name = student.parent_name.upper()
+    parent_name = payload['parent_name'].upper()
     parent_width = p.stringWidth(parent_name, "Helvetica-Bold", 14)
     
     # Center the parent name on the underline
@@ -178,10 +337,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     sem_x = left_margin + ug_width
     underline_sem_length = 100
     
-    if student_semester:
-        semester_name = student_semester.semester.semester_name
-    else:
-        semester_name = "_____________"
+    semester_name = payload['semester_name'] or "_____________"
     
     p.setFont("Helvetica-Bold", 14)
     sem_width = p.stringWidth(semester_name, "Helvetica-Bold", 14)
@@ -203,12 +359,11 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     year_width = p.stringWidth(year_label, "Helvetica", 14)
     p.drawString(left_margin, body_y, year_label)
     
-    # Academic year (centered on underline) - Always use current year
+    # Academic year (centered on underline) - Always the year of issue
     year_x = left_margin + year_width
     underline_year_length = 150
     
-    current_year = datetime.now().year
-    session_name = str(current_year)
+    session_name = str(issue_date.year)
     
     p.setFont("Helvetica-Bold", 14)
     year_str_width = p.stringWidth(session_name, "Helvetica-Bold", 14)
@@ -230,7 +385,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     underline_batch_length = 120
     
     p.setFont("Helvetica-Bold", 14)
-    batch_str = student.batch
+    batch_str = payload['batch']
     batch_str_width = p.stringWidth(batch_str, "Helvetica-Bold", 14)
     
     # Center batch on underline
@@ -250,7 +405,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     underline_roll_length = 120
     
     p.setFont("Helvetica-Bold", 14)
-    roll_str = student.class_roll_no
+    roll_str = payload['class_roll_no']
     roll_str_width = p.stringWidth(roll_str, "Helvetica-Bold", 14)
     
     # Center roll number on underline
@@ -259,7 +414,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     p.line(roll_x, body_y - 2, roll_x + underline_roll_length, body_y - 2)
     
     # Line 7: Registration No (only if available)
-    if student.u_registration_no and student.u_registration_no.strip():
+    if payload['u_registration_no'] and payload['u_registration_no'].strip():
         body_y -= line_spacing
         p.setFont("Helvetica", 14)
         reg_label = "Registration No. "
@@ -271,7 +426,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
         underline_reg_length = 150
         
         p.setFont("Helvetica-Bold", 14)
-        reg_str = student.u_registration_no
+        reg_str = payload['u_registration_no']
         reg_str_width = p.stringWidth(reg_str, "Helvetica-Bold", 14)
         
         # Center registration number on underline
@@ -287,7 +442,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     
     course_x = left_margin + course_width
     p.setFont("Helvetica-Bold", 14)
-    p.drawString(course_x, body_y, student.course_name)
+    p.drawString(course_x, body_y, payload['course_name'])
     
     # ===== DATE AND SIGNATURE =====
     body_y -= 60
@@ -303,7 +458,7 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     underline_date_length = 100
     
     p.setFont("Helvetica-Bold", 14)
-    date_str_value = certificate.issue_date.strftime('%d/%m/%Y')
+    date_str_value = issue_date.strftime('%d/%m/%Y')
     date_str_width = p.stringWidth(date_str_value, "Helvetica-Bold", 12)
     
     # Center date on underline
@@ -321,12 +476,50 @@ def generate_bonafide_certificate(student, certificate, student_semester=None):
     # ===== FOOTER =====
     p.setFont("Helvetica", 7)
     p.setFillColorRGB(0.6, 0.6, 0.6)
-    footer_text = f"Generated on {datetime.now().strftime('%d-%m-%Y at %I:%M %p')}"
+    generated_at = timezone.localtime(datetime.fromisoformat(payload['created_at']))
+    footer_text = f"Generated on {generated_at.strftime('%d-%m-%Y at %I:%M %p')}"
     p.drawCentredString(width/2, 30, footer_text)
     
-    # Save
     p.showPage()
-    p.save()
-    
+
+
+def generate_bonafide_certificates(certificates):
+    """
+    Render many bonafide certificates into one multi-page PDF.
+
+    Each certificate needs ``student`` and ``student_semester`` loaded.
+    """
+    return BytesIO(render_bonafide_payloads(bonafide_payloads(certificates)))
+
+
+def bonafide_payloads(certificates):
+    return [
+        bonafide_render_inputs(certificate.student, certificate, certificate.student_semester)
+        for certificate in certificates
+    ]
+
+
+def bonafide_filename(student, certificate):
+    identifier = student.u_registration_no or student.class_roll_no
+    return f"bonafide_{identifier}_{certificate.issue_date}.pdf"
+
+
+def generate_bonafide_zip(certificates, render_many=None):
+    """
+    Render each certificate as its own PDF and pack them into a zip archive.
+
+    ``render_many`` maps a list of payloads to a list of PDFs; by default they
+    are rendered one after another in this process.
+    """
+    certificates = list(certificates)
+    if render_many is None:
+        render_many = lambda payloads: [render_bonafide_payload(payload) for payload in payloads]
+    pdfs = render_many(bonafide_payloads(certificates))
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for certificate, pdf in zip(certificates, pdfs):
+            archive.writestr(bonafide_filename(certificate.student, certificate), pdf)
+
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
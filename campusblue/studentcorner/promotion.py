@@ -0,0 +1,146 @@
+"""
+Promoting a batch: StudentSemester records for a target (session, semester)
+copied from those of a source one
+
+plan() reads the source records whose students have no target record yet
+(one anti-join, plus one query for their subjects) and works out the new
+records' subjects: every slot keeps its subject unless a SubjectProgression
+row for the target semester maps it to another one or drops it. promote()
+writes the plan with bulk_create inside one transaction and updates the
+rollup once, instead of one admin save (unique check, signals) per student.
+"""
+
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import caching, rollup
+from .models import COURSE_SLOTS, StudentSemester, StudentSubjectEnrollment, SubjectProgression
+
+
+@dataclass
+class Promotion:
+    source_session: object
+    source_semester: object
+    target_session: object
+    target_semester: object
+    # Unsaved target records, subjects assigned, in roll number order
+    records: list = field(default_factory=list)
+    # {student id: source record} of those records
+    sources: dict = field(default_factory=dict, repr=False)
+    # Source records left alone because the student already has a target record
+    skipped: int = 0
+    # Slots whose subject a SubjectProgression changed or dropped
+    remapped: int = 0
+    created: int = 0
+    timings: dict = field(default_factory=dict)
+
+    def diff(self):
+        """One line per new record with its subjects, and where they differ from the source record's"""
+        codes = {
+            subject.id: subject.subject_code
+            for subjects in caching.subject_catalogue().values() for subject in subjects
+        }
+        lines = []
+        for record in self.records:
+            before = self.sources[record.student_id].slot_ids
+            slots = []
+            for slot in COURSE_SLOTS:
+                old, new = before.get(slot), record.slot_ids.get(slot)
+                if old == new:
+                    if new is not None:
+                        slots.append(f'{slot} {codes.get(new, new)}')
+                else:
+                    slots.append(f'{slot} {codes.get(old, old)} -> {codes.get(new, new) if new else "(none)"}')
+            student = record.student
+            lines.append(f'+ {student.class_roll_no} {student.student_name}: ' + (', '.join(slots) or 'no subjects'))
+        return lines
+
+
+def progressions(target_semester):
+    """{from subject id: to subject id or None} for ``target_semester`` (one query)"""
+    return dict(SubjectProgression.objects.filter(semester=target_semester).values_list('from_subject_id', 'to_subject_id'))
+
+
+def source_records(source_session, source_semester, target_session, target_semester, batch=None):
+    """Enrolled source records of active students with no target record yet, and how many have one"""
+    already = StudentSemester.objects.filter(
+        student=OuterRef('student'), session=target_session, semester=target_semester)
+    records = (
+        StudentSemester.objects.filter(
+            session=source_session, semester=source_semester, is_enrolled=True, student__is_active=True)
+        .annotate(promoted=Exists(already))
+        .select_related('student')
+        .prefetch_related('subject_enrollments')
+        .order_by('student__class_roll_no')
+    )
+    if batch:
+        records = records.filter(student__batch=batch)
+    records = list(records)
+    pending = [record for record in records if not record.promoted]
+    return pending, len(records) - len(pending)
+
+
+def plan(source_session, source_semester, target_session, target_semester, batch=None, enrollment_date=None):
+    """The Promotion that promote() would carry out, without writing anything (three queries)"""
+    if (source_session, source_semester) == (target_session, target_semester):
+        raise ValueError('The source and target are the same session and semester')
+    enrollment_date = enrollment_date or timezone.now().date()
+    promotion = Promotion(source_session, source_semester, target_session, target_semester)
+    mapping = progressions(target_semester)
+    sources, promotion.skipped = source_records(
+        source_session, source_semester, target_session, target_semester, batch)
+
+    for source in sources:
+        record = StudentSemester(
+            student=source.student, session=target_session, semester=target_semester,
+            is_enrolled=True, enrollment_date=enrollment_date,
+        )
+        for slot, subject_id in source.slot_ids.items():
+            if subject_id in mapping:
+                promotion.remapped += 1
+                subject_id = mapping[subject_id]
+            setattr(record, f'{slot}_id', subject_id)
+        promotion.records.append(record)
+    promotion.sources = {source.student_id: source for source in sources}
+    return promotion
+
+
+def promote(source_session, source_semester, target_session, target_semester, batch=None,
+            enrollment_date=None, dry_run=False, batch_size=2000):
+    """
+    Create the target records plan() works out, with their subjects, in one
+    transaction; with ``dry_run`` only plan. Returns the Promotion, with the
+    seconds each step took in ``timings``.
+    """
+    with transaction.atomic():
+        started = time.perf_counter()
+        promotion = plan(source_session, source_semester, target_session, target_semester, batch, enrollment_date)
+        promotion.timings['plan'] = time.perf_counter() - started
+        if dry_run or not promotion.records:
+            return promotion
+
+        started = time.perf_counter()
+        StudentSemester.objects.bulk_create(promotion.records, batch_size=batch_size)
+        promotion.timings['insert'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        StudentSubjectEnrollment.objects.assign(
+            {record.pk: record.slot_ids for record in promotion.records}, replace=False, batch_size=batch_size)
+        for record in promotion.records:
+            record._slots_changed = False
+        promotion.timings['subjects'] = time.perf_counter() - started
+
+        # bulk_create skips the signals that keep the rollup current
+        started = time.perf_counter()
+        deltas = Counter()
+        for record in promotion.records:
+            deltas.update(rollup.student_contributions(record, record.student))
+        rollup.apply(deltas)
+        promotion.timings['rollup'] = time.perf_counter() - started
+        promotion.created = len(promotion.records)
+    return promotion
@@ -0,0 +1,220 @@
+"""
+Bonafide PDF rendering in a pool of worker processes
+
+ReportLab is CPU-bound pure Python, so rendering inline holds the GIL of the
+request thread. The service hands plain-dict payloads (see
+pdf_generator.bonafide_render_inputs) to a ProcessPoolExecutor whose workers
+set up Django, load the logos and fonts once, and then only draw. At most
+BONAFIDE_RENDER_QUEUE renders may be pending; callers wait up to
+BONAFIDE_RENDER_QUEUE_TIMEOUT seconds for a slot and then get RenderQueueFull.
+A render that takes longer than BONAFIDE_RENDER_TIMEOUT, or whose worker
+died, is rendered again in the calling thread, so a stuck worker never holds
+a request for longer than that.
+
+BONAFIDE_RENDER_WORKERS = 0 renders in the calling thread instead. Each worker
+costs a django.setup(), so the pool is small. It starts on first use in each
+server process: a pool created at import time would be created in the master
+of a pre-forking server (gunicorn --preload, uWSGI) and inherited by its
+workers.
+"""
+
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from django.conf import settings
+
+from . import instrumentation, pdf_generator
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_TIMEOUT = 30
+DEFAULT_RENDER_TIMEOUT = 30
+
+
+class RenderQueueFull(Exception):
+    """Too many renders are pending; try again later"""
+
+
+WARM_UP_PAYLOAD = {
+    'layout_version': pdf_generator.LAYOUT_VERSION,
+    'static_layer': None,
+    'certificate_id': 0,
+    'certificate_number': 'SMMDCZ/GN/2025/00',
+    'issue_date': '2025-01-01',
+    'created_at': '2025-01-01T00:00:00+00:00',
+    'student_name': 'Warm Up',
+    'parent_name': 'Warm Up',
+    'gender': 'F',
+    'batch': '2025',
+    'class_roll_no': '0',
+    'u_registration_no': '0',
+    'course_name': 'Warm Up',
+    'semester_name': '1st',
+}
+
+
+def _warm_worker():
+    """Runs once in every worker process before it takes any work"""
+    import django
+    django.setup()
+    pdf_generator.get_static_layer()
+    # Pay for the font metrics and the first canvas outside of any request
+    pdf_generator.render_bonafide_payload(WARM_UP_PAYLOAD)
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+class RenderService:
+    def __init__(self, workers, max_pending, queue_timeout=DEFAULT_QUEUE_TIMEOUT,
+                 render_timeout=DEFAULT_RENDER_TIMEOUT, start_method='spawn'):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.render_timeout = render_timeout
+        self.start_method = start_method
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor_lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        if not self.workers:
+            return None
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context(self.start_method),
+            initializer=_warm_worker,
+        )
+
+    def _submit_to_pool(self, fn, args):
+        executor = self._executor
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory); start a fresh pool once
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = self._new_executor()
+            return self._executor.submit(fn, *args)
+
+    def submit(self, fn, *args):
+        """Queue ``fn(*args)``, waiting for a free slot; returns a Future"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise RenderQueueFull(f'{self.max_pending} renders already pending')
+
+        if self._executor is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+        else:
+            try:
+                future = self._submit_to_pool(fn, args)
+            except BaseException:
+                self._slots.release()
+                raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future, deadline, fn, *args):
+        """
+        The result of ``future``, or ``fn(*args)`` run here if the worker has
+        not delivered it by ``deadline`` (time.monotonic()) or has died
+        """
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except (TimeoutError, BrokenProcessPool):
+            # Frees the slot unless a worker is still busy with it; the next
+            # submit replaces a broken pool
+            future.cancel()
+            return fn(*args)
+
+    def render(self, payload):
+        """PDF bytes for one payload"""
+        deadline = time.monotonic() + self.render_timeout
+        future = self.submit(pdf_generator.render_bonafide_payload, payload)
+        return self._result(future, deadline, pdf_generator.render_bonafide_payload, payload)
+
+    def render_many(self, payloads):
+        """PDF bytes for each payload, rendered in parallel, in payload order"""
+        deadline = time.monotonic() + self.render_timeout
+        futures = [self.submit(pdf_generator.render_bonafide_payload, payload) for payload in payloads]
+        return [self._result(future, deadline, pdf_generator.render_bonafide_payload, payload)
+                for future, payload in zip(futures, payloads)]
+
+    def render_document(self, payloads):
+        """One multi-page PDF for all payloads, rendered by a single worker"""
+        payloads = list(payloads)
+        deadline = time.monotonic() + self.render_timeout
+        future = self.submit(pdf_generator.render_bonafide_payloads, payloads)
+        return self._result(future, deadline, pdf_generator.render_bonafide_payloads, payloads)
+
+    def warm(self):
+        """Start every worker now rather than on the first request; returns their pids"""
+        if self._executor is None:
+            return []
+        return sorted({future.result() for future in [self.submit(_worker_pid) for _ in range(self.workers)]})
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def configured():
+    """(workers, max_pending, queue_timeout, render_timeout) from the settings"""
+    workers = getattr(settings, 'BONAFIDE_RENDER_WORKERS', DEFAULT_WORKERS)
+    max_pending = getattr(settings, 'BONAFIDE_RENDER_QUEUE', max(workers, 1) * 4)
+    queue_timeout = getattr(settings, 'BONAFIDE_RENDER_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT)
+    render_timeout = getattr(settings, 'BONAFIDE_RENDER_TIMEOUT', DEFAULT_RENDER_TIMEOUT)
+    return workers, max_pending, queue_timeout, render_timeout
+
+
+_service = None
+_service_config = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """The render service of this process, created on first use"""
+    global _service, _service_config
+    config = (os.getpid(), *configured())
+    if _service is None or _service_config != config:
+        with _service_lock:
+            if _service is None or _service_config != config:
+                # A service inherited through fork() belongs to the parent; leave its pool alone
+                if _service is not None and _service_config[0] == config[0]:
+                    _service.shutdown()
+                _service, _service_config = RenderService(*config[1:]), config
+    return _service
+
+
+@atexit.register
+def shutdown_service():
+    global _service, _service_config
+    with _service_lock:
+        if _service is not None and _service_config[0] == os.getpid():
+            _service.shutdown()
+        _service = _service_config = None
+
+
+def render(payload):
+    with instrumentation.timed('pdf'):
+        return get_service().render(payload)
+
+
+def bonafide_pdf(certificates):
+    """Multi-page PDF (bytes) for issued certificates with student and semester loaded"""
+    with instrumentation.timed('pdf'):
+        return get_service().render_document(pdf_generator.bonafide_payloads(certificates))
+
+
+def bonafide_zip(certificates):
+    """Zip archive (BytesIO) of one PDF per certificate, rendered in parallel"""
+    with instrumentation.timed('pdf'):
+        return pdf_generator.generate_bonafide_zip(certificates, render_many=get_service().render_many)
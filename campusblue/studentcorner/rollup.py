@@ -0,0 +1,120 @@
+"""
+Maintenance of the EnrollmentStats rollup
+
+A rollup key is (session_id, semester_id, batch, gender, course_type,
+subject_id). Each active enrollment adds one to its headcount key
+(course_type HEADCOUNT, no subject) and one to the key of every subject slot
+that is filled in, i.e. of each of its StudentSubjectEnrollment rows.
+"""
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from . import caching
+from .models import COURSE_SLOTS, EnrollmentStats, StudentSemester, StudentSubjectEnrollment
+
+HEADCOUNT = ''
+
+KEY_FIELDS = ('session_id', 'semester_id', 'batch', 'gender', 'course_type', 'subject_id')
+
+
+def contributions(record, batch, gender, is_active):
+    """Rollup keys one StudentSemester counts towards, given its student's attributes"""
+    if not (record.is_enrolled and is_active):
+        return Counter()
+
+    base = (record.session_id, record.semester_id, batch, gender)
+    keys = Counter({base + (HEADCOUNT, None): 1})
+    for slot, subject_id in record.slot_ids.items():
+        if subject_id is not None:
+            keys[base + (COURSE_SLOTS[slot], subject_id)] += 1
+    return keys
+
+
+def student_contributions(record, student):
+    return contributions(record, student.batch, student.gender, student.is_active)
+
+
+def apply(deltas):
+    """Add ``deltas`` (rollup key -> change) to the stored counters"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        for key, delta in deltas.items():
+            lookup = dict(zip(KEY_FIELDS, key))
+            counter = EnrollmentStats.objects.filter(**lookup)
+            if counter.update(count=F('count') + delta) or delta < 0:
+                continue
+            # A concurrent first insert of the same key wins the unique
+            # constraint; add to its row instead
+            try:
+                with transaction.atomic():
+                    EnrollmentStats.objects.create(count=delta, **lookup)
+            except IntegrityError:
+                counter.update(count=F('count') + delta)
+    caching.bump(caching.STATISTICS)
+
+
+def compute():
+    """
+    Rollup counters recomputed from the live enrollments: one query for the
+    headcounts and one aggregate over the subject enrollments for every slot
+    """
+    active = dict(is_enrolled=True, student__is_active=True)
+    headcounts = (
+        StudentSemester.objects.filter(**active)
+        .values('session_id', 'semester_id', batch=F('student__batch'), gender=F('student__gender'))
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    subjects = (
+        StudentSubjectEnrollment.objects.filter(**{f'student_semester__{name}': value for name, value in active.items()})
+        .values(
+            'course_type', 'subject_id',
+            session_id=F('student_semester__session_id'), semester_id=F('student_semester__semester_id'),
+            batch=F('student_semester__student__batch'), gender=F('student_semester__student__gender'),
+        )
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+
+    counts = Counter()
+    for row in headcounts:
+        counts[(row['session_id'], row['semester_id'], row['batch'], row['gender'], HEADCOUNT, None)] += row['n']
+    for row in subjects:
+        counts[tuple(row[field] for field in KEY_FIELDS)] += row['n']
+    return counts
+
+
+def stored():
+    counts = Counter()
+    for row in EnrollmentStats.objects.filter(count__gt=0).values(*KEY_FIELDS, 'count'):
+        counts[tuple(row[field] for field in KEY_FIELDS)] += row['count']
+    return counts
+
+
+def differences():
+    """Keys whose stored count disagrees with the live data: key -> (stored, live)"""
+    live, current = compute(), stored()
+    return {
+        key: (current[key], live[key])
+        for key in live.keys() | current.keys()
+        if current[key] != live[key]
+    }
+
+
+def rebuild():
+    """Replace the rollup with counters recomputed from scratch; returns the row count"""
+    counts = compute()
+    with transaction.atomic():
+        EnrollmentStats.objects.all().delete()
+        EnrollmentStats.objects.bulk_create(
+            [EnrollmentStats(count=n, **dict(zip(KEY_FIELDS, key))) for key, n in counts.items()],
+            batch_size=500,
+        )
+    caching.bump(caching.STATISTICS)
+    return len(counts)
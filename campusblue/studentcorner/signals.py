@@ -0,0 +1,120 @@
+"""
+Keep the EnrollmentStats rollup, the StudentLookup and CertificateEligibility
+indexes and the cache versions in step with the models
+"""
+
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import caching, eligibility, lookup, rollup
+from .models import AcademicSession, Certificate, Semester, Student, StudentSemester, Subject
+
+ROLLUP_FIELDS = ('batch', 'gender', 'is_active')
+LOOKUP_FIELDS = lookup.IDENTIFIER_KINDS + ('student_name',)
+
+
+@receiver(pre_save, sender=StudentSemester)
+def remember_enrollment(sender, instance, raw=False, **kwargs):
+    instance._rollup_before = Counter()
+    if raw or instance.pk is None:
+        return
+    previous = StudentSemester.objects.select_related('student').filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._rollup_before = rollup.student_contributions(previous, previous.student)
+
+
+@receiver(post_save, sender=StudentSemester)
+def update_enrollment_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = rollup.student_contributions(instance, instance.student)
+    deltas.subtract(getattr(instance, '_rollup_before', Counter()))
+    rollup.apply(deltas)
+
+
+@receiver(pre_delete, sender=StudentSemester)
+def remember_deleted_subjects(sender, instance, **kwargs):
+    instance.slot_ids  # Read now; the subject enrollments are deleted first
+
+
+@receiver(post_delete, sender=StudentSemester)
+def remove_enrollment_stats(sender, instance, **kwargs):
+    student = Student.objects.filter(pk=instance.student_id).first()
+    if student is None:
+        return
+    deltas = Counter()
+    deltas.subtract(rollup.student_contributions(instance, student))
+    rollup.apply(deltas)
+
+
+@receiver(pre_save, sender=Student)
+def remember_student(sender, instance, raw=False, **kwargs):
+    instance._rollup_before = instance._lookup_before = None
+    if raw or instance.pk is None:
+        return
+    previous = Student.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS, *LOOKUP_FIELDS).first()
+    if previous is not None:
+        instance._rollup_before = {field: previous[field] for field in ROLLUP_FIELDS}
+        instance._lookup_before = {field: previous[field] for field in LOOKUP_FIELDS}
+
+
+@receiver(post_save, sender=Student)
+def update_student_lookup(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    after = {field: getattr(instance, field) for field in LOOKUP_FIELDS}
+    if getattr(instance, '_lookup_before', None) != after:
+        lookup.index_students([instance])
+
+
+@receiver(post_save, sender=Student)
+def update_student_stats(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_rollup_before', None)
+    after = {field: getattr(instance, field) for field in ROLLUP_FIELDS}
+    if before == after:
+        return
+    caching.bump(caching.STATISTICS)  # Batch and gender headcounts changed
+    if created or before is None:
+        return
+
+    deltas = Counter()
+    for record in instance.semester_records.prefetch_related('subject_enrollments'):
+        deltas.update(rollup.contributions(record, **after))
+        deltas.subtract(rollup.contributions(record, **before))
+    rollup.apply(deltas)
+
+
+@receiver(post_delete, sender=Student)
+def forget_student(sender, instance, **kwargs):
+    caching.bump(caching.STATISTICS)
+
+
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=Semester)
+@receiver([post_save, post_delete], sender=AcademicSession)
+def invalidate_lookups(sender, raw=False, **kwargs):
+    caching.bump(caching.LOOKUPS)
+
+
+@receiver(pre_save, sender=Certificate)
+def remember_certificate_student(sender, instance, raw=False, **kwargs):
+    instance._student_before = None
+    if raw or instance.pk is None:
+        return
+    instance._student_before = Certificate.objects.filter(pk=instance.pk).values_list('student_id', flat=True).first()
+
+
+@receiver(post_save, sender=Certificate)
+def update_eligibility(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    eligibility.refresh({instance.student_id, getattr(instance, '_student_before', None)} - {None})
+
+
+@receiver(post_delete, sender=Certificate)
+def remove_eligibility(sender, instance, **kwargs):
+    eligibility.refresh([instance.student_id])
@@ -0,0 +1,171 @@
+"""
+Enrollment statistics for the dashboard
+
+Enrollment numbers are read from the EnrollmentStats rollup, so a page costs
+O(subjects) rows no matter how many students are enrolled. Student headcounts
+come from one GROUP BY over students. Per-slot totals are summed in Python
+from the subject rows instead of being queried again.
+"""
+
+import asyncio
+
+from django.db.models import Count, Q, Sum
+
+from .models import SLOT_BY_COURSE_TYPE, EnrollmentStats, Student
+from .rollup import HEADCOUNT
+
+COURSE_SLOT_NAMES = {
+    'major_course': 'Major Courses',
+    'minor_course': 'Minor Courses',
+    'md1': 'Multidisciplinary 1',
+    'md2': 'Multidisciplinary 2',
+    'skill': 'Skill Enhancement',
+    'vac1': 'Value Added Course 1',
+    'vac2': 'Value Added Course 2',
+    'aec': 'Ability Enhancement Course',
+}
+
+
+def gender_counts(prefix=''):
+    """total/male/female aggregates; ``prefix`` reaches Student through a relation"""
+    return {
+        'total': Count('id'),
+        'male': Count('id', filter=Q(**{f'{prefix}gender': 'M'})),
+        'female': Count('id', filter=Q(**{f'{prefix}gender': 'F'})),
+    }
+
+
+def rollup_queryset(**filters):
+    return (
+        EnrollmentStats.objects.filter(count__gt=0, **filters)
+        .values(
+            'semester__semester_number', 'semester__semester_name', 'course_type',
+            'subject__subject_code', 'subject__subject_name', 'subject__course_type', 'gender',
+        )
+        .annotate(n=Sum('count'))
+        .order_by()
+    )
+
+
+def rollup_rows(**filters):
+    """
+    Enrollment counts from the rollup in a single query.
+
+    Returns ``(semester_rows, subject_rows)``. Semester rows carry
+    semester__semester_number/semester__semester_name and total/male/female;
+    subject rows carry slot, subject_code, subject_name, course_type and
+    total_students/male_students/female_students.
+    """
+    return fold_rollup(rollup_queryset(**filters))
+
+
+def fold_rollup(rows):
+    """``(semester_rows, subject_rows)`` from the rows of rollup_queryset()"""
+    semesters = {}
+    subjects = {}
+    for row in rows:
+        if row['course_type'] == HEADCOUNT:
+            number = row['semester__semester_number']
+            entry = semesters.setdefault(number, {
+                'semester__semester_number': number,
+                'semester__semester_name': row['semester__semester_name'],
+                'total': 0, 'male': 0, 'female': 0,
+            })
+            entry['total'] += row['n']
+            if row['gender'] == 'M':
+                entry['male'] += row['n']
+            elif row['gender'] == 'F':
+                entry['female'] += row['n']
+        else:
+            slot = SLOT_BY_COURSE_TYPE[row['course_type']]
+            entry = subjects.setdefault((slot, row['subject__subject_code']), {
+                'slot': slot,
+                'subject_code': row['subject__subject_code'],
+                'subject_name': row['subject__subject_name'],
+                'course_type': row['subject__course_type'],
+                'total_students': 0, 'male_students': 0, 'female_students': 0,
+            })
+            entry['total_students'] += row['n']
+            if row['gender'] == 'M':
+                entry['male_students'] += row['n']
+            elif row['gender'] == 'F':
+                entry['female_students'] += row['n']
+
+    semester_rows = [semesters[number] for number in sorted(semesters)]
+    return semester_rows, list(subjects.values())
+
+
+def course_slot_breakdown(rows):
+    """Group subject rows by slot; returns (course_type_details, course_type_summary)"""
+    details = {
+        slot: {'display_name': name, 'subjects': [], 'total_enrollments': 0}
+        for slot, name in COURSE_SLOT_NAMES.items()
+    }
+    summary = {
+        slot: {'type': slot, 'name': name, 'total': 0, 'male': 0, 'female': 0}
+        for slot, name in COURSE_SLOT_NAMES.items()
+    }
+
+    for row in sorted(rows, key=lambda row: row['subject_name']):
+        slot = row['slot']
+        details[slot]['subjects'].append(row)
+        details[slot]['total_enrollments'] += row['total_students']
+        summary[slot]['total'] += row['total_students']
+        summary[slot]['male'] += row['male_students']
+        summary[slot]['female'] += row['female_students']
+
+    return details, list(summary.values())
+
+
+def semester_detail(semester, session_code=None, batch=None, gender=None):
+    """
+    Drill-down of one semester across all course slots, narrowed to a
+    session, batch and/or gender, from one rollup query
+    """
+    filters = {'semester': semester}
+    if session_code:
+        filters['session__session_code'] = session_code
+    if batch:
+        filters['batch'] = batch
+    if gender:
+        filters['gender'] = gender
+    semester_rows, subjects = rollup_rows(**filters)
+    course_type_details, course_type_summary = course_slot_breakdown(subjects)
+    return {
+        'overall_stats': semester_rows[0] if semester_rows else {'total': 0, 'male': 0, 'female': 0},
+        'course_type_details': course_type_details,
+        'course_type_summary': course_type_summary,
+    }
+
+
+def batch_queryset():
+    return Student.objects.filter(is_active=True).values('batch').annotate(**gender_counts()).order_by('batch')
+
+
+def dashboard_statistics():
+    """Template context for the statistics dashboard"""
+    return dashboard_context(list(batch_queryset()), list(rollup_queryset()))
+
+
+async def adashboard_statistics():
+    """dashboard_statistics() with both queries issued concurrently"""
+    async def fetch(queryset):
+        return [row async for row in queryset]
+
+    batch_stats, rollup = await asyncio.gather(fetch(batch_queryset()), fetch(rollup_queryset()))
+    return dashboard_context(batch_stats, rollup)
+
+
+def dashboard_context(batch_stats, rollup):
+    semester_enrollment, subjects = fold_rollup(rollup)
+    course_type_details, course_type_summary = course_slot_breakdown(subjects)
+
+    return {
+        'total_students': sum(row['total'] for row in batch_stats),
+        'male_students': sum(row['male'] for row in batch_stats),
+        'female_students': sum(row['female'] for row in batch_stats),
+        'batch_stats': batch_stats,
+        'semester_enrollment': semester_enrollment,
+        'course_type_details': course_type_details,
+        'course_type_summary': course_type_summary,
+    }
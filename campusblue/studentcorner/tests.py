@@ -1,3 +1,1517 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+import pandas as pd
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import caching, database, eligibility, exports, importer, issuance, instrumentation, jobs, lookup, numbering, pdf_cache, pdf_generator, promotion, render_service, rollup, stats
+from .benchmarks import data, runner, scenarios
+from .forms import StudentSemesterForm
+from .models import COURSE_SLOTS, AcademicSession, Certificate, CertificateCounter, EnrollmentStats, RenderJob, Semester, Student, StudentSemester, StudentSubjectEnrollment, Subject, SubjectProgression
+
+
+def setUpModule():
+    # The file cache is shared with the development server; give the run its own
+    cache_root = tempfile.mkdtemp()
+    settings_override = override_settings(CACHES={'default': dict(settings.CACHES['default'], LOCATION=cache_root)})
+    settings_override.enable()
+    unittest.addModuleCleanup(shutil.rmtree, cache_root, ignore_errors=True)
+    unittest.addModuleCleanup(settings_override.disable)
+
+
+def make_unsaved_certificate():
+    student = Student(
+        student_name='Test Student', parent_name='Test Parent', gender='M',
+        batch='2024', class_roll_no='24001', u_registration_no='201-ZP-2024',
+        course_name='Bachelor of Arts',
+    )
+    semester = StudentSemester(semester=Semester(semester_number=1, semester_name='1st'))
+    certificate = Certificate(id=1, certificate_type='bonafide', issue_date=date(2025, 1, 15))
+    return student, certificate, semester
+
+
+def make_student(roll, batch='2024', gender='M', **kwargs):
+    fields = dict(
+        reg_form_no=f'RF-{roll}', u_registration_no=f'{roll}-ZP-{batch}', class_roll_no=roll,
+        course_name='Bachelor of Arts', batch=batch, student_name=f'Student {roll}',
+        parent_name=f'Parent {roll}', mother_name=f'Mother {roll}', gender=gender,
+        state='J&K', district='Shopian', address='Zainapora', community='General', mobile='9000000000',
+    )
+    fields.update(kwargs)
+    return Student.objects.create(**fields)
+
+
+def use_temp_pdf_cache(test):
+    cache_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, cache_root, ignore_errors=True)
+    settings_override = override_settings(BONAFIDE_PDF_CACHE_DIR=cache_root)
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+
+
+class StaticLayerCacheTests(TestCase):
+    def setUp(self):
+        pdf_generator.clear_static_layer()
+        self.addCleanup(pdf_generator.clear_static_layer)
+
+    def test_renders_pdf(self):
+        pdf = pdf_generator.generate_bonafide_certificate(*make_unsaved_certificate()).getvalue()
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertIn(pdf_generator.LETTERHEAD_FORM.encode(), pdf)
+
+    def test_logos_decoded_once_across_certificates(self):
+        args = make_unsaved_certificate()
+        pdf_generator.generate_bonafide_certificate(*args)
+        with mock.patch.object(pdf_generator.Image, 'open') as image_open:
+            pdf = pdf_generator.generate_bonafide_certificate(*args).getvalue()
+        image_open.assert_not_called()
+        self.assertIn(b'/Subtype /Image', pdf)
+
+    def test_layer_rebuilt_when_logo_changes(self):
+        layer = pdf_generator.get_static_layer()
+        self.assertIs(pdf_generator.get_static_layer(), layer)
+        stat = os.stat(layer.left_logo_path)
+        os.utime(layer.left_logo_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.addCleanup(os.utime, layer.left_logo_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNot(pdf_generator.get_static_layer(), layer)
+
+
+class BulkBonafideTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.session = AcademicSession.objects.create(
+            session_code='2024-25', start_date=date(2024, 8, 1), end_date=date(2025, 7, 31), is_current=True)
+        cls.semester = Semester.objects.create(semester_number=1, semester_name='1st')
+        cls.students = [make_student(f'2400{i}') for i in range(1, 6)]
+        for student in cls.students:
+            StudentSemester.objects.create(student=student, session=cls.session, semester=cls.semester)
+        make_student('23001', batch='2023')
+        Certificate.objects.create(
+            student=cls.students[0], certificate_type='bonafide',
+            issue_date=timezone.now().date() - timedelta(days=30))
+        cls.staff = User.objects.create_user('staff', password='secret', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_staff_only(self):
+        self.client.logout()
+        response = self.client.post(reverse('bulk_bonafide_certificate'), {'batch': '2024', 'output': 'pdf'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response['Location'])
+        self.assertEqual(Certificate.objects.count(), 1)
+        self.assertNotContains(self.client.get(reverse('bonafide_certificate')),
+                               reverse('bulk_bonafide_certificate'))
+
+    def test_batch_issue_returns_merged_pdf_and_skips_recent(self):
+        # The session and user lookups; numbering the batch takes the
+        # counter's UPDATE and, being the first bonafide of the year, its
+        # INSERT (in a savepoint); refreshing the eligibility index one query
+        # for the histories and one upsert
+        with self.assertNumQueries(14):
+            response = self.client.post(reverse('bulk_bonafide_certificate'), {'batch': '2024', 'output': 'pdf'})
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['X-Certificates-Issued'], '4')
+        self.assertEqual(response['X-Certificates-Skipped'], '1')
+        pdf = b''.join(response.streaming_content)
+        self.assertEqual(pdf.count(b'/Type /Page\n'), 4)
+        self.assertEqual(Certificate.objects.filter(certificate_type='bonafide').count(), 5)
+        self.assertFalse(Certificate.objects.filter(student__batch='2023').exists())
+
+    def test_semester_issue_as_zip(self):
+        response = self.client.post(reverse('bulk_bonafide_certificate'), {
+            'semester': self.semester.id, 'session': self.session.id, 'output': 'zip'})
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 4)
+
+    def test_roll_numbers_all_ineligible(self):
+        response = self.client.post(reverse('bulk_bonafide_certificate'), {
+            'roll_numbers': '24001', 'output': 'pdf'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'No certificates issued')
+
+    def test_requires_a_selector(self):
+        response = self.client.post(reverse('bulk_bonafide_certificate'), {'output': 'pdf'})
+        self.assertContains(response, 'Select a batch')
+
+
+class BonafidePdfCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_student('24001')
+        cls.certificate = Certificate.objects.create(
+            student=cls.student, certificate_type='bonafide', issue_date=date(2025, 1, 15))
+
+    def setUp(self):
+        use_temp_pdf_cache(self)
+        self.url = reverse('download_bonafide_pdf', args=[self.certificate.id])
+
+    def download(self, **headers):
+        # FileResponse holds the PDF open until the response is closed
+        response = self.client.get(self.url, **headers)
+        self.addCleanup(response.close)
+        return response
+
+    def test_render_is_deterministic(self):
+        first = pdf_generator.generate_bonafide_certificate(self.student, self.certificate).getvalue()
+        second = pdf_generator.generate_bonafide_certificate(self.student, self.certificate).getvalue()
+        self.assertEqual(first, second)
+
+    def test_repeat_download_served_from_disk(self):
+        first = self.download()
+        body = first.getvalue()
+        with mock.patch.object(render_service, 'render') as render:
+            second = self.download()
+            self.assertEqual(second.getvalue(), body)
+        render.assert_not_called()
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('Last-Modified', second)
+
+    async def test_streamed_asynchronously_under_asgi(self):
+        response = await self.async_client.get(self.url)
+        self.assertTrue(response.is_async)
+        with warnings.catch_warnings():
+            # Django warns when it has to buffer a synchronous iterator
+            warnings.simplefilter('error')
+            body = b''.join([chunk async for chunk in response])
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(body))
+
+    def test_conditional_request_returns_304(self):
+        etag = self.download()['ETag']
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_student_change_replaces_cached_render(self):
+        etag = self.download()['ETag']
+        Student.objects.filter(id=self.student.id).update(student_name='Renamed Student')
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(pdf_cache.stats()['files'], 1)
+
+    def test_eviction_respects_size_cap(self):
+        for certificate_id in range(1, 4):
+            pdf_cache.store(certificate_id, f'{certificate_id:064x}', b'x' * 100)
+        self.assertEqual(pdf_cache.evict(limit=150), 2)
+        self.assertEqual(pdf_cache.stats()['files'], 1)
+
+    @override_settings(BONAFIDE_PDF_CACHE_MAX_BYTES=2000)
+    def test_store_scans_for_eviction_only_after_a_share_of_the_cap(self):
+        with mock.patch.object(pdf_cache, '_written', 0), mock.patch.object(pdf_cache, 'evict') as evict:
+            for certificate_id in range(1, 4):
+                pdf_cache.store(certificate_id, f'{certificate_id:064x}', b'x' * 40)
+            evict.assert_called_once()
+            pdf_cache.store(4, f'{4:064x}', b'x' * 40)
+            evict.assert_called_once()
+
+    def test_warm_and_purge_command(self):
+        call_command('bonafide_pdf_cache', 'warm', stdout=io.StringIO())
+        self.assertEqual(pdf_cache.stats()['files'], 1)
+        call_command('bonafide_pdf_cache', 'purge', stdout=io.StringIO())
+        self.assertEqual(pdf_cache.stats()['files'], 0)
+
+
+class BonafidePreviewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_student('24001')
+
+    def setUp(self):
+        use_temp_pdf_cache(self)
+
+    def issue(self):
+        return self.client.post(reverse('bonafide_certificate'), {
+            'issue_certificate': '', 'student_id': self.student.id})
+
+    def test_issue_links_preview_instead_of_embedding_pdf(self):
+        response = self.issue()
+        self.assertNotContains(response, 'base64')
+        preview_url = response.context['preview_pdf_url']
+        self.assertContains(response, f'data-src="{preview_url}"', count=1)
+
+        preview = self.client.get(preview_url)
+        self.addCleanup(preview.close)
+        self.assertEqual(preview['Content-Type'], 'application/pdf')
+        self.assertIn('max-age=600', preview['Cache-Control'])
+        self.assertTrue(preview.getvalue().startswith(b'%PDF'))
+
+    def test_tampered_token_rejected(self):
+        preview_url = self.issue().context['preview_pdf_url']
+        self.assertEqual(self.client.get(preview_url.replace(':', 'x:', 1)).status_code, 404)
+
+    @override_settings(BONAFIDE_PREVIEW_MAX_AGE=-1)
+    def test_expired_token_rejected(self):
+        preview_url = self.issue().context['preview_pdf_url']
+        self.assertEqual(self.client.get(preview_url).status_code, 404)
+
+
+class EnrollmentDataMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.session = session = AcademicSession.objects.create(
+            session_code='2024-25', start_date=date(2024, 8, 1), end_date=date(2025, 7, 31))
+        cls.sem1 = sem1 = Semester.objects.create(semester_number=1, semester_name='1st')
+        cls.sem3 = sem3 = Semester.objects.create(semester_number=3, semester_name='3rd')
+        cls.physics = physics = Subject.objects.create(subject_code='PHY', subject_name='Physics', course_type='MAJOR')
+        cls.chemistry = chemistry = Subject.objects.create(subject_code='CHE', subject_name='Chemistry', course_type='MAJOR')
+        cls.maths = maths = Subject.objects.create(subject_code='MAT', subject_name='Maths', course_type='MINOR')
+        english = Subject.objects.create(subject_code='ENG', subject_name='English', course_type='AEC')
+
+        rows = [
+            ('24001', '2024', 'M', sem1, physics, maths),
+            ('24002', '2024', 'F', sem1, physics, None),
+            ('24003', '2024', 'F', sem1, chemistry, maths),
+            ('23001', '2023', 'M', sem3, chemistry, maths),
+        ]
+        for roll, batch, gender, semester, major, minor in rows:
+            student = make_student(roll, batch=batch, gender=gender)
+            StudentSemester.objects.create(
+                student=student, session=session, semester=semester,
+                major_course=major, minor_course=minor, aec=english)
+        inactive = make_student('22001', batch='2022', gender='M', is_active=False)
+        StudentSemester.objects.create(student=inactive, session=session, semester=sem3, major_course=physics)
+
+    def setUp(self):
+        cache.clear()
+
+
+class RenderJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_student('24001')
+
+    def setUp(self):
+        use_temp_pdf_cache(self)
+
+    def test_issue_enqueues_render_and_page_polls_job(self):
+        response = self.client.post(reverse('bonafide_certificate'), {
+            'issue_certificate': '', 'student_id': self.student.id})
+        status_url = response.context['render_job_url']
+        self.assertContains(response, status_url)
+        # The preview is loaded only once the job has finished
+        self.assertContains(response, f'data-src="{response.context["preview_pdf_url"]}"')
+        self.assertNotContains(response, f' src="{response.context["preview_pdf_url"]}"')
+        self.assertEqual(self.client.get(status_url).json()['status'], 'queued')
+        self.assertEqual(pdf_cache.stats()['files'], 0)
+
+        self.assertEqual(jobs.work(drain=True), 1)
+        self.assertEqual(self.client.get(status_url, {'wait': 5}).json(), {
+            'id': RenderJob.objects.get().id, 'status': 'done', 'attempts': 1})
+        self.assertEqual(pdf_cache.stats()['files'], 1)
+        self.assertEqual(jobs.metrics()['depth']['done'], 1)
+
+    def test_failures_are_retried_with_backoff_then_marked_failed(self):
+        certificate = Certificate.objects.create(student=self.student, certificate_type='bonafide')
+        job = jobs.enqueue_bonafide_pdf(certificate)
+        self.assertEqual(jobs.enqueue_bonafide_pdf(certificate), job)
+
+        with mock.patch.dict(jobs.HANDLERS, bonafide_pdf=mock.Mock(side_effect=OSError('disk full'))):
+            self.assertEqual(jobs.work(drain=True), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+            self.assertIn('disk full', job.error)
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertIsNone(jobs.claim('test'))
+
+            for _ in range(2):
+                RenderJob.objects.filter(id=job.id).update(run_after=timezone.now())
+                jobs.work(drain=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('failed', 3))
+
+        out = io.StringIO()
+        call_command('render_jobs', 'retry', stdout=out)
+        self.assertIn('Queued 1 failed jobs again', out.getvalue())
+        self.assertEqual(jobs.work(drain=True), 1)
+        self.assertEqual(RenderJob.objects.get().status, 'done')
+
+    def test_jobs_of_dead_workers_are_requeued(self):
+        certificate = Certificate.objects.create(student=self.student, certificate_type='bonafide')
+        job = jobs.enqueue_bonafide_pdf(certificate)
+        self.assertEqual(jobs.claim('gone').id, job.id)
+        self.assertIsNone(jobs.claim('other'))
+        self.assertEqual(jobs.requeue_expired(timezone.now() + timedelta(hours=1)), 1)
+        self.assertEqual(jobs.claim('other').id, job.id)
+
+
+class RenderServiceTests(TestCase):
+    def payloads(self):
+        student, certificate, semester = make_unsaved_certificate()
+        certificate.created_at = timezone.now()
+        payloads = []
+        for certificate_id in range(1, 4):
+            certificate.id = certificate_id
+            payloads.append(pdf_generator.bonafide_render_inputs(student, certificate, semester))
+        return payloads
+
+    def test_worker_pool_matches_inline_rendering(self):
+        service = render_service.RenderService(workers=2, max_pending=2)
+        self.addCleanup(service.shutdown)
+        pids = service.warm()
+        self.assertTrue(pids)
+        self.assertNotIn(os.getpid(), pids)
+
+        payloads = self.payloads()
+        expected = [pdf_generator.render_bonafide_payload(payload) for payload in payloads]
+        self.assertEqual(service.render_many(payloads), expected)
+        self.assertEqual(service.render_document(payloads).count(b'/Type /Page\n'), 3)
+
+    def test_full_queue_raises(self):
+        service = render_service.RenderService(workers=0, max_pending=1, queue_timeout=0)
+        payload = self.payloads()[0]
+        self.assertTrue(service.render(payload).startswith(b'%PDF'))
+        self.assertTrue(service._slots.acquire(timeout=0))
+        with self.assertRaises(render_service.RenderQueueFull):
+            service.render(payload)
+
+    def test_stuck_or_dead_worker_falls_back_to_inline(self):
+        service = render_service.RenderService(workers=0, max_pending=2, render_timeout=0)
+        payload = self.payloads()[0]
+        expected = pdf_generator.render_bonafide_payload(payload)
+        stuck = Future()
+        dead = Future()
+        dead.set_exception(BrokenProcessPool())
+        for future in (stuck, dead):
+            with mock.patch.object(service, 'submit', return_value=future):
+                self.assertEqual(service.render(payload), expected)
+        self.assertTrue(stuck.cancelled())
+
+    @override_settings(BONAFIDE_RENDER_WORKERS=1)
+    def test_pool_is_created_on_first_use_in_each_process(self):
+        self.addCleanup(render_service.shutdown_service)
+        with mock.patch.object(render_service.RenderService, 'warm') as warm:
+            service = render_service.get_service()
+        warm.assert_not_called()
+        self.assertIs(render_service.get_service(), service)
+        # In a forked child the service was created by the parent: the child
+        # gets its own and leaves the parent's pool running
+        parent_pid, *config = render_service._service_config
+        render_service._service_config = (parent_pid + 1, *config)
+        with mock.patch.object(service, 'shutdown') as shutdown:
+            self.assertIsNot(render_service.get_service(), service)
+        shutdown.assert_not_called()
+        service.shutdown()
+
+    @override_settings(BONAFIDE_RENDER_WORKERS=0, BONAFIDE_RENDER_QUEUE=1, BONAFIDE_RENDER_QUEUE_TIMEOUT=0)
+    def test_busy_renderer_answers_503(self):
+        use_temp_pdf_cache(self)
+        certificate = Certificate.objects.create(student=make_student('24001'), certificate_type='bonafide')
+        slots = render_service.get_service()._slots
+        slots.acquire()
+        self.addCleanup(slots.release)
+        response = self.client.get(reverse('download_bonafide_pdf', args=[certificate.id]))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '10')
+
+
+class StudentStatisticsTests(EnrollmentDataMixin, TestCase):
+    def test_page_query_budget(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('student_statistics'))
+        self.assertContains(response, '<td class="fw-bold">PHY</td>', html=False)
+
+    def test_counts(self):
+        context = self.client.get(reverse('student_statistics')).context
+        self.assertEqual((context['total_students'], context['male_students'], context['female_students']), (4, 2, 2))
+        self.assertEqual(
+            [(row['semester__semester_number'], row['total']) for row in context['semester_enrollment']],
+            [(1, 3), (3, 1)])
+
+        majors = context['course_type_details']['major_course']
+        self.assertEqual(
+            [(row['subject_code'], row['total_students'], row['male_students'], row['female_students'])
+             for row in majors['subjects']],
+            [('CHE', 2, 1, 1), ('PHY', 2, 1, 1)])
+        self.assertEqual(majors['total_enrollments'], 4)
+
+        summary = {row['type']: (row['total'], row['male'], row['female']) for row in context['course_type_summary']}
+        self.assertEqual(summary['minor_course'], (3, 2, 1))
+        self.assertEqual(summary['aec'], (4, 2, 2))
+        self.assertEqual(summary['md1'], (0, 0, 0))
+
+    def test_legacy_gender_values_count_towards_neither(self):
+        legacy = make_student('24009', batch='2024', gender='Male')
+        StudentSemester.objects.create(student=legacy, session=self.session, semester=self.sem1, major_course=self.physics)
+        context = self.client.get(reverse('student_statistics')).context
+        sem1 = context['semester_enrollment'][0]
+        self.assertEqual((sem1['total'], sem1['male'], sem1['female']), (4, 1, 2))
+        physics = next(row for row in context['course_type_details']['major_course']['subjects']
+                       if row['subject_code'] == 'PHY')
+        self.assertEqual((physics['total_students'], physics['male_students'], physics['female_students']), (3, 1, 1))
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class InstrumentationTests(EnrollmentDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        instrumentation.reset()
+        self.addCleanup(instrumentation.reset)
+        metrics_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_root, ignore_errors=True)
+        settings_override = override_settings(PERF_METRICS_DIR=metrics_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_server_timing_and_ring_buffer(self):
+        response = self.client.get(reverse('student_statistics'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 queries, 0 duplicate"', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+        self.client.get(reverse('student_statistics'))
+        [row] = [row for row in instrumentation.summary() if row['view'] == 'student_statistics']
+        self.assertEqual((row['requests'], row['queries_max'], row['errors']), (2, 2, 0))
+        self.assertLessEqual(row['wall_p50'], row['wall_p95'])
+
+    async def test_async_handler(self):
+        response = await self.async_client.get(reverse('student_statistics'))
+        self.assertIn('2 queries', response['Server-Timing'])
+
+    def test_duplicate_queries_counted(self):
+        metrics = instrumentation.RequestMetrics()
+        with connection.execute_wrapper(metrics.execute):
+            Student.objects.filter(class_roll_no='24001').first()
+            Student.objects.filter(class_roll_no='24001').first()
+            Student.objects.filter(class_roll_no='24002').first()
+        self.assertEqual((metrics.queries, metrics.duplicates), (3, 1))
+
+    @override_settings(BONAFIDE_RENDER_WORKERS=0)
+    def test_pdf_render_time(self):
+        use_temp_pdf_cache(self)
+        certificate = Certificate.objects.create(student=Student.objects.first(), certificate_type='bonafide')
+        response = self.client.get(reverse('download_bonafide_pdf', args=[certificate.id]))
+        self.assertIn('pdf;dur=', response['Server-Timing'])
+        [row] = [row for row in instrumentation.summary() if row['view'] == 'download_bonafide_pdf']
+        self.assertGreater(row['pdf_p95'], 0)
+
+    def test_persisted_buffers_are_combined(self):
+        instrumentation.record('student_statistics', instrumentation.RequestMetrics().sample(0.01, 200))
+        other = instrumentation.metrics_dir() / 'otherhost-1.json'
+        other.write_text(json.dumps({'saved_at': time.time(), 'views': {
+            'student_statistics': [instrumentation.RequestMetrics().sample(0.03, 500)]}}))
+        instrumentation.persist()
+
+        [row] = instrumentation.summary()
+        self.assertEqual((row['requests'], row['errors'], row['wall_p95']), (2, 1, 30.0))
+        self.assertEqual(len(list(instrumentation.metrics_dir().glob('*.json'))), 2)
+
+    def test_buffers_are_saved_off_the_request_path(self):
+        instrumentation.start_flusher()
+        with mock.patch.object(instrumentation, 'persist') as persist:
+            self.client.get(reverse('student_statistics'))
+        persist.assert_not_called()
+
+        class Stop(Exception):
+            pass
+
+        with mock.patch.object(instrumentation, 'persist', side_effect=[OSError, None]) as persist, \
+                mock.patch.object(instrumentation.time, 'sleep', side_effect=[None, None, Stop]):
+            with self.assertRaises(Stop):
+                instrumentation._flush_periodically()
+        self.assertEqual(persist.call_count, 2)
+
+    def test_profile_requires_staff(self):
+        url = reverse('student_statistics') + '?profile=1'
+        self.assertTemplateUsed(self.client.get(url), 'studentcorner/statistics.html')
+
+        staff = User.objects.create_user('staff', password='secret', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertTrue(response.content.startswith(b'GET /statistics/?profile=1 -> 200'))
+        self.assertIn('Server-Timing', response)
+
+    def test_sampler_call_tree(self):
+        sampler = instrumentation.StackSampler().start()
+        spin(0.1)
+        sampler.stop()
+        self.assertIn('spin  studentcorner/tests.py', sampler.format())
+
+    def test_dashboard(self):
+        self.client.get(reverse('student_statistics'))
+        self.assertEqual(self.client.get(reverse('performance_dashboard')).status_code, 302)
+        self.client.force_login(User.objects.create_user('staff', password='secret', is_staff=True))
+        response = self.client.get(reverse('performance_dashboard'))
+        self.assertContains(response, '<code>student_statistics</code>', html=False)
+        data = self.client.get(reverse('performance_dashboard') + '?format=json').json()
+        self.assertIn('student_statistics', [row['view'] for row in data['views']])
+
+
+class EnrollmentStatsRollupTests(EnrollmentDataMixin, TestCase):
+    def assertRollupMatchesLiveData(self):
+        self.assertEqual(rollup.differences(), {})
+
+    def major_count(self, subject):
+        return sum(row['total_students'] for row in stats.rollup_rows()[1]
+                   if row['slot'] == 'major_course' and row['subject_code'] == subject.subject_code)
+
+    def test_signals_track_creation(self):
+        self.assertRollupMatchesLiveData()
+        self.assertEqual(self.major_count(self.physics), 2)
+
+    def test_gender_change_and_active_flip(self):
+        student = Student.objects.get(class_roll_no='24001')
+        student.gender = 'F'
+        student.save()
+        self.assertRollupMatchesLiveData()
+
+        inactive = Student.objects.get(class_roll_no='22001')
+        inactive.is_active = True
+        inactive.save()
+        self.assertRollupMatchesLiveData()
+        self.assertEqual(self.major_count(self.physics), 3)
+
+    def test_slot_reassignment_and_unenrollment(self):
+        record = StudentSemester.objects.get(student__class_roll_no='24002')
+        record.major_course = self.chemistry
+        record.minor_course = self.maths
+        record.save()
+        self.assertRollupMatchesLiveData()
+        self.assertEqual(self.major_count(self.chemistry), 3)
+
+        record.is_enrolled = False
+        record.save()
+        self.assertRollupMatchesLiveData()
+
+    def test_deletes(self):
+        StudentSemester.objects.filter(student__class_roll_no='24003').delete()
+        self.assertRollupMatchesLiveData()
+        Student.objects.get(class_roll_no='24001').delete()
+        self.assertRollupMatchesLiveData()
+
+    def test_rebuild_command_repairs_drift(self):
+        StudentSubjectEnrollment.objects.filter(course_type='MINOR').delete()  # bypasses signals
+        with self.assertRaises(CommandError):
+            call_command('rebuild_stats', '--check', stdout=io.StringIO())
+        call_command('rebuild_stats', stdout=io.StringIO())
+        self.assertRollupMatchesLiveData()
+
+    def test_concurrent_first_insert_of_a_headcount_adds_to_its_row(self):
+        key = (self.session.id, self.sem1.id, '2030', 'M', rollup.HEADCOUNT, None)
+        lookup = dict(zip(rollup.KEY_FIELDS, key))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            EnrollmentStats.objects.bulk_create([EnrollmentStats(count=1, **lookup)] * 2)
+
+        # Another process inserts the key between our UPDATE and INSERT
+        update = QuerySet.update
+        def racing_update(queryset, **kwargs):
+            if not EnrollmentStats.objects.filter(**lookup).exists():
+                EnrollmentStats.objects.create(count=1, **lookup)
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            rollup.apply({key: 1})
+        self.assertEqual(list(EnrollmentStats.objects.filter(**lookup).values_list('count', flat=True)), [2])
+
+
+class SubjectEnrollmentTests(EnrollmentDataMixin, TestCase):
+    def slots(self, roll):
+        return dict(StudentSubjectEnrollment.objects.filter(
+            student_semester__student__class_roll_no=roll).values_list('course_type', 'subject__subject_code'))
+
+    def test_slots_are_stored_as_enrollment_rows(self):
+        self.assertEqual(self.slots('24001'), {'MAJOR': 'PHY', 'MINOR': 'MAT', 'AEC': 'ENG'})
+        self.assertEqual(self.slots('24002'), {'MAJOR': 'PHY', 'AEC': 'ENG'})
+
+        record = StudentSemester.objects.get(student__class_roll_no='24001')
+        self.assertEqual((record.major_course, record.minor_course_id, record.md1), (self.physics, self.maths.id, None))
+        record.major_course = self.chemistry
+        record.minor_course = None
+        record.save()
+        self.assertEqual(self.slots('24001'), {'MAJOR': 'CHE', 'AEC': 'ENG'})
+        record.refresh_from_db()
+        self.assertEqual(record.major_course, self.chemistry)
+
+    def test_failed_slot_write_rolls_back_the_record(self):
+        record = StudentSemester.objects.get(student__class_roll_no='24001')
+        record.is_enrolled = False
+        record.major_course = self.chemistry
+        manager = type(StudentSubjectEnrollment.objects)
+        with mock.patch.object(manager, 'assign', side_effect=IntegrityError), self.assertRaises(IntegrityError):
+            record.save()
+        self.assertTrue(StudentSemester.objects.get(pk=record.pk).is_enrolled)
+        self.assertEqual(self.slots('24001'), {'MAJOR': 'PHY', 'MINOR': 'MAT', 'AEC': 'ENG'})
+
+    def test_prefetched_slots_need_no_queries(self):
+        records = list(StudentSemester.objects.prefetch_related('subject_enrollments__subject'))
+        with self.assertNumQueries(0):
+            majors = sorted(record.major_course.subject_code for record in records)
+        self.assertEqual(majors, ['CHE', 'CHE', 'PHY', 'PHY', 'PHY'])
+
+    def test_unprefetched_slots_load_with_their_subjects(self):
+        record = StudentSemester.objects.get(student__class_roll_no='24001')
+        with self.assertNumQueries(1):
+            self.assertEqual((record.major_course, record.minor_course, record.aec.subject_code),
+                             (self.physics, self.maths, 'ENG'))
+
+        record = StudentSemester.objects.prefetch_related('subject_enrollments').get(student__class_roll_no='24001')
+        with self.assertNumQueries(1):
+            self.assertEqual((record.major_course, record.minor_course), (self.physics, self.maths))
+
+    def test_per_subject_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = dict(Subject.objects.annotate(n=Count('enrollments')).values_list('subject_code', 'n'))
+        self.assertEqual(counts, {'PHY': 3, 'CHE': 2, 'MAT': 3, 'ENG': 4})
+        with self.assertNumQueries(2):
+            rollup.compute()
+
+    def test_one_subject_per_slot(self):
+        record = StudentSemester.objects.get(student__class_roll_no='24002')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StudentSubjectEnrollment.objects.create(student_semester=record, subject=self.chemistry, course_type='MAJOR')
+
+    def test_admin_form_assigns_slots(self):
+        record = StudentSemester.objects.get(student__class_roll_no='24002')
+        form = StudentSemesterForm(instance=record)
+        self.assertEqual(form.initial['major_course'], self.physics.id)
+        self.assertEqual(list(form.fields['minor_course'].queryset), [self.maths])
+
+        form = StudentSemesterForm({
+            'student': record.student_id, 'session': record.session_id, 'semester': record.semester_id,
+            'is_enrolled': 'on', 'enrollment_date': '2024-08-01',
+            'major_course': self.chemistry.id, 'minor_course': self.maths.id,
+        }, instance=record)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertEqual(self.slots('24002'), {'MAJOR': 'CHE', 'MINOR': 'MAT'})
+        self.assertEqual(rollup.differences(), {})
+
+
+class PromotionTests(EnrollmentDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.next_session = AcademicSession.objects.create(
+            session_code='2025-26', start_date=date(2025, 8, 1), end_date=date(2026, 7, 31))
+        cls.sem2 = Semester.objects.create(semester_number=2, semester_name='2nd')
+        cls.physics2 = Subject.objects.create(subject_code='PHY2', subject_name='Physics II', course_type='MAJOR')
+        SubjectProgression.objects.create(semester=cls.sem2, from_subject=cls.physics, to_subject=cls.physics2)
+        SubjectProgression.objects.create(semester=cls.sem2, from_subject=cls.maths, to_subject=None)
+
+    def promote(self, **kwargs):
+        return promotion.promote(self.session, self.sem1, self.next_session, self.sem2, **kwargs)
+
+    def test_promotes_remaps_and_skips_existing(self):
+        StudentSemester.objects.create(
+            student=Student.objects.get(class_roll_no='24003'), session=self.next_session, semester=self.sem2)
+        with self.assertNumQueries(3):
+            planned = promotion.plan(self.session, self.sem1, self.next_session, self.sem2)
+        self.assertEqual((len(planned.records), planned.skipped, planned.remapped), (2, 1, 3))
+
+        result = self.promote()
+        self.assertEqual((result.created, result.skipped), (2, 1))
+        self.assertEqual(set(result.timings), {'plan', 'insert', 'subjects', 'rollup'})
+        record = StudentSemester.objects.get(student__class_roll_no='24001', semester=self.sem2)
+        self.assertEqual((record.major_course, record.minor_course, record.aec_id),
+                         (self.physics2, None, Subject.objects.get(subject_code='ENG').id))
+        self.assertEqual(rollup.differences(), {})
+        self.assertEqual(self.promote().created, 0)
+
+    def test_query_count_does_not_grow_with_students(self):
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(len(self.promote(dry_run=True).records), 3)
+        for roll in range(24010, 24030):
+            student = make_student(str(roll))
+            StudentSemester.objects.create(student=student, session=self.session, semester=self.sem1,
+                                           major_course=self.chemistry)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(len(self.promote(dry_run=True).records), 23)
+        self.assertEqual(len(few), len(many))
+
+    def test_dry_run_command_lists_diff(self):
+        out = io.StringIO()
+        call_command('promote_students', '2024-25', '1', '2025-26', '2', '--dry-run', stdout=out)
+        self.assertIn('+ 24001 Student 24001: major_course PHY -> PHY2, minor_course MAT -> (none), aec ENG',
+                      out.getvalue())
+        self.assertIn('Would create 3 records (4 subjects remapped)', out.getvalue())
+        self.assertFalse(StudentSemester.objects.filter(semester=self.sem2).exists())
+
+        with self.assertRaises(CommandError):
+            call_command('promote_students', '2024-25', '1', '2024-25', '1', stdout=io.StringIO())
+
+
+class CachingTests(EnrollmentDataMixin, TestCase):
+    def test_statistics_cached_until_enrollment_changes(self):
+        url = reverse('student_statistics')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.assertEqual(caching.hit_miss_counts('student_statistics'),
+                         {'student_statistics': {'hits': 1, 'misses': 1}})
+
+        record = StudentSemester.objects.get(student__class_roll_no='24002')
+        record.major_course = self.chemistry
+        record.save()
+        majors = self.client.get(url).context['course_type_details']['major_course']['subjects']
+        self.assertEqual([(row['subject_code'], row['total_students']) for row in majors], [('CHE', 3), ('PHY', 1)])
+
+    def test_subject_rename_invalidates_lookups_and_dashboard(self):
+        self.assertEqual(len(caching.subjects_for_course_type('MAJOR')), 2)
+        self.client.get(reverse('student_statistics'))
+        self.physics.subject_name = 'Applied Physics'
+        self.physics.save()
+        with self.assertNumQueries(1):
+            self.assertIn('Applied Physics', [s.subject_name for s in caching.subjects_for_course_type('MAJOR')])
+        self.assertContains(self.client.get(reverse('student_statistics')), 'Applied Physics')
+
+    def test_invalidation_reaches_other_processes(self):
+        # LocMemCache lives in one process; the others would never see a bump
+        self.assertNotEqual(settings.CACHES['default']['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+        # Another worker process has its own cache object over the same storage
+        other = caches.create_connection('default')
+        self.assertEqual(len(caching.subjects_for_course_type('MAJOR')), 2)
+        version = other.get('studentcorner:version:lookups')
+        Subject.objects.create(subject_code='BIO', subject_name='Biology', course_type='MAJOR')
+        self.assertNotEqual(other.get('studentcorner:version:lookups'), version)
+
+    def test_current_session(self):
+        self.assertIsNone(caching.current_session())
+        self.session.is_current = True
+        self.session.save()
+        self.assertEqual(caching.current_session(), self.session)
+        with self.assertNumQueries(0):
+            caching.current_session()
+
+
+class StudentLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.aamir = make_student('24001', student_name='Aamir Bashir', u_registration_no='201-ZP-2024')
+        cls.zara = make_student('24002', student_name='Zara Ahmad', u_registration_no='24001-XY', gender='F')
+
+    def test_exact_lookup_normalizes_and_prefers_registration_no(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(lookup.find_student(' 201 zp 2024 '), self.aamir)
+        self.assertEqual(lookup.find_student('24002'), self.zara)
+        self.assertEqual(lookup.find_student('RF-24001'), self.aamir)
+        self.assertIsNone(lookup.find_student('99999'))
+
+    def test_prefix_search_on_names_and_identifiers(self):
+        self.assertEqual([row['id'] for row in lookup.search('ahm')], [self.zara.id])
+        self.assertEqual([row['id'] for row in lookup.search('2400')], [self.aamir.id, self.zara.id])
+        self.assertEqual(lookup.search(' - '), [])
+
+    def test_index_follows_student_changes(self):
+        self.zara.student_name = 'Zara Mir'
+        self.zara.save()
+        self.assertEqual(lookup.search('ahmad'), [])
+        self.assertEqual([row['id'] for row in lookup.search('mir')], [self.zara.id])
+        self.zara.delete()
+        self.assertEqual(lookup.search('zara'), [])
+
+    def test_typeahead_endpoint(self):
+        self.assertEqual(self.client.get(reverse('student_lookup'), {'q': 'aam'}).status_code, 302)
+        self.assertNotContains(self.client.get(reverse('bonafide_certificate')), 'student_suggestions')
+
+        self.client.force_login(User.objects.create_user('staff', password='secret', is_staff=True))
+        response = self.client.get(reverse('student_lookup'), {'q': 'aam'})
+        self.assertEqual(response.json()['results'], [{
+            'student_name': 'Aamir Bashir', 'class_roll_no': '24001', 'u_registration_no': '201-ZP-2024',
+            'batch': self.aamir.batch,
+        }])
+        self.assertContains(self.client.get(reverse('bonafide_certificate')), 'student_suggestions')
+
+    def test_bonafide_search_uses_lookup(self):
+        response = self.client.post(reverse('bonafide_certificate'), {'search': '', 'search_term': '201zp2024'})
+        self.assertEqual(response.context['student'], self.aamir)
+
+
+class ExcelImportTests(EnrollmentDataMixin, TestCase):
+    def write_workbook(self, name, rows):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, name)
+        pd.DataFrame(rows).to_excel(path, index=False)
+        return path
+
+    def student_row(self, roll, **overrides):
+        row = dict(
+            reg_form_no=int(roll) + 1000, class_roll_no=int(roll), u_registration_no=float('nan'),
+            student_name=f'Imported {roll}', parent_name='Parent', mother_name='Mother', gender='Female',
+            course_name='Bachelor of Arts', batch=2024, state='J&K', district='Shopian', address='Zainapora',
+            community='General', mobile=9000000000, admission_date=pd.Timestamp('2024-08-01'), is_active=True,
+        )
+        row.update(overrides)
+        return row
+
+    def test_students_are_normalized_and_upserted(self):
+        path = self.write_workbook('students.xlsx', [
+            self.student_row('24101'),
+            self.student_row('24102', gender='MALE', u_registration_no='301-ZP-2024'),
+            self.student_row('24103', gender='unknown'),
+            self.student_row('24101', student_name='Imported Again'),
+        ])
+        call_command('import_excel', path, stdout=io.StringIO())
+
+        first = Student.objects.get(class_roll_no='24101')
+        self.assertEqual((first.reg_form_no, first.student_name, first.gender), ('25101', 'Imported Again', 'F'))
+        self.assertIsNone(first.u_registration_no)
+        self.assertEqual((first.batch, first.mobile), ('2024', '9000000000'))
+        self.assertFalse(Student.objects.filter(class_roll_no='24103').exists())
+        self.assertEqual(lookup.find_student('301zp2024').class_roll_no, '24102')
+
+        result, = importer.import_workbooks([Path(path)])
+        self.assertEqual((result.rows, result.imported, result.rejected), (4, 2, [(4, 'gender must be male or female')]))
+        self.assertEqual(Student.objects.filter(class_roll_no__startswith='241').count(), 2)
+
+    def test_enrollments_resolve_codes_and_refresh_rollup(self):
+        students = self.write_workbook('students.xlsx', [self.student_row('24101')])
+        enrollments = self.write_workbook('enrollments.xlsx', [
+            dict(class_roll_no=24101, session_code='2024-25', semester_number=1, major_course='PHY', minor_course='MAT'),
+            dict(class_roll_no=24002, session_code='2024-25', semester_number=1, major_course='CHE', minor_course=None),
+            dict(class_roll_no=24001, session_code='2024-25', semester_number=1, major_course='XXX', minor_course=None),
+        ])
+        out = io.StringIO()
+        call_command('import_excel', enrollments, students, stdout=out)
+
+        self.assertIn('row 4: unknown subject code in major_course', out.getvalue())
+        self.assertEqual(StudentSemester.objects.get(student__class_roll_no='24002').major_course, self.chemistry)
+        self.assertEqual(StudentSemester.objects.get(student__class_roll_no='24001').major_course, self.physics)
+        self.assertEqual(StudentSemester.objects.filter(student__class_roll_no='24101').count(), 1)
+        self.assertEqual(rollup.differences(), {})
+
+    def test_dry_run_writes_nothing(self):
+        path = self.write_workbook('students.xlsx', [self.student_row('24101')])
+        call_command('import_excel', path, '--dry-run', stdout=io.StringIO())
+        self.assertFalse(Student.objects.filter(class_roll_no='24101').exists())
+
+    def test_enrollment_sheet_keeps_slots_it_has_no_column_for(self):
+        enrollments = self.write_workbook('enrollments.xlsx', [
+            dict(class_roll_no=24001, session_code='2024-25', semester_number=1, major_course='CHE', minor_course=None),
+        ])
+        importer.import_workbooks([Path(enrollments)])
+        record = StudentSemester.objects.get(student__class_roll_no='24001')
+        self.assertEqual((record.major_course, record.minor_course, record.aec.subject_code), (self.chemistry, None, 'ENG'))
+        self.assertEqual(rollup.differences(), {})
+
+    def test_dry_run_resolves_students_of_the_same_import(self):
+        students = self.write_workbook('students.xlsx', [self.student_row('24101')])
+        enrollments = self.write_workbook('enrollments.xlsx', [
+            dict(class_roll_no=24101, session_code='2024-25', semester_number=1, major_course='PHY'),
+            dict(class_roll_no=24999, session_code='2024-25', semester_number=1, major_course='PHY'),
+        ])
+        results = importer.import_workbooks([Path(enrollments), Path(students)], dry_run=True)
+        self.assertEqual([result.rejected for result in results], [[], [(3, 'unknown class_roll_no')]])
+        self.assertFalse(StudentSemester.objects.filter(student__class_roll_no='24101').exists())
+
+    def test_no_workbooks(self):
+        with self.assertRaises(CommandError):
+            call_command('import_excel', tempfile.gettempdir() + '/missing.xlsx')
+
+
+class StreamingImportTests(EnrollmentDataMixin, TestCase):
+    def write_csv(self, rolls, form_prefix='RF'):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'roster.csv')
+        rows = [
+            dict(reg_form_no=f'{form_prefix}-{roll}', class_roll_no=roll, student_name=f'Streamed {roll}', gender='F',
+                 batch='2025', course_name='BA', parent_name='P', mother_name='M', state='J&K',
+                 district='Shopian', address='Zainapora', community='General', mobile='9000000000')
+            for roll in rolls
+        ]
+        pd.DataFrame(rows).to_csv(path, index=False)
+        return Path(path)
+
+    def test_interrupted_import_resumes_after_last_committed_chunk(self):
+        path = self.write_csv([str(25000 + n) for n in range(10)])
+        upsert = importer.upsert
+        calls = []
+
+        def failing_upsert(kind, rows, chunk_size):
+            calls.append(len(rows))
+            if len(calls) == 3:
+                raise RuntimeError('interrupted')
+            return upsert(kind, rows, chunk_size)
+
+        with mock.patch.object(importer, 'upsert', failing_upsert), self.assertRaises(RuntimeError):
+            importer.stream_workbooks([path], chunk_size=4)
+        self.assertEqual(Student.objects.filter(batch='2025').count(), 8)
+
+        result, = importer.stream_workbooks([path], chunk_size=4)
+        self.assertEqual((result.resumed_from, result.rows, result.imported), (8, 2, 2))
+        self.assertEqual(Student.objects.filter(batch='2025').count(), 10)
+        self.assertEqual(lookup.find_student('25009').student_name, 'Streamed 25009')
+
+        result, = importer.stream_workbooks([path], chunk_size=4)
+        self.assertEqual(result.rows, 0)
+        result, = importer.stream_workbooks([path], chunk_size=4, restart=True)
+        self.assertEqual((result.resumed_from, result.rows), (0, 10))
+
+    def test_streamed_workbook_matches_whole_sheet_import(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'enrollments.xlsx')
+        pd.DataFrame([
+            dict(class_roll_no=24002, session_code='2024-25', semester_number=1, major_course='CHE'),
+            dict(class_roll_no=None, session_code=None, semester_number=None, major_course=None),
+            dict(class_roll_no=24009, session_code='2024-25', semester_number=1, major_course='PHY'),
+        ]).to_excel(path, index=False)
+
+        out = io.StringIO()
+        call_command('import_excel', path, '--stream', '--chunk-size', '2', stdout=out)
+        self.assertIn('row 4: unknown class_roll_no', out.getvalue())
+        self.assertEqual(StudentSemester.objects.get(student__class_roll_no='24002').major_course, self.chemistry)
+        self.assertEqual(rollup.differences(), {})
+
+    def test_conflicting_identifiers_are_rejected(self):
+        path = self.write_csv(['24001', '25001'], form_prefix='NEW')
+        result, = importer.stream_workbooks([path])
+        self.assertEqual(result.rejected, [(2, 'class_roll_no belongs to another student')])
+        self.assertEqual(result.imported, 1)
+
+
+class ExportTests(EnrollmentDataMixin, TestCase):
+    ROUND_TRIP = ['sessions', 'semesters', 'subjects', 'students', 'enrollments']
+
+    def export(self, format, names=ROUND_TRIP):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        call_command('export_data', *names, '--format', format, '--output', directory, stdout=io.StringIO())
+        return sorted(Path(directory).iterdir())
+
+    def snapshot(self):
+        return {name: b''.join(exports.chunks(name, 'csv')) for name in ('students', 'enrollments')}
+
+    def assertRoundTrips(self, format):
+        before = self.snapshot()
+        paths = self.export(format)
+        Student.objects.all().delete()
+        self.assertEqual(StudentSemester.objects.count(), 0)
+
+        results = importer.import_workbooks(paths)
+        self.assertEqual([result.rejected for result in results], [[]] * len(self.ROUND_TRIP))
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(rollup.differences(), {})
+
+    def test_csv_round_trip(self):
+        self.assertRoundTrips('csv')
+
+    def test_xlsx_round_trip(self):
+        self.assertRoundTrips('xlsx')
+
+    @unittest.skipUnless('parquet' in exports.available_formats(), 'pyarrow is not installed')
+    def test_parquet_round_trip(self):
+        self.assertRoundTrips('parquet')
+        before = self.snapshot()
+        results = importer.stream_workbooks(self.export('parquet'))
+        self.assertEqual([(result.rows, result.rejected) for result in results][-1], (5, []))
+        self.assertEqual(self.snapshot(), before)
+
+    def test_subject_counts_and_certificate_register(self):
+        Certificate.objects.create(student=Student.objects.get(class_roll_no='24001'), certificate_type='bonafide',
+                                   certificate_number='SMMDCZ/GN/2025/01', issue_date=date(2025, 1, 15))
+        rows = list(csv.DictReader(io.StringIO(b''.join(exports.chunks('subject_enrollments', 'csv')).decode('utf-8-sig'))))
+        physics = [row for row in rows if row['subject_code'] == 'PHY']
+        self.assertEqual([(row['batch'], row['slot'], row['male'], row['female'], row['total']) for row in physics],
+                         [('2024', 'MAJOR', '1', '1', '2')])
+
+        register = b''.join(exports.chunks('certificates', 'csv')).decode('utf-8-sig').splitlines()
+        self.assertEqual(register[1], 'SMMDCZ/GN/2025/01,bonafide,2025-01-15,24001,24001-ZP-2024,Student 24001,2024,,,False')
+
+    def test_streamed_from_staff_only_endpoint(self):
+        url = reverse('export_dataset', args=['students', 'xlsx'])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('staff', password='secret', is_staff=True))
+        self.assertEqual(self.client.get(reverse('export_dataset', args=['passwords', 'csv'])).status_code, 404)
+        self.assertContains(self.client.get(reverse('student_statistics')),
+                            reverse('export_dataset', args=['certificates', 'csv']))
+
+    async def test_streamed_asynchronously_under_asgi(self):
+        user = await User.objects.acreate_user('staff', password='secret', is_staff=True)
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('export_dataset', args=['students', 'xlsx']))
+        self.assertTrue(response.streaming)
+        self.assertTrue(response.is_async)
+        self.assertIn('attachment; filename="students_', response['Content-Disposition'])
+        with warnings.catch_warnings():
+            # Django warns when it has to buffer a synchronous iterator
+            warnings.simplefilter('error')
+            content = b''.join([chunk async for chunk in response])
+        workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True)
+        self.assertEqual(len(list(workbook.active.iter_rows())), 6)
+
+
+class DatabaseTuningTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        found = database.current_pragmas()
+        self.assertEqual(found['busy_timeout'], 5000)
+        self.assertEqual(found['cache_size'], -20000)
+        self.assertNotIn('journal_mode', found)
+
+    def test_wal_only_when_turned_on(self):
+        self.assertFalse(settings.SQLITE_WAL)
+        with override_settings(SQLITE_WAL=True):
+            self.assertEqual(database.pragmas(), {**settings.SQLITE_PRAGMAS, 'journal_mode': 'WAL',
+                                                  'synchronous': 'NORMAL'})
+            # The contention benchmark's untuned profile switches WAL back off
+            with override_settings(SQLITE_PRAGMAS={'journal_mode': 'DELETE'}):
+                self.assertEqual(database.pragmas(), {'journal_mode': 'DELETE', 'synchronous': 'NORMAL'})
+
+    def test_optimize_command(self):
+        out = io.StringIO()
+        call_command('optimize_db', stdout=out)
+        self.assertIn('busy_timeout=5000', out.getvalue())
+        self.assertIn('optimize took', out.getvalue())
+
+        out = io.StringIO()
+        call_command('optimize_db', '--analyze', stdout=out)
+        self.assertIn('analyze took', out.getvalue())
+
+
+class AtomicIssuanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_student('24001')
+
+    def test_issue_replay_and_cooldown(self):
+        first = issuance.issue_bonafide(self.student, purpose='Scholarship', idempotency_key='form-1')
+        self.assertEqual(first.status, 'issued')
+        self.assertEqual(first.certificate.idempotency_key, 'form-1')
+
+        replay = issuance.issue_bonafide(self.student, idempotency_key='form-1')
+        self.assertEqual((replay.status, replay.certificate), ('replayed', first.certificate))
+
+        again = issuance.issue_bonafide(self.student, idempotency_key='form-2')
+        self.assertEqual(again.status, 'cooldown')
+        self.assertFalse(again.issued)
+        self.assertEqual(again.days_remaining(), eligibility.BONAFIDE_COOLDOWN_DAYS)
+
+        later = timezone.now().date() + timedelta(days=eligibility.BONAFIDE_COOLDOWN_DAYS)
+        self.assertEqual(issuance.issue_bonafide(self.student, idempotency_key='form-3', today=later).status, 'issued')
+        # A stale form resubmitted after a newer certificate still maps to its own
+        stale = issuance.issue_bonafide(self.student, idempotency_key='form-1', today=later)
+        self.assertEqual((stale.status, stale.certificate), ('replayed', first.certificate))
+        self.assertEqual(Certificate.objects.filter(student=self.student).count(), 2)
+
+    def test_key_of_another_students_form_is_refused(self):
+        first = issuance.issue_bonafide(self.student, idempotency_key='form-1')
+        other = make_student('24002')
+        refused = issuance.issue_bonafide(other, idempotency_key='form-1')
+        self.assertEqual((refused.status, refused.issued, refused.certificate), ('conflict', False, None))
+        self.assertIn('another student', refused.decision.reason)
+        self.assertEqual(list(Certificate.objects.all()), [first.certificate])
+
+        response = self.client.post(reverse('bonafide_certificate'), {
+            'issue_certificate': '', 'student_id': other.id, 'idempotency_key': 'form-1'})
+        self.assertContains(response, 'submitted for another student')
+
+    def test_check_is_one_statement(self):
+        issuance.issue_bonafide(self.student)
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(issuance.issue_bonafide(self.student).status, 'cooldown')
+        # The latest certificate; the rest opens and closes the transaction (here a savepoint)
+        statements = [query['sql'] for query in captured if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 1, statements)
+
+    def test_bulk_issue_locks_students_before_checking_cooldowns(self):
+        other = make_student('24002')
+        calls = mock.Mock()
+        with mock.patch.object(issuance, 'lock_students', calls.lock), \
+                mock.patch.object(eligibility, 'blocked_ids', wraps=eligibility.blocked_ids) as blocked:
+            calls.attach_mock(blocked, 'blocked_ids')
+            issued, _ = issuance.issue_bonafide_bulk([self.student, other])
+        self.assertEqual([call[0] for call in calls.mock_calls], ['lock', 'blocked_ids'])
+        calls.lock.assert_called_once_with([self.student.id, other.id])
+        self.assertEqual(len(issued), 2)
+
+    def test_double_submitted_form_issues_once(self):
+        use_temp_pdf_cache(self)
+        key = self.client.post(reverse('bonafide_certificate'), {
+            'search': '', 'search_term': '24001'}).context['idempotency_key']
+        form = {'issue_certificate': '', 'student_id': self.student.id, 'idempotency_key': key}
+
+        first = self.client.post(reverse('bonafide_certificate'), form)
+        second = self.client.post(reverse('bonafide_certificate'), form)
+        self.assertIn('preview_pdf_url', second.context)
+        self.assertContains(second, 'already submitted')
+        self.assertEqual(Certificate.objects.filter(student=self.student).count(), 1)
+        self.assertEqual(first.context['certificate_history'][0], second.context['certificate_history'][0])
+
+        other = self.client.post(reverse('bonafide_certificate'), dict(form, idempotency_key='another'))
+        self.assertFalse(other.context['can_issue'])
+        self.assertContains(other, 'Cannot issue certificate')
+
+    def test_concurrent_submissions(self):
+        # Real threads need a database file, which the command sets up itself
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'stress_issuance', '--forms', '60', '--threads', '6'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('issued 10,', result.stdout)
+        self.assertIn('locked 0', result.stdout)
+
+
+class EligibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [make_student(f'2400{i}') for i in range(1, 5)]
+
+    def issue(self, student, certificate_type, days_ago=0):
+        return Certificate.objects.create(student=student, certificate_type=certificate_type,
+                                          issue_date=timezone.now().date() - timedelta(days=days_ago))
+
+    def test_rules(self):
+        student = self.students[0]
+        self.assertTrue(eligibility.check(student, 'marks_sheet').allowed)
+        self.assertFalse(eligibility.check(student, 'discharge_cum_character').allowed)
+        self.assertIn('Requires a Degree', eligibility.check(student, 'discharge_cum_character').reason)
+
+        self.issue(student, 'marks_sheet')
+        self.issue(student, 'degree')
+        self.assertFalse(eligibility.check(student, 'marks_sheet').allowed)
+        self.assertTrue(eligibility.check(student, 'discharge_cum_character').allowed)
+        self.assertIn('hold a Degree', eligibility.check(student, 'character_not_passed').reason)
+
+        self.issue(student, 'bonafide', days_ago=100)
+        decision = eligibility.check(student, 'bonafide')
+        self.assertFalse(decision.allowed)
+        self.assertEqual(decision.eligible_from, timezone.now().date() + timedelta(days=80))
+        self.assertIn('Please wait 80 more days', decision.reason)
+        self.assertTrue(eligibility.check(student, 'bonafide', today=decision.eligible_from).allowed)
+
+        self.assertEqual(Certificate.can_issue_certificate(student, 'degree')[:2],
+                         (False, f'Already issued on {timezone.now().date()}. Can only be issued once.'))
+        self.assertEqual(Certificate.can_issue_certificate(student, 'marks_card')[0], False)
+
+    def test_index_follows_certificates(self):
+        degree = self.issue(self.students[1], 'degree')
+        self.assertFalse(eligibility.check(self.students[1], 'character_not_passed').allowed)
+        degree.student = self.students[2]
+        degree.save()
+        self.assertTrue(eligibility.check(self.students[1], 'character_not_passed').allowed)
+        self.assertFalse(eligibility.check(self.students[2], 'character_not_passed').allowed)
+        degree.delete()
+        self.assertTrue(eligibility.check(self.students[2], 'character_not_passed').allowed)
+        self.assertEqual(eligibility.differences(), {})
+
+    def test_batch_lookup_is_one_query(self):
+        self.issue(self.students[0], 'bonafide', days_ago=10)
+        self.issue(self.students[1], 'bonafide', days_ago=200)
+        self.issue(self.students[2], 'degree')
+        with self.assertNumQueries(1):
+            self.assertEqual(eligibility.blocked_ids(self.students, 'bonafide'), {self.students[0].id})
+        with self.assertNumQueries(1):
+            self.assertEqual(eligibility.blocked_ids(self.students, 'discharge_cum_character'),
+                             {self.students[0].id, self.students[1].id, self.students[3].id})
+        with self.assertNumQueries(1):
+            decisions = eligibility.check_many(self.students, 'degree')
+        self.assertEqual([decisions[s.id].allowed for s in self.students], [True, True, False, True])
+
+    def test_rebuild_command(self):
+        self.issue(self.students[0], 'bonafide')
+        Certificate.objects.bulk_create([Certificate(student=self.students[1], certificate_type='degree',
+                                                     issue_date=date(2025, 6, 1))])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_eligibility', '--check', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('rebuild_eligibility', stdout=out)
+        self.assertIn('Rebuilt 10 certificate eligibility rows', out.getvalue())
+        call_command('rebuild_eligibility', '--check', stdout=io.StringIO())
+
+
+class CertificateNumberingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [make_student(f'2400{i}') for i in range(1, 5)]
+
+    def test_issued_certificates_are_numbered_in_sequence(self):
+        year = timezone.now().year
+        first = issuance.issue_bonafide(self.students[0]).certificate
+        issued, _ = issuance.issue_bonafide_bulk(self.students)
+        self.assertEqual(first.certificate_number, f'SMMDCZ/GN/{year}/01')
+        self.assertEqual([c.certificate_number for c in issued],
+                         [f'SMMDCZ/GN/{year}/{n:02d}' for n in (2, 3, 4)])
+        self.assertEqual(Certificate.objects.get(certificate_number=f'SMMDCZ/GN/{year}/03').student, self.students[2])
+
+        payload = pdf_generator.bonafide_render_inputs(self.students[1], issued[0])
+        self.assertEqual(payload['certificate_number'], f'SMMDCZ/GN/{year}/02')
+
+    def test_blocks_per_type_and_year(self):
+        self.assertEqual(numbering.reserve('bonafide', 2025, 3), range(1, 4))
+        self.assertEqual(numbering.reserve('bonafide', 2025), range(4, 5))
+        self.assertEqual(numbering.reserve('degree', 2025, 2), range(1, 3))
+        self.assertEqual(numbering.reserve('bonafide', 2026), range(1, 2))
+        with self.assertNumQueries(2):
+            self.assertEqual(numbering.reserve('bonafide', 2025, 100), range(5, 105))
+
+    def test_rolled_back_issue_returns_its_numbers(self):
+        try:
+            with transaction.atomic():
+                numbering.reserve('bonafide', 2025, 5)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(numbering.reserve('bonafide', 2025), range(1, 2))
+
+    def test_backfill_keeps_printed_numbers(self):
+        old = Certificate.objects.create(student=self.students[0], certificate_type='bonafide',
+                                         issue_date=date(2024, 3, 1))
+        degree = Certificate.objects.create(student=self.students[1], certificate_type='degree',
+                                            issue_date=date(2024, 5, 1))
+        out = io.StringIO()
+        call_command('number_certificates', stdout=out)
+        self.assertIn('Numbered 2 certificates', out.getvalue())
+
+        old.refresh_from_db()
+        degree.refresh_from_db()
+        self.assertEqual(old.certificate_number, f'SMMDCZ/GN/2024/{old.id + 100:02d}')
+        self.assertEqual(degree.certificate_number, 'SMMDCZ/DG/2024/01')
+        self.assertEqual(CertificateCounter.objects.get(certificate_type='bonafide', year=2024).next_value,
+                         old.id + 101)
+        self.assertEqual(numbering.backfill(), 0)
+
+    def test_backfill_renumber(self):
+        for month in (6, 2):
+            Certificate.objects.create(student=self.students[0], certificate_type='bonafide',
+                                       issue_date=date(2024, month, 1))
+        self.assertEqual(numbering.backfill(renumber=True), 2)
+        self.assertEqual(
+            list(Certificate.objects.order_by('issue_date').values_list('certificate_number', flat=True)),
+            ['SMMDCZ/GN/2024/01', 'SMMDCZ/GN/2024/02'])
+
+    def test_migration_seeds_counters_above_printed_numbers(self):
+        today = timezone.now().date()
+        legacy = Certificate.objects.create(student=self.students[0], certificate_type='bonafide', issue_date=today)
+        seed = importlib.import_module('studentcorner.migrations.0018_seed_certificate_counters')
+        seed.seed_certificate_counters(django_apps, None)
+
+        issued = issuance.issue_bonafide(self.students[1]).certificate
+        self.assertEqual(issued.certificate_number, numbering.format_number('bonafide', today.year, legacy.id + 101))
+        self.assertEqual(numbering.backfill(), 1)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.certificate_number, numbering.legacy_number(legacy))
+
+    def test_admin_finds_certificate_by_number(self):
+        certificate = issuance.issue_bonafide(self.students[0]).certificate
+        issuance.issue_bonafide(self.students[1])
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        response = self.client.get(reverse('admin:studentcorner_certificate_changelist'),
+                                   {'q': certificate.certificate_number.lower()})
+        self.assertEqual(list(response.context['cl'].result_list), [certificate])
+
+        prefix, year, sequence = numbering.parse_number(certificate.certificate_number)
+        response = self.client.get(reverse('admin:studentcorner_certificate_changelist'),
+                                   {'q': f' {prefix.lower()}/{year}/{sequence} '})
+        self.assertEqual(list(response.context['cl'].result_list), [certificate])
+
+
+class AdminChangelistTests(TestCase):
+    CHANGELISTS = ['studentsemester', 'certificate', 'student']
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+
+    def changelist_queries(self):
+        counts = {}
+        for model in self.CHANGELISTS:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(f'admin:studentcorner_{model}_changelist'))
+            self.assertEqual(response.status_code, 200)
+            counts[model] = len(queries)
+        return counts
+
+    def test_query_count_does_not_grow_with_rows(self):
+        data.generate(10, batches=2)
+        few = self.changelist_queries()
+        data.generate(60, batches=2)
+        self.assertGreater(Certificate.objects.count(), 10)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_student_pickers_are_autocompletes(self):
+        data.generate(20, batches=2)
+        for model in ('studentsemester', 'certificate'):
+            response = self.client.get(reverse(f'admin:studentcorner_{model}_add'))
+            self.assertContains(response, 'admin-autocomplete')
+            self.assertNotContains(response, Student.objects.first().student_name)
+
+    def test_large_unfiltered_changelist_uses_estimated_count(self):
+        data.generate(30, batches=2)
+        url = reverse('admin:studentcorner_student_changelist')
+        with mock.patch('studentcorner.admin.ESTIMATE_COUNT_ABOVE', 10):
+            self.assertEqual(self.client.get(url).context['cl'].result_count, 30)
+            connection.cursor().execute('ANALYZE')
+            make_student('99001')
+            self.assertEqual(database.estimated_count(Student), 30)
+            self.assertEqual(self.client.get(url).context['cl'].result_count, 30)
+            self.assertEqual(self.client.get(url, {'q': '99001'}).context['cl'].result_count, 1)
+
+
+class SubjectPickerTests(EnrollmentDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        self.record = StudentSemester.objects.get(student__class_roll_no='24001')
+        self.url = reverse('admin:studentcorner_studentsemester_change', args=[self.record.id])
+
+    def subject_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        # Queries of the subject catalogue itself; the record's slots join their subjects
+        return response, [query['sql'] for query in queries if 'FROM "subjects"' in query['sql']]
+
+    def test_catalogue_is_one_query_and_invalidated_on_save(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(len(caching.subjects_for_course_type('MAJOR')), 2)
+            self.assertEqual(caching.subjects_for_course_type('MINOR'), [self.maths])
+        Subject.objects.create(subject_code='BOT', subject_name='Botany', course_type='MAJOR')
+        self.assertEqual(len(caching.subjects_for_course_type('MAJOR')), 3)
+
+    def test_change_form_renders_only_selected_subjects(self):
+        Subject.objects.bulk_create([
+            Subject(subject_code=f'M{n}', subject_name=f'Major {n}', course_type='MAJOR') for n in range(50)])
+        caching.bump(caching.LOOKUPS)
+        response, queries = self.subject_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, f'<option value="{self.physics.id}" selected>')
+        self.assertNotContains(response, 'Major 7')
+        self.assertEqual(self.subject_queries()[1], [])
+
+    def test_autocomplete_filters_by_course_type_and_term(self):
+        url = reverse('admin:studentcorner_studentsemester_subjects', args=['MAJOR'])
+        results = self.client.get(url, {'term': 'phy'}).json()
+        self.assertEqual(results, {'results': [{'id': str(self.physics.id), 'text': str(self.physics)}],
+                                   'pagination': {'more': False}})
+        self.assertEqual(len(self.client.get(url).json()['results']), 2)
+        self.assertEqual(self.client.get(reverse('admin:studentcorner_studentsemester_subjects',
+                                                 args=['NOPE'])).status_code, 404)
+
+    def test_saving_picks_validates_against_catalogue(self):
+        data = {
+            'student': self.record.student_id, 'session': self.session.id, 'semester': self.sem1.id,
+            'is_enrolled': 'on', 'enrollment_date': '2024-08-01',
+            'major_course': self.chemistry.id, 'minor_course': self.physics.id,
+        }
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 200)  # Physics is not a minor subject
+        self.assertEqual(StudentSemester.objects.get(pk=self.record.pk).major_course, self.physics)
+
+        data['minor_course'] = self.maths.id
+        self.assertRedirects(self.client.post(self.url, data),
+                             reverse('admin:studentcorner_studentsemester_changelist'))
+        record = StudentSemester.objects.get(pk=self.record.pk)
+        self.assertEqual((record.major_course, record.minor_course, record.aec), (self.chemistry, self.maths, None))
+
+
+class BenchmarkTests(TestCase):
+    def test_generated_data_is_reproducible_when_grown(self):
+        self.assertEqual(data.generate(30, batches=3, seed=7), 30)
+        self.assertEqual(data.generate(60, batches=3, seed=7), 30)
+        self.assertEqual(data.generate(60, batches=3, seed=7), 0)
+
+        for i in (0, 45, 59):
+            row = data.student_row(7, i, 3)
+            student = Student.objects.get(reg_form_no=row['reg_form_no'])
+            self.assertEqual((student.student_name, student.batch), (row['student_name'], row['batch']))
+            self.assertEqual(lookup.find_student(row['class_roll_no']), student)
+        self.assertEqual(
+            StudentSemester.objects.count(), sum(len(data.enrollment_rows(7, i, 3)) for i in range(60)))
+        self.assertEqual(
+            Certificate.objects.count(), sum(data.bonafide_age(7, i) is not None for i in range(60)))
+        self.assertEqual(rollup.differences(), {})
+
+    def test_run_and_checks(self):
+        report = runner.run(sizes=[40], batches=2, repeats=3)
+        results = report['results']['40']
+        self.assertEqual(set(results), {'generate', *scenarios.SCENARIOS})
+        self.assertEqual(results['statistics']['cold_queries'], 2)
+        self.assertEqual(results['bulk_import']['rejected'], 0)
+        self.assertEqual(Certificate.objects.filter(issued_by='Benchmark').count(), Certificate.objects.count())
+
+        self.assertEqual(runner.check(report, baseline=report), [])
+        [failure] = runner.check(report, thresholds={'*.statistics.cold_queries': {'max': 1}})
+        self.assertIn('40.statistics.cold_queries = 2', failure)
+
+        faster = json.loads(json.dumps(report))
+        faster['results']['40']['search']['prefix_p95_ms'] /= 2
+        faster['results']['40']['search']['prefix_ops_per_sec'] *= 2
+        self.assertEqual(len(runner.check(report, baseline=faster)), 2)
+
+
+class SemesterDrillDownTests(EnrollmentDataMixin, TestCase):
+    def url(self, number=1):
+        return reverse('semester_statistics', args=[number])
+
+    def test_each_filter_combination_costs_one_query_then_none(self):
+        self.client.get(self.url())
+        with self.assertNumQueries(1):
+            self.client.get(self.url(), {'gender': 'F'})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url(), {'gender': 'F'})
+        self.assertEqual(response.context['overall_stats']['total'], 2)
+
+    def test_filters(self):
+        context = self.client.get(self.url()).context
+        self.assertEqual(context['overall_stats'], {
+            'semester__semester_number': 1, 'semester__semester_name': '1st', 'total': 3, 'male': 1, 'female': 2})
+        self.assertEqual(list(context['course_type_details']), list(COURSE_SLOTS))
+
+        majors = self.client.get(self.url(), {'gender': 'F'}).context['course_type_details']['major_course']
+        self.assertEqual([(row['subject_code'], row['total_students']) for row in majors['subjects']],
+                         [('CHE', 1), ('PHY', 1)])
+        self.assertEqual(self.client.get(self.url(3), {'batch': '2023'}).context['overall_stats']['total'], 1)
+        self.assertEqual(self.client.get(self.url(3), {'batch': '2024'}).context['overall_stats']['total'], 0)
+        self.assertEqual(self.client.get(self.url(), {'session': '2024-25'}).context['overall_stats']['total'], 3)
+        # Unknown choices are ignored rather than cached under a new key
+        self.assertEqual(self.client.get(self.url(), {'batch': '1999'}).context['filters'], {})
+
+    def test_htmx_fragment_and_json(self):
+        response = self.client.get(self.url(), {'batch': '2024'}, headers={'HX-Request': 'true'})
+        self.assertTemplateUsed(response, 'studentcorner/semester_detail_results.html')
+        self.assertTemplateNotUsed(response, 'studentcorner/semester_detail.html')
+        self.assertIn('HX-Request', response['Vary'])
+
+        page = self.client.get(self.url(), {'batch': '2024'})
+        self.assertTemplateUsed(page, 'studentcorner/semester_detail.html')
+        self.assertIn('HX-Request', page['Vary'])
+        self.assertContains(page, f'{self.url(3)}?batch=2024')
+
+        data = self.client.get(self.url(), {'gender': 'M', 'format': 'json'}).json()
+        self.assertEqual(data['filters'], {'gender': 'M'})
+        self.assertEqual(data['overall']['total'], 1)
+        slots = {slot['type']: slot for slot in data['slots']}
+        self.assertEqual(len(slots), 8)
+        self.assertEqual([row['subject_code'] for row in slots['minor_course']['subjects']], ['MAT'])
+
+    def test_unknown_semester(self):
+        self.assertEqual(self.client.get(self.url(8)).status_code, 404)
+
+    def test_linked_from_dashboard(self):
+        self.assertContains(self.client.get(reverse('student_statistics')), f'href="{self.url(3)}"')
@@ -5,7 +5,14 @@ from . import views
 urlpatterns = [
     path('', views.index,name="index"),
     path('bonafide',views.bonafide_certificate,name='bonafide_certificate'),
+    path('students/lookup/', views.student_lookup, name='student_lookup'),
+    path('bonafide/bulk/', views.bulk_bonafide_certificate, name='bulk_bonafide_certificate'),
     path('bonafide/download/<int:certificate_id>/', views.download_bonafide_pdf, name='download_bonafide_pdf'),
+    path('bonafide/preview/<str:token>/', views.preview_bonafide_pdf, name='preview_bonafide_pdf'),
+    path('bonafide/jobs/<int:job_id>/', views.render_job_status, name='render_job_status'),
     path('statistics/', views.student_statistics, name='student_statistics'),
+    path('statistics/semester/<int:semester_number>/', views.detailed_semester_stats, name='semester_statistics'),
+    path('performance/', views.performance_dashboard, name='performance_dashboard'),
+    path('exports/<str:dataset>.<str:format>', views.export_dataset, name='export_dataset'),
 
 ]
@@ -1,23 +1,50 @@
-from django.shortcuts import render
-from django.shortcuts import render, redirect, get_object_or_404
+from datetime import datetime
+from io import BytesIO
+import os
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
-from .models import Student, Certificate, StudentSemester
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render, aget_object_or_404
+from django.urls import reverse
 from django.utils import timezone
-import base64
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, urlencode
+
+from . import caching, eligibility, exports, instrumentation, jobs, pdf_cache, render_service
+from .forms import BulkBonafideForm, SemesterStatsForm
+from .issuance import issue_bonafide, issue_bonafide_bulk, select_students
+from .lookup import find_student, search as search_students
+from .models import Student, Certificate, RenderJob, StudentSemester
+from .render_service import RenderQueueFull
+from .stats import adashboard_statistics, semester_detail
 
 def index(request):
     return render(request,"studentcorner/home.html")
 
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib import messages
-from django.db.models import Q
-from django.utils import timezone
-from django.http import HttpResponse
-from datetime import timedelta
-from .models import Student, Certificate, StudentSemester
-from .pdf_generator import generate_bonafide_certificate
+PREVIEW_TOKEN_SALT = 'studentcorner.bonafide_preview'
+
+FILE_BLOCK_SIZE = 64 * 1024
+
+def _student_semesters(student):
+    return StudentSemester.objects.filter(student=student).select_related('session', 'semester').order_by('-session__start_date')
 
-def bonafide_certificate(request):
+
+def _bonafide_history(student):
+    return Certificate.objects.filter(student=student, certificate_type='bonafide').order_by('-issue_date')
+
+
+# Templates may still touch the ORM (lazy relations, {% cache %}), so they
+# are rendered off the event loop
+arender = sync_to_async(render)
+
+
+async def bonafide_certificate(request):
     student = None
     student_semesters = None
     certificate_history = None
@@ -29,111 +56,85 @@ def bonafide_certificate(request):
         if 'search' in request.POST:
             search_term = request.POST.get('search_term')
             try:
-                student = Student.objects.get(
-                    Q(u_registration_no=search_term) | Q(class_roll_no=search_term)
-                )
-                student_semesters = StudentSemester.objects.filter(student=student).order_by('-session__start_date')
-                latest_semester = student_semesters.first() if student_semesters.exists() else None
-                
-                certificate_history = Certificate.objects.filter(
-                    student=student, 
-                    certificate_type='bonafide'
-                ).order_by('-issue_date')
+                student = await sync_to_async(find_student)(search_term)
+                if student is None:
+                    raise Student.DoesNotExist
+                student_semesters = [sem async for sem in _student_semesters(student)]
+                latest_semester = student_semesters[0] if student_semesters else None
                 
-                if certificate_history.exists():
-                    last_certificate = certificate_history.first()
-                    last_certificate_date = last_certificate.issue_date
-                    days_since = (timezone.now().date() - last_certificate_date).days
-                    if days_since < 180:
-                        can_issue = False
-                        remaining_days = 180 - days_since
-                        messages.warning(request, f'Cannot issue certificate. Last certificate was issued on {last_certificate_date}. Please wait {remaining_days} more days.')
+                certificate_history = [cert async for cert in _bonafide_history(student)]
+
+                decision = await sync_to_async(eligibility.check)(student, 'bonafide')
+                last_certificate_date = decision.last_issued
+                if not decision.allowed:
+                    can_issue = False
+                    messages.warning(request, f'Cannot issue certificate. {decision.reason}')
                 
             except Student.DoesNotExist:
                 messages.error(request, 'Student not found with this registration/roll number')
         
         elif 'issue_certificate' in request.POST:
             student_id = request.POST.get('student_id')
-            student = get_object_or_404(Student, id=student_id)
-            
-            # IMPORTANT: Check if certificate can be issued AGAIN before creating
-            certificate_history = Certificate.objects.filter(
-                student=student, 
-                certificate_type='bonafide'
-            ).order_by('-issue_date')
+            student = await aget_object_or_404(Student, id=student_id)
             
-            can_issue = True
-            if certificate_history.exists():
-                last_certificate = certificate_history.first()
-                last_certificate_date = last_certificate.issue_date
-                days_since = (timezone.now().date() - last_certificate_date).days
-                if days_since < 180:
-                    can_issue = False
-                    remaining_days = 180 - days_since
-                    messages.error(request, f'Cannot issue certificate! Last certificate was issued on {last_certificate_date}. Please wait {remaining_days} more days.')
-                    
-                    # Reload student data to show the restriction
-                    student_semesters = StudentSemester.objects.filter(student=student).order_by('-session__start_date')
-                    latest_semester = student_semesters.first() if student_semesters.exists() else None
-                    
-                    context = {
-                        'student': student,
-                        'student_semesters': student_semesters,
-                        'certificate_history': certificate_history,
-                        'can_issue': False,
-                        'last_certificate_date': last_certificate_date,
-                        'latest_semester': latest_semester,
-                    }
-                    return render(request, 'studentcorner/bonafide.html', context)
-            
-            # Only create certificate if allowed
-            if can_issue:
-                latest_semester = StudentSemester.objects.filter(student=student).order_by('-session__start_date').first()
-
-                certificate = Certificate.objects.create(
-                    student=student,
-                    student_semester=latest_semester,
-                    certificate_type='bonafide',
-                    issue_date=timezone.now().date(),
-                    purpose=request.POST.get('purpose', ''),
-                    remarks=request.POST.get('remarks', ''),
-                    issued_by=request.user.username if request.user.is_authenticated else 'Admin'
-                )
-
-                # Generate PDF buffer
-                pdf_buffer = generate_bonafide_certificate(student, certificate, latest_semester)
-
-                # Convert BytesIO to Base64
-                pdf_bytes = pdf_buffer.getvalue()
-                pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-
-                # Reload certificate history AFTER creating new certificate
-                certificate_history = Certificate.objects.filter(
-                    student=student, 
-                    certificate_type='bonafide'
-                ).order_by('-issue_date')
-                
-                # Update can_issue flag - NOW it should be False since we just issued one
-                can_issue = False
-                last_certificate_date = certificate.issue_date
-                
-                # Reload student semesters
-                student_semesters = StudentSemester.objects.filter(student=student).order_by('-session__start_date')
+            latest_semester = await _student_semesters(student).afirst()
+            user = await request.auser()
 
-                messages.success(request, f'Bonafide certificate issued successfully on {certificate.issue_date}!')
+            # The cooldown check and the insert happen in one locked transaction,
+            # so two submissions racing each other cannot both issue; a
+            # resubmitted form (same idempotency key) gets its certificate back
+            outcome = await sync_to_async(issue_bonafide)(
+                student,
+                student_semester=latest_semester,
+                purpose=request.POST.get('purpose', ''),
+                remarks=request.POST.get('remarks', ''),
+                issued_by=user.username if user.is_authenticated else 'Admin',
+                idempotency_key=request.POST.get('idempotency_key') or None,
+            )
+
+            certificate_history = [cert async for cert in _bonafide_history(student)]
+            student_semesters = [sem async for sem in _student_semesters(student)]
+            last_certificate_date = outcome.last_issue_date
+
+            if not outcome.issued:
+                messages.error(request, f'Cannot issue certificate! {outcome.decision.reason}')
 
                 context = {
                     'student': student,
                     'student_semesters': student_semesters,
                     'certificate_history': certificate_history,
-                    'can_issue': False,  # IMPORTANT: Set to False after issuing
-                    'last_certificate_date': last_certificate_date,  # Show the date just issued
+                    'can_issue': False,
+                    'last_certificate_date': last_certificate_date,
                     'latest_semester': latest_semester,
-                    'preview_pdf_base64': pdf_base64,
-                    'clear_form': True,  # Flag to clear form fields
                 }
+                return await arender(request, 'studentcorner/bonafide.html', context)
+
+            certificate = outcome.certificate
 
-                return render(request, 'studentcorner/bonafide.html', context)
+            # A render worker puts the PDF into the on-disk store; the page
+            # long-polls the job and only then loads the short-lived signed
+            # preview URL, which renders inline if no worker picked the job up
+            render_job = await sync_to_async(jobs.enqueue_bonafide_pdf)(certificate)
+            preview_pdf_url = reverse('preview_bonafide_pdf', args=[sign_preview_token(certificate.id)])
+
+            if outcome.status == 'replayed':
+                messages.info(request, f'This form was already submitted; showing the certificate issued on {certificate.issue_date}.')
+            else:
+                messages.success(request, f'Bonafide certificate issued successfully on {certificate.issue_date}!')
+
+            context = {
+                'student': student,
+                'student_semesters': student_semesters,
+                'certificate_history': certificate_history,
+                'can_issue': False,  # IMPORTANT: Set to False after issuing
+                'last_certificate_date': last_certificate_date,  # Show the date just issued
+                'latest_semester': latest_semester,
+                'preview_pdf_url': preview_pdf_url,
+                'render_job_url': reverse('render_job_status', args=[render_job.id]),
+                'clear_form': True,  # Flag to clear form fields
+            }
+
+            return await arender(request, 'studentcorner/bonafide.html', context)
     
     context = {
         'student': student,
@@ -142,180 +143,238 @@ def bonafide_certificate(request):
         'can_issue': can_issue,
         'last_certificate_date': last_certificate_date,
         'latest_semester': latest_semester,
+        # Sent back with the issue form so a double submit issues only once
+        'idempotency_key': uuid.uuid4().hex,
     }
-    return render(request, 'studentcorner/bonafide.html', context)
+    return await arender(request, 'studentcorner/bonafide.html', context)
+
+
+
+# Fields a suggestion shows; nothing else about the student leaves the server
+LOOKUP_FIELDS = ('student_name', 'class_roll_no', 'u_registration_no', 'batch')
+
+
+@staff_member_required
+def student_lookup(request):
+    """Typeahead suggestions for the bonafide search box"""
+    results = search_students(request.GET.get('q', ''), limit=10)
+    return JsonResponse({'results': [{name: row[name] for name in LOOKUP_FIELDS} for row in results]})
+
+
+async def render_job_status(request, job_id):
+    """
+    Status of a render job. With ``?wait=N`` the response is held for up to
+    N seconds (capped by BONAFIDE_JOB_MAX_WAIT) until the job has finished.
+    """
+    await aget_object_or_404(RenderJob, id=job_id)
+    try:
+        wait = max(0.0, min(float(request.GET.get('wait', 0)), settings.BONAFIDE_JOB_MAX_WAIT))
+    except ValueError:
+        wait = 0.0
+    job = await jobs.await_job(job_id, wait)
+    return JsonResponse({'id': job.id, 'status': job.status, 'attempts': job.attempts})
 
 
+def sign_preview_token(certificate_id):
+    return signing.TimestampSigner(salt=PREVIEW_TOKEN_SALT).sign(str(certificate_id))
 
-def download_bonafide_pdf(request, certificate_id):
-    certificate = get_object_or_404(Certificate, id=certificate_id, certificate_type='bonafide')
+
+async def download_bonafide_pdf(request, certificate_id):
+    return await _serve_bonafide_pdf(request, certificate_id)
+
+
+async def preview_bonafide_pdf(request, token):
+    """Stream a freshly issued certificate through a signed URL that expires after a few minutes"""
+    max_age = settings.BONAFIDE_PREVIEW_MAX_AGE
+    try:
+        certificate_id = signing.TimestampSigner(salt=PREVIEW_TOKEN_SALT).unsign(token, max_age=max_age)
+    except signing.BadSignature:
+        raise Http404('Preview link is invalid or has expired')
+    return await _serve_bonafide_pdf(request, int(certificate_id), max_age=max_age)
+
+
+async def _serve_bonafide_pdf(request, certificate_id, max_age=None):
+    certificate = await aget_object_or_404(
+        Certificate.objects.select_related('student', 'student_semester__semester'),
+        id=certificate_id,
+        certificate_type='bonafide',
+    )
     student = certificate.student
     student_semester = certificate.student_semester
-    
-    # Generate PDF
-    pdf_buffer = generate_bonafide_certificate(student, certificate, student_semester)
-    
-    # Serve PDF inline
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
+
+    # Answer revalidation from the content hash without touching the PDF
+    key = pdf_cache.content_key(student, certificate, student_semester)
+    etag = f'"{key}"'
+    last_modified = int(certificate.created_at.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    # Served from the on-disk store; rendered only on the first request. Both
+    # run in a worker thread (no database access) so the event loop stays free
+    try:
+        path, key = await sync_to_async(pdf_cache.get_or_render, thread_sensitive=False)(
+            student, certificate, student_semester, key=key)
+    except RenderQueueFull:
+        return _render_queue_full()
+    response = _file_response(request, path, 'application/pdf')
     filename = f"bonafide_{student.u_registration_no}_{certificate.issue_date}.pdf"
     # Inline display for iframe
     response['Content-Disposition'] = f'inline; filename="{filename}"'
-    
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if max_age:
+        patch_cache_control(response, private=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+
     return response
 
 
+def _file_response(request, path, content_type):
+    """
+    Stream the file at ``path`` from disk. Under ASGI Django would read a
+    FileResponse's synchronous file into memory first, so there the file is
+    read block by block in a worker thread instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return FileResponse(open(path, 'rb'), content_type=content_type)
 
+    async def blocks():
+        handle = await sync_to_async(open, thread_sensitive=False)(path, 'rb')
+        try:
+            while block := await sync_to_async(handle.read, thread_sensitive=False)(FILE_BLOCK_SIZE):
+                yield block
+        finally:
+            handle.close()
 
-# Add to your views.py
-from django.db.models import Count, Q
-from django.http import JsonResponse
-from collections import defaultdict
-def student_statistics(request):
-    """Main statistics dashboard with detailed subject-wise breakdown"""
-    # Get all active students
-    active_students = Student.objects.filter(is_active=True)
-    
-    # Overall statistics
-    total_students = active_students.count()
-    male_students = active_students.filter(gender='M').count()
-    female_students = active_students.filter(gender='F').count()
-    
-    # Batch-wise statistics - FIXED: removed student__ prefix since we're already on Student model
-    batch_stats = active_students.values('batch').annotate(
-        total=Count('id'),
-        male=Count('id', filter=Q(gender='M')),
-        female=Count('id', filter=Q(gender='F'))
-    ).order_by('batch')
-    
-    # Semester-wise enrollment
-    semester_enrollment = StudentSemester.objects.filter(
-        is_enrolled=True,
-        student__is_active=True
-    ).values(
-        'semester__semester_number', 
-        'semester__semester_name'
-    ).annotate(
-        total=Count('id'),
-        male=Count('id', filter=Q(student__gender='M')),
-        female=Count('id', filter=Q(student__gender='F'))
-    ).order_by('semester__semester_number')
-    
-    # Detailed subject-wise statistics for each course type
-    course_type_details = {}
-    
-    # Define all course types and their display names
-    course_types = {
-        'major_course': 'Major Courses',
-        'minor_course': 'Minor Courses', 
-        'md1': 'Multidisciplinary 1',
-        'md2': 'Multidisciplinary 2',
-        'skill': 'Skill Enhancement',
-        'vac1': 'Value Added Course 1',
-        'vac2': 'Value Added Course 2',
-        'aec': 'Ability Enhancement Course',
-    }
-    
-    # Get detailed subject counts for each course type
-    for course_field, display_name in course_types.items():
-        subject_stats = StudentSemester.objects.filter(
-            is_enrolled=True,
-            student__is_active=True,
-            **{f'{course_field}__isnull': False}
-        ).values(
-            f'{course_field}__subject_code',
-            f'{course_field}__subject_name',
-            f'{course_field}__course_type'
-        ).annotate(
-            total_students=Count('id'),
-            male_students=Count('id', filter=Q(student__gender='M')),
-            female_students=Count('id', filter=Q(student__gender='F'))
-        ).order_by(f'{course_field}__subject_name')
-        
-        course_type_details[course_field] = {
-            'display_name': display_name,
-            'subjects': list(subject_stats),
-            'total_enrollments': sum([subject['total_students'] for subject in subject_stats])
-        }
-    
-    # Overall course type summary (without subject details)
-    course_type_summary = []
-    for course_field, display_name in course_types.items():
-        stats = StudentSemester.objects.filter(
-            is_enrolled=True,
-            student__is_active=True,
-            **{f'{course_field}__isnull': False}
-        ).aggregate(
-            total=Count('id'),
-            male=Count('id', filter=Q(student__gender='M')),
-            female=Count('id', filter=Q(student__gender='F'))
+    response = StreamingHttpResponse(blocks(), content_type=content_type)
+    response['Content-Length'] = os.path.getsize(path)
+    return response
+
+
+def _render_queue_full():
+    response = HttpResponse('The certificate renderer is busy, please try again shortly.', status=503)
+    response['Retry-After'] = 10
+    return response
+
+
+@staff_member_required
+def bulk_bonafide_certificate(request):
+    """Issue bonafide certificates for a batch, a semester or a list of roll numbers"""
+    form = BulkBonafideForm(request.POST or None)
+
+    if request.method == 'POST' and form.is_valid():
+        data = form.cleaned_data
+        students = select_students(
+            batch=data['batch'],
+            session=data['session'] or (caching.current_session() if data['semester'] else None),
+            semester=data['semester'],
+            roll_numbers=data['roll_numbers'],
         )
-        
-        course_type_summary.append({
-            'type': course_field,
-            'name': display_name,
-            'total': stats['total'],
-            'male': stats['male'],
-            'female': stats['female']
-        })
-    
+        issued, skipped = issue_bonafide_bulk(
+            students,
+            purpose=data['purpose'],
+            issued_by=request.user.username,
+        )
+
+        if issued:
+            stamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+            try:
+                if data['output'] == 'zip':
+                    buffer = render_service.bonafide_zip(issued)
+                    response = FileResponse(buffer, as_attachment=True, filename=f"bonafide_bulk_{stamp}.zip",
+                                            content_type='application/zip')
+                else:
+                    buffer = BytesIO(render_service.bonafide_pdf(issued))
+                    response = FileResponse(buffer, as_attachment=True, filename=f"bonafide_bulk_{stamp}.pdf",
+                                            content_type='application/pdf')
+            except RenderQueueFull:
+                # The certificates are issued; they can be downloaded one by one later
+                return _render_queue_full()
+            response['X-Certificates-Issued'] = len(issued)
+            response['X-Certificates-Skipped'] = len(skipped)
+            return response
+
+        if skipped:
+            messages.warning(request, f'No certificates issued. All {len(skipped)} matching students received a bonafide in the last 180 days.')
+        else:
+            messages.error(request, 'No active students match the selection.')
+
+    return render(request, 'studentcorner/bulk_bonafide.html', {'form': form})
+
+
+async def student_statistics(request):
+    """Main statistics dashboard with detailed subject-wise breakdown"""
+    namespaces = (caching.STATISTICS, caching.LOOKUPS)
+    context = await caching.aget_or_set(
+        namespaces, 'dashboard', adashboard_statistics, caching.STATISTICS_TIMEOUT, view='student_statistics')
+    context = dict(
+        context, stats_version=await caching.aversions(*namespaces),
+        export_datasets=[(name, exports.DATASETS[name].title) for name in exports.REPORTS],
+    )
+    return await arender(request, 'studentcorner/statistics.html', context)
+
+@staff_member_required
+async def export_dataset(request, dataset, format):
+    """A roster, enrollment or certificate export, streamed as it is written (see exports.py)"""
+    if dataset not in exports.DATASETS or format not in exports.available_formats():
+        raise Http404('No such export')
+    response = StreamingHttpResponse(exports.achunks(dataset, format), content_type=exports.CONTENT_TYPES[format])
+    stamp = timezone.now().strftime('%Y%m%d')
+    response['Content-Disposition'] = f'attachment; filename="{dataset}_{stamp}.{format}"'
+    return response
+
+@staff_member_required
+def performance_dashboard(request):
+    """Latency, query and render-time percentiles per view, from RequestTimingMiddleware"""
+    rows = instrumentation.summary()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'views': rows})
+    for row in rows:
+        row['last_seen'] = datetime.fromtimestamp(row['last_seen'], tz=timezone.get_current_timezone())
     context = {
-        'total_students': total_students,
-        'male_students': male_students,
-        'female_students': female_students,
-        'batch_stats': batch_stats,
-        'semester_enrollment': semester_enrollment,
-        'course_type_details': course_type_details,
-        'course_type_summary': course_type_summary,
+        'rows': rows,
+        'buffer_size': settings.PERF_BUFFER_SIZE,
+        'persist_interval': settings.PERF_PERSIST_INTERVAL,
     }
-    
-    return render(request, 'studentcorner/statistics.html', context)
+    return render(request, 'studentcorner/performance.html', context)
 
 def detailed_semester_stats(request, semester_number):
-    """Detailed statistics for a specific semester"""
-    semester_stats = StudentSemester.objects.filter(
-        semester__semester_number=semester_number,
-        is_enrolled=True,
-        student__is_active=True
+    """
+    One semester's enrollments across all course slots, filtered by session,
+    batch and gender. HTMX requests get just the results fragment and
+    ?format=json the numbers, so changing a filter reloads only the results.
+    """
+    semester = next((semester for semester in caching.semesters() if semester.semester_number == semester_number), None)
+    if semester is None:
+        raise Http404('No such semester')
+    form = SemesterStatsForm(request.GET)
+    filters = form.filters()
+    # One entry per filter combination; the choices are validated, so the key stays short
+    name = f'semester_detail:{semester.id}:' + urlencode(sorted(filters.items()))
+    detail = caching.get_or_set(
+        (caching.STATISTICS, caching.LOOKUPS), name, lambda: semester_detail(semester, **filters),
+        caching.STATISTICS_TIMEOUT, view='detailed_semester_stats',
     )
-    
-    # Major subjects in this semester
-    major_subjects = semester_stats.filter(
-        major_course__isnull=False
-    ).values(
-        'major_course__subject_code',
-        'major_course__subject_name'
-    ).annotate(
-        total=Count('id'),
-        male=Count('id', filter=Q(student__gender='M')),
-        female=Count('id', filter=Q(student__gender='F'))
-    ).order_by('major_course__subject_name')
-    
-    # Minor subjects in this semester
-    minor_subjects = semester_stats.filter(
-        minor_course__isnull=False
-    ).values(
-        'minor_course__subject_code',
-        'minor_course__subject_name'
-    ).annotate(
-        total=Count('id'),
-        male=Count('id', filter=Q(student__gender='M')),
-        female=Count('id', filter=Q(student__gender='F'))
-    ).order_by('minor_course__subject_name')
-    
-    # Overall semester stats
-    overall_stats = semester_stats.aggregate(
-        total=Count('id'),
-        male=Count('id', filter=Q(student__gender='M')),
-        female=Count('id', filter=Q(student__gender='F'))
-    )
-    
-    context = {
-        'semester_number': semester_number,
-        'overall_stats': overall_stats,
-        'major_subjects': major_subjects,
-        'minor_subjects': minor_subjects,
-        'total_students': semester_stats.count(),
-    }
-    
-    return render(request, 'studentcorner/semester_detail.html', context)
 
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'semester': {'number': semester.semester_number, 'name': semester.semester_name},
+            'filters': filters,
+            'overall': detail['overall_stats'],
+            'slots': [
+                dict(summary, subjects=detail['course_type_details'][summary['type']]['subjects'])
+                for summary in detail['course_type_summary']
+            ],
+        })
+
+    context = dict(detail, semester=semester, semesters=caching.semesters(), form=form, filters=filters,
+                   query=form.query())
+    if request.headers.get('HX-Request'):
+        response = render(request, 'studentcorner/semester_detail_results.html', context)
+    else:
+        response = render(request, 'studentcorner/semester_detail.html', context)
+    # Same URL, fragment or full page: caches must key on the header
+    patch_vary_headers(response, ['HX-Request'])
+    return response